@@ -13,7 +13,8 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from tarjeta_acceso import TarjetaAcceso
 from estilos import Estilos
-from base_de_datos import BaseDeDatos
+from base_de_datos import obtener_base_de_datos
+from filtro_consulta import FiltroConsulta
 from datetime import datetime, timedelta, timezone
 from ventana_mensaje import GestorMensajes
 import gc
@@ -59,7 +60,7 @@ class SistemaIndependiente:
         self._configurar_ventana()
 
         try:
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             self.lista_administradores = bd.obtener_administradores()
         except:
             self.lista_administradores = []
@@ -90,7 +91,7 @@ class SistemaIndependiente:
         try:
             print("🔔 Verificando notificaciones pendientes en entorno local...")
 
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             pendientes = bd.obtener_pendientes_notificacion(dias=DÍAS_NOTIFICACIÓN)
             
             if not pendientes:
@@ -369,6 +370,7 @@ class SistemaIndependiente:
             if self.filtro_pron_torneo is not None:
                 # Desactivar
                 self.filtro_pron_torneo = None
+                self.filtro_pron_edicion_id = None
                 self._actualizar_botones_pronosticos_visual() # Pinta de nuevo los colores correctos
                 self._actualizar_titulo_pronosticos()
                 self._recargar_datos(actualizar_pronosticos=True)
@@ -380,6 +382,7 @@ class SistemaIndependiente:
             if self.filtro_pron_equipo is not None:
                 # Desactivar
                 self.filtro_pron_equipo = None
+                self.filtro_pron_rival_id = None
                 self._actualizar_botones_pronosticos_visual()
                 self._actualizar_titulo_pronosticos()
                 self._recargar_datos(actualizar_pronosticos=True)
@@ -391,6 +394,7 @@ class SistemaIndependiente:
             if self.filtro_pron_usuario is not None:
                 # Desactivar
                 self.filtro_pron_usuario = None
+                self.filtro_pron_usuario_id = None
                 self._actualizar_botones_pronosticos_visual()
                 self._actualizar_titulo_pronosticos()
                 self._recargar_datos(actualizar_pronosticos=True)
@@ -449,7 +453,7 @@ class SistemaIndependiente:
             time.sleep(0.3)
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 datos = bd.obtener_ranking_falso_profeta(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
                 
                 filas = []
@@ -612,6 +616,11 @@ class SistemaIndependiente:
         self.filtro_pron_torneo = None 
         self.filtro_pron_equipo = None 
         self.filtro_pron_usuario = None 
+        # Ids de los filtros de Pronósticos (los nombres de arriba son para los títulos)
+        self.filtro_pron_edicion_id = None
+        self.filtro_pron_rival_id = None
+        self.filtro_pron_usuario_id = None
+        self.cache_usuarios_modal = {}
         self.torneo_seleccionado_id = None
         self.filtro_ranking_edicion_id = None
         self.filtro_ranking_nombre = None
@@ -635,6 +644,8 @@ class SistemaIndependiente:
         self.usuario_grafico_barra_sel = None 
         self.usuario_seleccionado_ranking = None
         self.pronostico_seleccionado_key = None
+        self.pronosticos_siguiente = None # Cursor de la próxima página de pronósticos (None = no hay más)
+        self.pronosticos_filas_servidor = [] # Filas cargadas hasta ahora, en el orden en que vienen de la base
 
         # NUEVAS VARIABLES DE ESTADO PARA FILTROS CONJUNTOS
         self.filtro_temporal = 'futuros'      # 'todos', 'jugados', 'futuros'
@@ -851,6 +862,7 @@ class SistemaIndependiente:
         self.btn_por_equipo = ft.ElevatedButton("Por equipo", icon=ft.Icons.GROUPS, bgcolor="#333333", color="white", on_click=self._abrir_selector_equipo)
 
         # --- BOTONES FILTROS (PESTAÑA PRONÓSTICOS) ---
+        self.btn_pron_cargar_mas = ft.TextButton("Cargar más pronósticos", icon=ft.Icons.EXPAND_MORE, visible=False, on_click=self._cargar_mas_pronosticos)
         self.btn_pron_todos = ft.ElevatedButton("Todos", icon=ft.Icons.LIST, bgcolor="blue", color="white", on_click=lambda _: self._cambiar_filtro_tiempo_pronosticos('todos'))
         self.btn_pron_por_jugar = ft.ElevatedButton("Por jugar", icon=ft.Icons.UPCOMING, bgcolor="#333333", color="white", on_click=lambda _: self._cambiar_filtro_tiempo_pronosticos('futuros'))
         self.btn_pron_jugados = ft.ElevatedButton("Jugados", icon=ft.Icons.HISTORY, bgcolor="#333333", color="white", on_click=lambda _: self._cambiar_filtro_tiempo_pronosticos('jugados'))
@@ -1090,7 +1102,7 @@ class SistemaIndependiente:
         # 0. Obtener datos actuales para mostrar en Configuración
         email_actual_display = "Cargando..."
         try:
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             email_bd = bd.obtener_email_usuario(self.usuario_actual)
             if email_bd: email_actual_display = email_bd
             else: email_actual_display = "No registrado"
@@ -1243,6 +1255,7 @@ class SistemaIndependiente:
                                     ft.Container(height=350, content=ft.Column(scroll=ft.ScrollMode.ALWAYS, controls=[self.tabla_pronosticos]))
                                 ])
                             ]),
+                            self.btn_pron_cargar_mas,
                             ft.Container(height=10), 
                             ft.Row(controls=[self.btn_pron_todos, self.btn_pron_por_jugar, self.btn_pron_jugados, self.btn_pron_por_torneo, self.btn_pron_por_equipo, self.btn_pron_por_usuario], alignment=ft.MainAxisAlignment.START, vertical_alignment=ft.CrossAxisAlignment.CENTER, wrap=True),
                             ft.Container(height=40)
@@ -1410,7 +1423,7 @@ class SistemaIndependiente:
             self.btn_conf_guardar_usuario.update()
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 bd.verificar_username_libre(nuevo_user)
                 id_user = bd.obtener_id_por_username(self.usuario_actual)
                 
@@ -1517,7 +1530,7 @@ class SistemaIndependiente:
         self.page.open(self.dlg_opt_pes)
 
         def _cargar():
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             datos = bd.obtener_indice_optimismo_pesimismo(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
             
             filas = []
@@ -1644,6 +1657,123 @@ class SistemaIndependiente:
         self.btn_sin_pronosticar.update()
         self.btn_por_equipo.update()
 
+    def _fila_tabla_pronostico(self, row):
+        """Arma la fila de la tabla de Pronósticos para un registro de obtener_pagina_pronosticos."""
+        fecha_partido = row[1]
+        gc, gr = row[3], row[4]
+        pc, pr = row[6], row[7]
+        pts, err_abs = row[8], row[10]
+
+        res_txt = f"{gc}-{gr}" if gc is not None else "-"
+        pron_txt = f"{pc}-{pr}"
+
+        if fecha_partido.time().strftime('%H:%M:%S') == '00:00:00': fecha_disp = fecha_partido.strftime('%d/%m/%Y')
+        else: fecha_disp = fecha_partido.strftime('%d/%m/%Y %H:%M')
+
+        fecha_pred_disp = row[9].strftime('%d/%m/%Y %H:%M:%S') if row[9] else "-"
+        puntos_disp = str(pts) if pts is not None else "-"
+
+        if err_abs is not None:
+            val_err = float(err_abs)
+            err_disp = str(int(val_err))
+            color_err = self._obtener_color_error(val_err)
+        else:
+            err_disp = "-"
+            color_err = "white70"
+
+        row_key = hash(row)
+        color_fila_pron = "#8B0000" if row_key == self.pronostico_seleccionado_key else None
+        evt_click_pron = lambda e, k=row_key: self._seleccionar_fila_pronostico(k)
+
+        return ft.DataRow(
+            cells=[
+                ft.DataCell(ft.Container(content=ft.Text(row[0], color="white", weight=ft.FontWeight.BOLD), width=190, alignment=ft.alignment.center_left, on_click=evt_click_pron)),
+                ft.DataCell(ft.Container(content=ft.Text(fecha_disp, color="white"), width=140, alignment=ft.alignment.center, on_click=evt_click_pron)),
+                ft.DataCell(ft.Container(content=ft.Text(row[2], color="yellow"), width=150, alignment=ft.alignment.center_left, on_click=evt_click_pron)),
+                ft.DataCell(ft.Container(content=ft.Text(res_txt, color="white"), width=80, alignment=ft.alignment.center, on_click=evt_click_pron)), 
+                ft.DataCell(ft.Container(content=ft.Text(row[5], color="white", weight=ft.FontWeight.BOLD), width=ANCHO_PRONÓSTICO_USUARIO, alignment=ft.alignment.center_left, on_click=evt_click_pron)), 
+                ft.DataCell(ft.Container(content=ft.Text(pron_txt, color="cyan"), width=80, alignment=ft.alignment.center, on_click=evt_click_pron)), 
+                ft.DataCell(ft.Container(content=ft.Text(fecha_pred_disp, color="white70"), width=160, alignment=ft.alignment.center, on_click=evt_click_pron)), 
+                ft.DataCell(ft.Container(content=ft.Text(puntos_disp, color="green"), width=60, alignment=ft.alignment.center, on_click=evt_click_pron)), 
+                ft.DataCell(ft.Container(content=ft.Text(err_disp, color=color_err), width=80, alignment=ft.alignment.center, on_click=evt_click_pron)), 
+            ],
+            color=color_fila_pron,
+            data=row_key 
+        )
+
+    def _ordenar_filas_pronosticos(self, filas):
+        """Aplica a las filas (en el lugar) el orden elegido en el encabezado de la tabla de Pronósticos."""
+        if self.pronosticos_sort_col_index is None:
+            return
+        idx = self.pronosticos_sort_col_index
+        reverse_sort = not self.pronosticos_sort_asc
+        def key_sort(row):
+            try:
+                val = row.cells[idx].content.content.value
+                if idx in [7, 8]: 
+                    if val == "-": return -999
+                    val_clean = val.replace(',', '.')
+                    return float(val_clean)
+                if idx in [1, 6]:
+                    try:
+                        if ":" in val:
+                            if val.count(":") == 2: return datetime.strptime(val, "%d/%m/%Y %H:%M:%S")
+                            if val.count("/") == 2: return datetime.strptime(val, "%d/%m/%Y %H:%M")
+                            return datetime.strptime(val, "%d/%m %H:%M")
+                        return datetime.strptime(val, "%d/%m/%Y")
+                    except: return val
+                return str(val).lower()
+            except: return ""
+        filas.sort(key=key_sort, reverse=reverse_sort)
+
+    def _filtro_pronosticos(self):
+        """Filtros activos de la pestaña Pronósticos, ya como ids (cada uno usa un índice en la base)."""
+        return FiltroConsulta(
+            edicion_id=self.filtro_pron_edicion_id,
+            rival_id=self.filtro_pron_rival_id,
+            usuario_id=self.filtro_pron_usuario_id
+        )
+
+    def _cargar_mas_pronosticos(self, e):
+        """Trae la página siguiente de pronósticos (mismos filtros) y la agrega a la tabla."""
+        if self.pronosticos_siguiente is None:
+            return
+        self.btn_pron_cargar_mas.disabled = True
+        self.loading_pronosticos.visible = True
+        self.page.update()
+        threading.Thread(target=self._tarea_cargar_mas_pronosticos, args=(self.pronosticos_siguiente,), daemon=True).start()
+
+    def _tarea_cargar_mas_pronosticos(self, despues_de):
+        try:
+            bd = obtener_base_de_datos()
+            datos_raw, siguiente = bd.obtener_pagina_pronosticos(
+                filtro_tiempo=self.filtro_pron_tiempo,
+                filtro=self._filtro_pronosticos(),
+                despues_de=despues_de
+            )
+            # Si mientras tanto cambió el filtro, esta página ya no corresponde a la tabla
+            if despues_de is not self.pronosticos_siguiente:
+                return
+            self.pronosticos_filas_servidor = self.pronosticos_filas_servidor + [self._fila_tabla_pronostico(row) for row in datos_raw]
+            # Un orden por otra columna solo vería las páginas cargadas hasta ahora: se vuelve al orden
+            # de la base (por "Fecha y hora", igual que al cambiar el filtro de tiempo), que es el que
+            # siguen las páginas. No se usa None por el bug de Flet que colapsa la tabla.
+            asc_base = self.filtro_pron_tiempo == 'futuros'
+            if (self.pronosticos_sort_col_index, self.pronosticos_sort_asc) != (1, asc_base):
+                self.pronosticos_sort_col_index = 1
+                self.pronosticos_sort_asc = asc_base
+                self.tabla_pronosticos_header.sort_column_index = 1
+                self.tabla_pronosticos_header.sort_ascending = asc_base
+            self.tabla_pronosticos.rows = list(self.pronosticos_filas_servidor)
+            self.pronosticos_siguiente = siguiente
+        except Exception as ex:
+            GestorMensajes.mostrar(self.page, "Error", f"No se pudieron cargar más pronósticos: {ex}", "error")
+        finally:
+            self.btn_pron_cargar_mas.disabled = False
+            self.btn_pron_cargar_mas.visible = self.pronosticos_siguiente is not None
+            self.loading_pronosticos.visible = False
+            self.page.update()
+
     def _ordenar_tabla_pronosticos(self, e):
         """Maneja el evento de ordenar columnas en la tabla de pronósticos"""
         # Si clica la misma columna, invierte el orden. Si es nueva, resetea a Ascendente.
@@ -1703,7 +1833,7 @@ class SistemaIndependiente:
                 on_click=funcion_generar 
             )
 
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             ediciones = bd.obtener_ediciones()
             self.cache_ediciones_modal = ediciones
             nombres_unicos = sorted(list(set(e[1] for e in ediciones)))
@@ -1804,7 +1934,7 @@ class SistemaIndependiente:
         self.page.open(self.dlg_carga_grafico)
 
         def _tarea():
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             cant_partidos, _, historial = bd.obtener_datos_evolucion_puntos(edicion_id, usuarios_sel)
             
             # 3. CERRAR EL DIÁLOGO DE CARGA
@@ -1952,7 +2082,7 @@ class SistemaIndependiente:
         edicion_id = self.filtro_ranking_edicion_id
 
         def _tarea():
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             
             try:
                 # Obtenemos los puntos. Tu backend debe soportar edicion_id=None para traer toda la historia
@@ -2127,7 +2257,7 @@ class SistemaIndependiente:
         self.page.open(self.dlg_mejor_predictor)
 
         def _cargar():
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             datos = bd.obtener_ranking_mejor_predictor(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
             
             filas = []
@@ -2238,7 +2368,7 @@ class SistemaIndependiente:
                 hora_celular = self.obtener_hora_argentina().strftime('%Y-%m-%d %H:%M:%S')
                 
                 # Insertar en BD
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 bd.insertar_pronostico(self.usuario_actual, self.partido_a_pronosticar_id, int(gc_str), int(gr_str), hora_celular)
                 
                 # 4. VACIAR EL FORMULARIO
@@ -2337,7 +2467,7 @@ class SistemaIndependiente:
         self.page.open(self.dlg_racha)
 
         def _cargar():
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             datos = bd.obtener_racha_actual(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
             
             filas = []
@@ -2432,8 +2562,10 @@ class SistemaIndependiente:
         
         def _cargar_usuarios_modal():
             try:
-                bd = BaseDeDatos()
-                usuarios = bd.obtener_usuarios() 
+                bd = obtener_base_de_datos()
+                usuarios_db = bd.obtener_usuarios_con_id()
+                self.cache_usuarios_modal = {u[1]: u[0] for u in usuarios_db}
+                usuarios = [u[1] for u in usuarios_db]
                 controles = []
                 for usuario in usuarios:
                     controles.append(ft.ListTile(title=ft.Text(usuario, size=14), data=usuario, on_click=self._seleccionar_usuario_modal, bgcolor="#2D2D2D", shape=ft.RoundedRectangleBorder(radius=5)))
@@ -2463,8 +2595,17 @@ class SistemaIndependiente:
 
     def _confirmar_filtro_torneo_pronosticos(self, e):
         if self.temp_campeonato_sel and self.temp_anio_sel:
+            edicion_encontrada = None
+            for ed in self.cache_ediciones_modal:
+                if ed[1] == self.temp_campeonato_sel and ed[2] == self.temp_anio_sel:
+                    edicion_encontrada = ed[0]
+                    break
+            if not edicion_encontrada:
+                return
+
             nombre_completo = f"{self.temp_campeonato_sel} {self.temp_anio_sel}"
             self.filtro_pron_torneo = nombre_completo
+            self.filtro_pron_edicion_id = edicion_encontrada
             
             self._actualizar_botones_pronosticos_visual()
             self._actualizar_titulo_pronosticos()
@@ -2552,7 +2693,7 @@ class SistemaIndependiente:
             self.btn_ver_torneo = ft.ElevatedButton("Ver", icon=ft.Icons.VISIBILITY, disabled=True, on_click=self._confirmar_filtro_torneo_pronosticos)
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 # --- CAMBIO APLICADO: TODOS LOS TORNEOS ---
                 ediciones = bd.obtener_ediciones(solo_finalizados=False)
                 self.cache_ediciones_modal = ediciones
@@ -2604,7 +2745,12 @@ class SistemaIndependiente:
 
     def _confirmar_filtro_equipo_pronosticos(self, e):
         if self.temp_rival_sel_nombre:
+            if self.temp_rival_sel_id is None:
+                # Igual que con el usuario: sin id no se filtra en silencio por nada
+                GestorMensajes.mostrar(self.page, "Error", f"No se pudo identificar al equipo '{self.temp_rival_sel_nombre}'. Volvé a abrir el filtro.", "error")
+                return
             self.filtro_pron_equipo = self.temp_rival_sel_nombre
+            self.filtro_pron_rival_id = self.temp_rival_sel_id
             
             self._actualizar_botones_pronosticos_visual()
             
@@ -2615,7 +2761,13 @@ class SistemaIndependiente:
     def _confirmar_filtro_usuario_pronosticos(self, e):
         """Confirma selección usuario (COMBINABLE)"""
         if self.temp_usuario_sel:
+            usuario_id = self.cache_usuarios_modal.get(self.temp_usuario_sel)
+            if usuario_id is None:
+                # Sin el id el filtro quedaría vacío y se listarían los pronósticos de todos
+                GestorMensajes.mostrar(self.page, "Error", f"No se pudo identificar al usuario '{self.temp_usuario_sel}'. Volvé a abrir el filtro.", "error")
+                return
             self.filtro_pron_usuario = self.temp_usuario_sel
+            self.filtro_pron_usuario_id = usuario_id
             
             self._actualizar_botones_pronosticos_visual()
             
@@ -2643,7 +2795,7 @@ class SistemaIndependiente:
             self.btn_ver_equipo = ft.ElevatedButton("Ver", icon=ft.Icons.VISIBILITY, disabled=True, on_click=self._confirmar_filtro_equipo_pronosticos)
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 rivales = bd.obtener_rivales() 
                 controles = []
                 for id_rival, nombre in rivales:
@@ -2775,7 +2927,7 @@ class SistemaIndependiente:
             self.btn_conf_guardar_pass.update()
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 # Reutilizamos la función existente en tu BD
                 bd.cambiar_contrasena(self.usuario_actual, p1)
                 
@@ -2835,7 +2987,7 @@ class SistemaIndependiente:
 
         def _cargar():
             time.sleep(0.6) # Pequeña pausa para ver la animación
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             
             # 1. VALIDACIÓN: ¿Hay partidos jugados en el pasado para este filtro?
             partidos_jugados = bd.obtener_partidos(
@@ -3036,7 +3188,7 @@ class SistemaIndependiente:
         def _cargar():
             time.sleep(0.3)
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 datos = bd.obtener_ranking_mufa(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
                 
                 filas = []
@@ -3153,7 +3305,7 @@ class SistemaIndependiente:
 
         def _cargar():
             time.sleep(0.5)
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             
             datos_estabilidad = bd.obtener_ranking_estabilidad(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
             
@@ -3385,7 +3537,7 @@ class SistemaIndependiente:
 
         def _tarea():
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 if self.rival_admin_editando_id:
                     bd.actualizar_rival_manual(self.rival_admin_editando_id, nombre)
                     mensaje = "Rival actualizado correctamente."
@@ -3409,7 +3561,7 @@ class SistemaIndependiente:
             GestorMensajes.mostrar(self.page, "Procesando", "Eliminando rival...", "info")
             def _tarea():
                 try:
-                    bd = BaseDeDatos()
+                    bd = obtener_base_de_datos()
                     bd.eliminar_rival_manual(self.rival_admin_editando_id)
                     self._recargar_datos(actualizar_partidos=True, actualizar_pronosticos=False, actualizar_ranking=False, actualizar_admin=True)
                     GestorMensajes.mostrar(self.page, "Éxito", "Rival borrado permanentemente.", "exito")
@@ -3468,7 +3620,7 @@ class SistemaIndependiente:
 
         def _tarea():
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 if self.torneo_admin_editando_id:
                     bd.actualizar_torneo_manual(self.torneo_admin_editando_id, nombre)
                     mensaje = "Torneo actualizado correctamente."
@@ -3492,7 +3644,7 @@ class SistemaIndependiente:
             GestorMensajes.mostrar(self.page, "Procesando", "Eliminando torneo...", "info")
             def _tarea():
                 try:
-                    bd = BaseDeDatos()
+                    bd = obtener_base_de_datos()
                     bd.eliminar_torneo_manual(self.torneo_admin_editando_id)
                     self._recargar_datos(actualizar_partidos=True, actualizar_pronosticos=False, actualizar_ranking=False, actualizar_admin=True)
                     GestorMensajes.mostrar(self.page, "Éxito", "Torneo borrado permanentemente.", "exito")
@@ -3555,7 +3707,7 @@ class SistemaIndependiente:
             self.btn_conf_guardar_pass.update()
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 # Usamos la función cambiar_contrasena que ya tienes en base_de_datos.py
                 # (Sirve tanto para recuperar como para cambiar estando logueado)
                 bd.cambiar_contrasena(self.usuario_actual, p1)
@@ -3648,13 +3800,39 @@ class SistemaIndependiente:
         """
         time.sleep(0.1) 
         try:
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
+
+            # Todas las lecturas de la pantalla en un solo lote: comparten la conexión (una consulta por lectura)
+            pedidos = {}
+            if actualizar_ranking:
+                pedidos['ranking'] = ('obtener_ranking', {'edicion_id': self.filtro_ranking_edicion_id, 'anio': self.filtro_ranking_anio})
+            if actualizar_copas and self.filtro_ranking_edicion_id is None:
+                pedidos['copas'] = ('obtener_torneos_ganados', {'anio': self.filtro_ranking_anio})
+            if actualizar_partidos:
+                pedidos['partidos'] = ('obtener_partidos', {
+                    'usuario': self.usuario_actual,
+                    'filtro_tiempo': self.filtro_temporal,
+                    'edicion_id': self.filtro_edicion_id,
+                    'rival_id': self.filtro_rival_id,
+                    'solo_sin_pronosticar': self.filtro_sin_pronosticar
+                })
+            if actualizar_pronosticos:
+                pedidos['pronosticos'] = ('obtener_pagina_pronosticos', {
+                    'filtro_tiempo': self.filtro_pron_tiempo,
+                    'filtro': self._filtro_pronosticos()
+                })
+            if actualizar_admin:
+                pedidos['rivales'] = 'obtener_rivales_completo'
+                pedidos['torneos'] = 'obtener_campeonatos_completo'
+                pedidos['ediciones'] = ('obtener_ediciones', {'solo_finalizados': False})
+                pedidos['partidos_admin'] = ('obtener_partidos', {'usuario': self.usuario_actual, 'filtro_tiempo': 'todos'})
+            lote = bd.obtener_lote(pedidos)
             
             # ------------------------------------------
             # 1. RANKING (TABLA POSICIONES)
             # ------------------------------------------
             if actualizar_ranking:
-                datos_ranking = bd.obtener_ranking(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
+                datos_ranking = lote['ranking']
                 filas_ranking = []
                 for i, fila in enumerate(datos_ranking, start=1):
                     # Indices basados en la nueva query SQL:
@@ -3729,7 +3907,7 @@ class SistemaIndependiente:
             # 2. COPAS (TORNEOS GANADOS)
             # ------------------------------------------
             if actualizar_copas and self.filtro_ranking_edicion_id is None:
-                datos_copas = bd.obtener_torneos_ganados(self.filtro_ranking_anio)
+                datos_copas = lote['copas']
                 filas_copas = []
                 
                 # --- NUEVA LÓGICA DE TROFEOS ---
@@ -3759,13 +3937,7 @@ class SistemaIndependiente:
             # 3. PARTIDOS
             # ------------------------------------------
             if actualizar_partidos:
-                datos_partidos_user = bd.obtener_partidos(
-                    self.usuario_actual, 
-                    filtro_tiempo=self.filtro_temporal, 
-                    edicion_id=self.filtro_edicion_id, 
-                    rival_id=self.filtro_rival_id, 
-                    solo_sin_pronosticar=self.filtro_sin_pronosticar
-                )
+                datos_partidos_user = lote['partidos']
                 filas_tabla_partidos = []
                 for fila in datos_partidos_user:
                     p_id = fila[0]
@@ -3834,87 +4006,20 @@ class SistemaIndependiente:
             # 4. PRONÓSTICOS
             # ------------------------------------------
             if actualizar_pronosticos:
-                datos_raw = bd.obtener_todos_pronosticos(
-                    filtro_tiempo=self.filtro_pron_tiempo,
-                    filtro_torneo=self.filtro_pron_torneo,
-                    filtro_equipo=self.filtro_pron_equipo,
-                    filtro_usuario=self.filtro_pron_usuario
-                )
-                filas_filtradas = []
-                
-                for row in datos_raw:
-                    fecha_partido = row[1]
-                    gc, gr = row[3], row[4]
-                    pc, pr = row[6], row[7]
-                    pts, err_abs = row[8], row[10]
-                    
-                    res_txt = f"{gc}-{gr}" if gc is not None else "-"
-                    pron_txt = f"{pc}-{pr}"
-                    
-                    if fecha_partido.time().strftime('%H:%M:%S') == '00:00:00': fecha_disp = fecha_partido.strftime('%d/%m/%Y')
-                    else: fecha_disp = fecha_partido.strftime('%d/%m/%Y %H:%M')
-                        
-                    fecha_pred_disp = row[9].strftime('%d/%m/%Y %H:%M:%S') if row[9] else "-"
-                    puntos_disp = str(pts) if pts is not None else "-"
-                    
-                    if err_abs is not None:
-                        val_err = float(err_abs)
-                        err_disp = str(int(val_err))
-                        color_err = self._obtener_color_error(val_err)
-                    else:
-                        err_disp = "-"
-                        color_err = "white70"
-
-                    row_key = hash(row)
-                    color_fila_pron = "#8B0000" if row_key == self.pronostico_seleccionado_key else None
-                    evt_click_pron = lambda e, k=row_key: self._seleccionar_fila_pronostico(k)
-
-                    filas_filtradas.append(ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Container(content=ft.Text(row[0], color="white", weight=ft.FontWeight.BOLD), width=190, alignment=ft.alignment.center_left, on_click=evt_click_pron)),
-                            ft.DataCell(ft.Container(content=ft.Text(fecha_disp, color="white"), width=140, alignment=ft.alignment.center, on_click=evt_click_pron)),
-                            ft.DataCell(ft.Container(content=ft.Text(row[2], color="yellow"), width=150, alignment=ft.alignment.center_left, on_click=evt_click_pron)),
-                            ft.DataCell(ft.Container(content=ft.Text(res_txt, color="white"), width=80, alignment=ft.alignment.center, on_click=evt_click_pron)), 
-                            ft.DataCell(ft.Container(content=ft.Text(row[5], color="white", weight=ft.FontWeight.BOLD), width=ANCHO_PRONÓSTICO_USUARIO, alignment=ft.alignment.center_left, on_click=evt_click_pron)), 
-                            ft.DataCell(ft.Container(content=ft.Text(pron_txt, color="cyan"), width=80, alignment=ft.alignment.center, on_click=evt_click_pron)), 
-                            ft.DataCell(ft.Container(content=ft.Text(fecha_pred_disp, color="white70"), width=160, alignment=ft.alignment.center, on_click=evt_click_pron)), 
-                            ft.DataCell(ft.Container(content=ft.Text(puntos_disp, color="green"), width=60, alignment=ft.alignment.center, on_click=evt_click_pron)), 
-                            ft.DataCell(ft.Container(content=ft.Text(err_disp, color=color_err), width=80, alignment=ft.alignment.center, on_click=evt_click_pron)), 
-                        ],
-                        color=color_fila_pron,
-                        data=row_key 
-                    ))
-                
-                if self.pronosticos_sort_col_index is not None:
-                    idx = self.pronosticos_sort_col_index
-                    reverse_sort = not self.pronosticos_sort_asc
-                    def key_sort(row):
-                        try:
-                            val = row.cells[idx].content.content.value
-                            if idx in [7, 8]: 
-                                if val == "-": return -999
-                                val_clean = val.replace(',', '.')
-                                return float(val_clean)
-                            if idx in [1, 6]:
-                                try:
-                                    if ":" in val:
-                                        if val.count(":") == 2: return datetime.strptime(val, "%d/%m/%Y %H:%M:%S")
-                                        if val.count("/") == 2: return datetime.strptime(val, "%d/%m/%Y %H:%M")
-                                        return datetime.strptime(val, "%d/%m %H:%M")
-                                    return datetime.strptime(val, "%d/%m/%Y")
-                                except: return val
-                            return str(val).lower()
-                        except: return ""
-                    filas_filtradas.sort(key=key_sort, reverse=reverse_sort)
-                
+                # Solo la primera página: el resto se pide con "Cargar más pronósticos"
+                datos_raw, self.pronosticos_siguiente = lote['pronosticos']
+                self.pronosticos_filas_servidor = [self._fila_tabla_pronostico(row) for row in datos_raw]
+                filas_filtradas = list(self.pronosticos_filas_servidor)
+                self._ordenar_filas_pronosticos(filas_filtradas)
                 self.tabla_pronosticos.rows = filas_filtradas
+                self.btn_pron_cargar_mas.visible = self.pronosticos_siguiente is not None
 
             # ------------------------------------------
             # 5. ADMINISTRACIÓN
             # ------------------------------------------
             if actualizar_admin:
                 # --- EQUIPOS ---
-                datos_rivales = bd.obtener_rivales_completo()
+                datos_rivales = lote['rivales']
                 self.cache_admin_rivales = datos_rivales
                 filas_admin = []
                 for fila in datos_rivales:
@@ -3934,8 +4039,8 @@ class SistemaIndependiente:
                 self.tabla_rivales.rows = filas_admin
                 
                 # --- TORNEOS ---
-                datos_torneos = bd.obtener_campeonatos_completo()
-                self.cache_admin_ediciones = bd.obtener_ediciones(solo_finalizados=False)
+                datos_torneos = lote['torneos']
+                self.cache_admin_ediciones = lote['ediciones']
                 filas_torneos = []
                 for fila in datos_torneos:
                     t_id = fila[0]
@@ -3957,7 +4062,7 @@ class SistemaIndependiente:
                 
                 # --- NUEVO: PARTIDOS PARA ADMIN ---
                 # Reutilizamos tu función de BD para obtener todos los partidos ordenados por fecha
-                datos_partidos_admin = bd.obtener_partidos(self.usuario_actual, filtro_tiempo='todos')
+                datos_partidos_admin = lote['partidos_admin']
                 self.cache_partidos_admin_data = datos_partidos_admin # Guardamos caché para el editor
                 filas_part_admin = []
 
@@ -4024,7 +4129,7 @@ class SistemaIndependiente:
     def _cargar_ediciones_admin(self):
         """Llena la tabla de ediciones trayendo datos frescos."""
         try:
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             ediciones = bd.obtener_ediciones_admin()
             self.tabla_ediciones.rows.clear()
             for ed in ediciones:
@@ -4067,7 +4172,7 @@ class SistemaIndependiente:
         def _tarea():
             time.sleep(0.2) 
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 torneos = bd.obtener_campeonatos_completo()
                 anios = bd.obtener_anios_admin()
                 
@@ -4148,7 +4253,7 @@ class SistemaIndependiente:
         """Maneja la eliminación de forma segura validando datos."""
         def _confirmar(e2):
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 bd.eliminar_edicion_admin(edicion_id)
                 GestorMensajes.mostrar(self.page, "Éxito", "Edición eliminada correctamente.", "success")
                 self._limpiar_memoria_dialogo(dlg)
@@ -4199,7 +4304,7 @@ class SistemaIndependiente:
         self.page.open(self.dlg_racha_record)
 
         def _cargar():
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             datos = bd.obtener_racha_record(self.filtro_ranking_edicion_id, self.filtro_ranking_anio)
             
             filas = []
@@ -4293,7 +4398,7 @@ class SistemaIndependiente:
         """Envía el comando de actualización al bot usando requests."""
         token = os.getenv("TELEGRAM_TOKEN")
         # Necesitamos tu ID de Telegram (Gabriel)
-        bd = BaseDeDatos()
+        bd = obtener_base_de_datos()
         admin_id = bd.obtener_id_telegram_por_username("Gabriel") 
         
         if token and admin_id:
@@ -4345,7 +4450,7 @@ class SistemaIndependiente:
             self.btn_conf_guardar_email.update()
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 bd.verificar_email_libre(nuevo_email, self.usuario_actual) 
                 
                 # Generar código
@@ -4449,7 +4554,7 @@ class SistemaIndependiente:
             
             if codigo_ingresado == self.codigo_verificacion_temp:
                 try:
-                    bd = BaseDeDatos()
+                    bd = obtener_base_de_datos()
                     bd.actualizar_email_usuario(self.usuario_actual, self.email_pendiente_cambio)
                     
                     self._limpiar_memoria_dialogo(self.dlg_validar_email)
@@ -4510,7 +4615,7 @@ class SistemaIndependiente:
                 self.btn_ver_torneo = ft.ElevatedButton("Ver", icon=ft.Icons.VISIBILITY, disabled=True, on_click=self._confirmar_filtro_torneo)
                 
                 try:
-                    bd = BaseDeDatos()
+                    bd = obtener_base_de_datos()
                     # --- CAMBIO APLICADO: TODOS LOS TORNEOS ---
                     ediciones = bd.obtener_ediciones(solo_finalizados=False)
                     self.cache_ediciones_modal = ediciones
@@ -4600,7 +4705,7 @@ class SistemaIndependiente:
                 self.btn_ver_equipo = ft.ElevatedButton("Ver", icon=ft.Icons.VISIBILITY, disabled=True, on_click=self._confirmar_filtro_equipo)
                 
                 try:
-                    bd = BaseDeDatos()
+                    bd = obtener_base_de_datos()
                     rivales = bd.obtener_rivales() 
                     self.cache_rivales_modal = rivales 
                     controles = []
@@ -4752,7 +4857,7 @@ class SistemaIndependiente:
         def _tarea():
             time.sleep(0.1) # Pequeña pausa visual
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 ediciones = bd.obtener_ediciones()
                 rivales = bd.obtener_rivales_completo()
                 
@@ -5094,7 +5199,7 @@ class SistemaIndependiente:
         # --- ESCUDO ANTI-INCONSISTENCIA CRONOLÓGICA (ÚLTIMO PRONÓSTICO) ---
         if self.partido_admin_editando_id:
             try:
-                bd_val = BaseDeDatos()
+                bd_val = obtener_base_de_datos()
                 ultima_pred = bd_val.obtener_ultima_fecha_pronostico(self.partido_admin_editando_id)
                 if ultima_pred and fecha_obj < ultima_pred:
                     fecha_formateada = ultima_pred.strftime('%H:%M %d-%m-%Y')
@@ -5139,7 +5244,7 @@ class SistemaIndependiente:
 
         def _tarea():
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 if self.partido_admin_editando_id:
                     bd.actualizar_partido_manual(self.partido_admin_editando_id, torneo_id, rival_id, condicion, fecha_sql, gc_val, gr_val)
                     mensaje_exito = "Partido actualizado correctamente."
@@ -5169,7 +5274,7 @@ class SistemaIndependiente:
         def _confirmar(e):
             self._limpiar_memoria_dialogo(dlg_seguro)
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 bd.eliminar_partido_manual(self.partido_admin_editando_id)
                 GestorMensajes.mostrar(self.page, "Éxito", "Partido borrado permanentemente.", "exito")
                 self._recargar_datos(actualizar_partidos=True, actualizar_pronosticos=True, actualizar_ranking=True, actualizar_admin=True)
@@ -5233,7 +5338,7 @@ class SistemaIndependiente:
         def _tarea():
             time.sleep(0.5)
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 cant_partidos, total_usuarios, historial = bd.obtener_datos_evolucion_puestos(edicion_id, usuarios_sel)
                 
                 # 3. CERRAR EL DIÁLOGO DE CARGA
@@ -5426,7 +5531,7 @@ class SistemaIndependiente:
             self.btn_ver_torneo = ft.ElevatedButton("Ver", icon=ft.Icons.VISIBILITY, disabled=True, on_click=self._confirmar_filtro_torneo_ranking)
             
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 # --- CAMBIO APLICADO: SOLO TORNEOS FINALIZADOS ---
                 ediciones = bd.obtener_ediciones(solo_finalizados=True)
                 self.cache_ediciones_modal = ediciones
@@ -5509,7 +5614,7 @@ class SistemaIndependiente:
         
         def _cargar_anios():
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 anios = bd.obtener_anios()
                 controles = []
                 for id_anio, numero in anios:
@@ -5738,7 +5843,7 @@ class SistemaIndependiente:
 
         def _tarea():
             time.sleep(0.8)
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             stats = bd.obtener_estadisticas_estilo_pronostico(usuario_sel, edicion_id, anio_filtro)
             
             if not stats or stats[0] == 0:
@@ -5971,7 +6076,7 @@ class SistemaIndependiente:
             )
 
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 usuarios = bd.obtener_usuarios()
                 controles = []
                 for usu in usuarios:
@@ -6068,7 +6173,7 @@ class SistemaIndependiente:
 
         def _tarea():
             time.sleep(0.8)
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             stats = bd.obtener_estadisticas_tendencia_pronostico(usuario_sel, edicion_id, anio_filtro)
             
             if not stats or stats[0] == 0:
@@ -6178,7 +6283,7 @@ class SistemaIndependiente:
 
         def _tarea():
             time.sleep(0.8)
-            bd = BaseDeDatos()
+            bd = obtener_base_de_datos()
             stats = bd.obtener_estadisticas_firmeza_pronostico(usuario_sel, edicion_id, anio_filtro)
             
             if not stats or stats[0] == 0:
@@ -6310,7 +6415,7 @@ class SistemaIndependiente:
         def _tarea():
             time.sleep(0.5)
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 datos = bd.obtener_ranking_mayores_errores(usuario=None, edicion_id=edicion_id, anio=anio_filtro)
                 
                 # Cerrar modal de carga
@@ -6500,7 +6605,7 @@ if __name__ == "__main__":
         # 🚀 Tarea en segundo plano para registrar el año sin congelar la pantalla de inicio
         def _verificar_anio_inicio():
             try:
-                bd = BaseDeDatos()
+                bd = obtener_base_de_datos()
                 bd.registrar_anio_actual()
             except:
                 pass # Si falla por falta de internet al arrancar, lo ignoramos silenciosamente
@@ -0,0 +1,179 @@
+"""
+Agenda persistente de los recordatorios de partidos del bot.
+
+Antes, al arrancar (y con /actualizar_cronometros) se borraban y volvían a crear TODAS las alarmas
+consultando la base. Ahora:
+    - Las alarmas programadas se guardan en un archivo SQLite local; al arrancar se restauran desde ahí
+      sin esperar a la base.
+    - Un reconciliador compara las alarmas programadas contra la agenda de partidos futuros y solo
+      agrega, mueve o cancela las de los partidos que cambiaron (rival, fecha, torneo...).
+
+Cada alarma tiene una clave estable "<partido_id>:<tipo>" y una huella (momento + datos) para
+detectar si cambió.
+"""
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+HORAS_INSISTENCIA = (96, 48, 24, 1) # Avisos a los que todavía no pronosticaron
+HORAS_TABLA_POSICIONES = 1
+HORAS_RECORDATORIO_CUMPLIDORES = 24
+SEGUNDOS_GRACIA = 12 * 3600 # Igual que SEGUNDOS_ANTES del bot: margen si el job_queue se atrasa al disparar
+
+# Tipos de alarma (cada uno se asocia a un callback del bot)
+ALARMA_INSISTENCIA = 'insistencia'
+ALARMA_POSICIONES = 'posiciones'
+ALARMA_CUMPLIDORES = 'cumplidores'
+
+def _ruta_por_defecto():
+    # Igual que los logs del bot: junto al script (o al ejecutable)
+    if getattr(sys, 'frozen', False):
+        carpeta = os.path.dirname(sys.executable)
+    else:
+        carpeta = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(carpeta, "agenda_recordatorios.sqlite3")
+
+RUTA_AGENDA = os.getenv("BOT_RUTA_AGENDA", _ruta_por_defecto())
+
+def _utc(momento):
+    # En el archivo y en las huellas los momentos van en UTC para poder compararlos como texto
+    return momento.astimezone(timezone.utc).isoformat()
+
+def _a_json(datos):
+    return json.dumps(datos, sort_keys=True, default=lambda v: {'__fecha__': v.isoformat()})
+
+def _desde_json(texto):
+    return json.loads(texto, object_hook=lambda d: datetime.fromisoformat(d['__fecha__']) if '__fecha__' in d else d)
+
+def planificar(partidos, zona_horaria, ahora):
+    """
+    Alarmas que corresponden a la agenda (filas de obtener_agenda_partidos_futuros).
+    Retorna ({clave: (tipo, momento, datos)}, errores) donde errores es [(partido_id, rival, excepción)].
+    Solo se incluyen las alarmas que todavía no vencieron.
+    """
+    alarmas = {}
+    errores = []
+    for p_id, rival, fecha, edicion_id, nombre_torneo in partidos:
+        try: # Cada partido se protege por separado: si uno falla, los demás se programan igual
+            fecha_local = zona_horaria.localize(fecha)
+            candidatas = [
+                (f"{p_id}:{ALARMA_INSISTENCIA}_{horas}", ALARMA_INSISTENCIA, fecha_local - timedelta(hours=horas),
+                 {'partido_id': p_id, 'rival': rival, 'fecha': fecha_local, 'horas': horas})
+                for horas in HORAS_INSISTENCIA
+            ]
+            candidatas.append((f"{p_id}:{ALARMA_POSICIONES}", ALARMA_POSICIONES, fecha_local - timedelta(hours=HORAS_TABLA_POSICIONES),
+                               {'partido_id': p_id, 'rival': rival, 'edicion_id': edicion_id, 'nombre_torneo': nombre_torneo}))
+            candidatas.append((f"{p_id}:{ALARMA_CUMPLIDORES}", ALARMA_CUMPLIDORES, fecha_local - timedelta(hours=HORAS_RECORDATORIO_CUMPLIDORES),
+                               {'partido_id': p_id, 'rival': rival, 'fecha': fecha_local}))
+
+            for clave, tipo, momento, datos in candidatas:
+                if momento > ahora:
+                    alarmas[clave] = (tipo, momento, datos)
+        except Exception as e:
+            errores.append((p_id, rival, e))
+    return alarmas, errores
+
+class ReconciliadorRecordatorios:
+    """
+    Mantiene sincronizadas las alarmas del job_queue de Telegram, el archivo de la agenda y la base.
+    - acciones: {tipo de alarma: callback del bot}.
+    """
+    def __init__(self, job_queue, acciones, ruta=RUTA_AGENDA):
+        self.job_queue = job_queue
+        self.acciones = acciones
+        self.ruta = ruta
+        self._programadas = {} # clave -> (huella, job)
+
+    def _conectar(self):
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        conexion.execute("""
+            CREATE TABLE IF NOT EXISTS alarmas (
+                clave TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                momento TEXT NOT NULL,
+                datos TEXT NOT NULL
+            )
+        """)
+        return conexion
+
+    def _programar(self, clave, tipo, momento, datos):
+        job = self.job_queue.run_once(
+            self.acciones[tipo],
+            when=momento,
+            data=datos,
+            name=clave,
+            job_kwargs={'misfire_grace_time': SEGUNDOS_GRACIA}
+        )
+        self._programadas[clave] = (self._huella(tipo, momento, datos), job)
+
+    @staticmethod
+    def _huella(tipo, momento, datos):
+        return (tipo, _utc(momento), _a_json(datos))
+
+    def restaurar(self, ahora):
+        """Programa las alarmas guardadas en el archivo que todavía no vencieron (no consulta la base)."""
+        conexion = self._conectar()
+        try:
+            filas = conexion.execute("SELECT clave, tipo, momento, datos FROM alarmas").fetchall()
+        finally:
+            conexion.close()
+
+        restauradas = 0
+        for clave, tipo, momento, datos in filas:
+            momento = datetime.fromisoformat(momento)
+            if momento > ahora and clave not in self._programadas and tipo in self.acciones:
+                self._programar(clave, tipo, momento, _desde_json(datos))
+                restauradas += 1
+        return restauradas
+
+    def reconciliar(self, partidos, zona_horaria, ahora):
+        """
+        Compara las alarmas programadas contra la agenda y aplica solo las diferencias.
+        Retorna {'agregadas', 'movidas', 'canceladas', 'sin_cambios', 'errores'}.
+        - partidos: la agenda leída de la base. None (lectura fallida) no se acepta: se cancelarían todas.
+        """
+        if partidos is None:
+            raise ValueError("No se puede reconciliar contra una agenda que no se pudo leer")
+        deseadas, errores = planificar(partidos, zona_horaria, ahora)
+        resumen = {'agregadas': 0, 'movidas': 0, 'canceladas': 0, 'sin_cambios': 0, 'errores': errores}
+
+        # Las que ya se dispararon (o vencieron) no se cuentan como canceladas
+        for clave in [c for c, (huella, job) in self._programadas.items() if datetime.fromisoformat(huella[1]) <= ahora]:
+            del self._programadas[clave]
+
+        guardar = []
+        borrar = []
+        for clave in list(self._programadas):
+            if clave not in deseadas:
+                self._programadas.pop(clave)[1].schedule_removal()
+                borrar.append((clave,))
+                resumen['canceladas'] += 1
+
+        for clave, (tipo, momento, datos) in deseadas.items():
+            actual = self._programadas.get(clave)
+            if actual and actual[0] == self._huella(tipo, momento, datos):
+                resumen['sin_cambios'] += 1
+                continue
+            if actual:
+                actual[1].schedule_removal()
+                resumen['movidas'] += 1
+            else:
+                resumen['agregadas'] += 1
+            self._programar(clave, tipo, momento, datos)
+            guardar.append((clave, tipo, _utc(momento), _a_json(datos)))
+
+        # El archivo queda igual que lo programado (también se limpian las vencidas)
+        conexion = self._conectar()
+        try:
+            conexion.executemany("DELETE FROM alarmas WHERE clave = ?", borrar)
+            conexion.executemany("INSERT OR REPLACE INTO alarmas (clave, tipo, momento, datos) VALUES (?, ?, ?, ?)", guardar)
+            conexion.execute("DELETE FROM alarmas WHERE momento <= ?", (_utc(ahora),))
+            conexion.commit()
+        finally:
+            conexion.close()
+        return resumen
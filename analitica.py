@@ -0,0 +1,337 @@
+"""
+Instantánea analítica (analytics snapshot) del menú de estadísticas.
+
+Se carga UNA vez por versión de datos con tres consultas (usuarios, partidos jugados y último
+pronóstico de cada usuario por partido) y se guarda en columnas compactas (array).
+Para cada filtro (edición / año) una sola pasada sobre los pronósticos calcula a la vez:
+mufa, falso profeta, optimismo/pesimismo, mejor predictor, estabilidad, mayores errores,
+rachas y firmeza (cambios de pronóstico). Si NumPy está instalado, la pasada es vectorizada
+(nucleo_puntajes.py); si no, se recorre en Python.
+
+Los métodos devuelven las mismas tuplas, en el mismo orden, que las consultas SQL de BaseDeDatos
+(los promedios y porcentajes salen como float en lugar de Decimal).
+La arma y la renueva BaseDeDatos.obtener_instantanea_analitica(); acá no se toca la base.
+"""
+import math
+import threading
+from array import array
+
+import nucleo_puntajes
+from base_de_datos import calcular_rachas
+
+SIN_DATO = 0 # Edición / año faltante en las columnas enteras (los ids y los años arrancan en 1)
+
+# Sumas por usuario que produce cada pasada (en Python o vectorizada) antes de armar los rankings
+SUMAS_POR_USUARIO = [
+    'mufa_n', 'mufa_ok', 'falso_n', 'falso_ok', 'jugados', 'suma_indice', 'suma_indice_cuad', 'suma_error',
+    'firme', 'dudoso', 'cambiante', 'est_filas', 'est_partidos', 'racha_actual', 'racha_record',
+]
+
+class InstantaneaAnalitica:
+    def __init__(self, usuarios, partidos, pronosticos, version=None, vectorizar=None):
+        """
+        - usuarios: [(id, username)]
+        - partidos: [(id, edicion_id, anio_edicion, anio_fecha, fecha_hora, rival, goles_cai, goles_rival)]
+          solo jugados y en orden cronológico (edicion_id / anio_edicion en 0 si el partido no tiene edición)
+        - pronosticos: [(usuario_id, partido_id, pred_cai, pred_rival, fecha_prediccion, cant_intentos)]
+          el último de cada usuario por partido
+        - version: versión de los datos con la que se cargó (la compara BaseDeDatos para saber si sigue vigente)
+        - vectorizar: usar el núcleo de NumPy (por defecto, si está instalado)
+        """
+        self.version = version
+        self.vectorizar = nucleo_puntajes.HAY_NUMPY if vectorizar is None else vectorizar
+
+        # --- USUARIOS (orden binario por username, igual que utf8mb4_bin de TiDB) ---
+        usuarios = sorted(usuarios, key=lambda u: u[1])
+        self.u_nombre = [username for _, username in usuarios]
+        indice_usuario = {uid: i for i, (uid, _) in enumerate(usuarios)}
+        self.indice_username = {username: i for i, username in enumerate(self.u_nombre)}
+
+        # --- PARTIDOS JUGADOS (columnas) ---
+        self.p_edicion = array('i')
+        self.p_anio = array('i')       # Año de la edición (a.numero)
+        self.p_anio_fecha = array('i') # YEAR(p.fecha_hora)
+        self.p_goles_cai = array('i')
+        self.p_goles_rival = array('i')
+        self.p_fecha = []
+        self.p_rival = []
+        indice_partido = {}
+        for pid, edicion_id, anio_edicion, anio_fecha, fecha_hora, rival, goles_cai, goles_rival in partidos:
+            indice_partido[pid] = len(self.p_fecha)
+            self.p_edicion.append(edicion_id or SIN_DATO)
+            self.p_anio.append(anio_edicion or SIN_DATO)
+            self.p_anio_fecha.append(anio_fecha)
+            self.p_goles_cai.append(goles_cai)
+            self.p_goles_rival.append(goles_rival)
+            self.p_fecha.append(fecha_hora)
+            self.p_rival.append(rival)
+
+        # --- ÚLTIMOS PRONÓSTICOS (columnas, agrupados por partido en orden cronológico) ---
+        filas = []
+        for usuario_id, partido_id, pred_cai, pred_rival, fecha_prediccion, cant_intentos in pronosticos:
+            if usuario_id in indice_usuario and partido_id in indice_partido:
+                filas.append((indice_partido[partido_id], indice_usuario[usuario_id], pred_cai, pred_rival, fecha_prediccion, cant_intentos))
+        filas.sort(key=lambda f: (f[0], f[1]))
+
+        self.pr_partido = array('i', (f[0] for f in filas))
+        self.pr_usuario = array('i', (f[1] for f in filas))
+        self.pr_pred_cai = array('i', (f[2] for f in filas))
+        self.pr_pred_rival = array('i', (f[3] for f in filas))
+        self.pr_intentos = array('i', (f[5] or 0 for f in filas))
+        self.pr_fecha = [f[4] for f in filas]
+
+        # Resultados ya calculados por filtro: {(edicion_id, anio): dict}
+        self._por_filtro = {}
+        self._lock = threading.Lock()
+
+    # ---------------- PASADA ÚNICA ----------------
+    def _calcular(self, edicion_id, anio):
+        """Recorre una vez los pronósticos del filtro y arma todos los rankings."""
+        cant_partidos = len(self.p_fecha)
+
+        # Dos criterios de filtro, igual que en SQL:
+        # A) edición, si no año de la edición (a.numero) -> la mayoría de los rankings
+        # B) edición Y año calendario del partido       -> estabilidad y mayores errores
+        en_a = bytearray(cant_partidos)
+        en_b = bytearray(cant_partidos)
+        posicion_a = array('i', [0]) * cant_partidos # Bit de cada partido en las rachas
+        partidos_a = 0
+        for i in range(cant_partidos):
+            if self.p_anio[i] != SIN_DATO:
+                if edicion_id is not None:
+                    en_a[i] = self.p_edicion[i] == edicion_id
+                elif anio is not None:
+                    en_a[i] = self.p_anio[i] == anio
+                else:
+                    en_a[i] = 1
+            if en_a[i]:
+                posicion_a[i] = partidos_a
+                partidos_a += 1
+            en_b[i] = (not edicion_id or self.p_edicion[i] == edicion_id) and (not anio or self.p_anio_fecha[i] == anio)
+
+        if self.vectorizar:
+            sumas = self._pasada_vectorizada(en_a, en_b, posicion_a, partidos_a)
+        else:
+            sumas = self._pasada_python(en_a, en_b, posicion_a, partidos_a)
+        return self._armar_rankings(sumas, partidos_a)
+
+    def _pasada_python(self, en_a, en_b, posicion_a, partidos_a):
+        cant_usuarios = len(self.u_nombre)
+        s = {nombre: [0] * cant_usuarios for nombre in SUMAS_POR_USUARIO}
+        bits = [0] * cant_usuarios
+        errores_valor = array('i')
+        errores_indice = array('i') # Índice del pronóstico
+
+        for k in range(len(self.pr_partido)):
+            ip = self.pr_partido[k]
+            a, b = en_a[ip], en_b[ip]
+            if not (a or b):
+                continue
+            iu = self.pr_usuario[k]
+            pc, pr = self.pr_pred_cai[k], self.pr_pred_rival[k]
+            gc, gr = self.p_goles_cai[ip], self.p_goles_rival[ip]
+            error = abs(gc - pc) + abs(gr - pr)
+
+            if a:
+                if pc < pr:
+                    s['mufa_n'][iu] += 1
+                    s['mufa_ok'][iu] += gc < gr
+                elif pc > pr:
+                    s['falso_n'][iu] += 1
+                    s['falso_ok'][iu] += gc > gr
+                indice = (pc - pr) - (gc - gr)
+                s['jugados'][iu] += 1
+                s['suma_indice'][iu] += indice
+                s['suma_indice_cuad'][iu] += indice * indice
+                s['suma_error'][iu] += error
+                # Sumó puntos si acertó el resultado o alguno de los goles
+                if (gc > gr) - (gc < gr) == (pc > pr) - (pc < pr) or gc == pc or gr == pr:
+                    bits[iu] |= 1 << posicion_a[ip]
+                cant = self.pr_intentos[k]
+                if cant >= 1:
+                    s[('firme', 'dudoso', 'cambiante')[min(cant, 3) - 1]][iu] += 1
+
+            if b:
+                s['est_filas'][iu] += self.pr_intentos[k]
+                s['est_partidos'][iu] += 1
+                if self.p_rival[ip] is not None:
+                    errores_valor.append(error)
+                    errores_indice.append(k)
+
+        for iu in range(cant_usuarios):
+            s['racha_actual'][iu], s['racha_record'][iu] = calcular_rachas(bits[iu], partidos_a)
+        s['errores'] = (errores_valor, errores_indice)
+        return s
+
+    def _pasada_vectorizada(self, en_a, en_b, posicion_a, partidos_a):
+        """La misma pasada con el núcleo de NumPy: máscaras por filtro y sumas agrupadas por usuario."""
+        np = nucleo_puntajes.np
+        columna = nucleo_puntajes.columna
+        sumar = nucleo_puntajes.sumar_por_grupo
+        cant_usuarios = len(self.u_nombre)
+
+        partido = columna(self.pr_partido)
+        usuario = columna(self.pr_usuario)
+        pred_cai = columna(self.pr_pred_cai)
+        pred_rival = columna(self.pr_pred_rival)
+        intentos = columna(self.pr_intentos)
+        goles_cai = columna(self.p_goles_cai)[partido]
+        goles_rival = columna(self.p_goles_rival)[partido]
+        a = columna(en_a, np.uint8)[partido].astype(bool)
+        b = columna(en_b, np.uint8)[partido].astype(bool)
+
+        ev = nucleo_puntajes.evaluar(pred_cai, pred_rival, goles_cai, goles_rival)
+        derrota = a & (pred_cai < pred_rival)
+        victoria = a & (pred_cai > pred_rival)
+        indice = ev['indice'].astype(np.int64)
+
+        s = {
+            'mufa_n': sumar(usuario, None, cant_usuarios, derrota),
+            'mufa_ok': sumar(usuario, goles_cai < goles_rival, cant_usuarios, derrota),
+            'falso_n': sumar(usuario, None, cant_usuarios, victoria),
+            'falso_ok': sumar(usuario, goles_cai > goles_rival, cant_usuarios, victoria),
+            'jugados': sumar(usuario, None, cant_usuarios, a),
+            'suma_indice': sumar(usuario, indice, cant_usuarios, a),
+            'suma_indice_cuad': sumar(usuario, indice * indice, cant_usuarios, a),
+            'suma_error': sumar(usuario, ev['error_absoluto'], cant_usuarios, a),
+            'firme': sumar(usuario, None, cant_usuarios, a & (intentos == 1)),
+            'dudoso': sumar(usuario, None, cant_usuarios, a & (intentos == 2)),
+            'cambiante': sumar(usuario, None, cant_usuarios, a & (intentos >= 3)),
+            'est_filas': sumar(usuario, intentos, cant_usuarios, b),
+            'est_partidos': sumar(usuario, None, cant_usuarios, b),
+        }
+        s['racha_actual'], s['racha_record'] = nucleo_puntajes.rachas_por_usuario(
+            usuario, columna(posicion_a)[partido], a & (ev['puntos'] > 0), cant_usuarios, partidos_a
+        )
+
+        con_rival = np.array([rival is not None for rival in self.p_rival], dtype=bool)
+        elegidos = np.nonzero(b & con_rival[partido])[0]
+        s['errores'] = (
+            array('i', ev['error_absoluto'][elegidos].astype(np.intc).tobytes()),
+            array('i', elegidos.astype(np.intc).tobytes())
+        )
+        return s
+
+    def _armar_rankings(self, s, partidos_a):
+        """Convierte las sumas por usuario en las tuplas ordenadas de cada ranking."""
+        nombres = self.u_nombre
+        usuarios = range(len(nombres))
+        mufa_n, mufa_ok = s['mufa_n'], s['mufa_ok']
+        falso_n, falso_ok = s['falso_n'], s['falso_ok']
+        jugados = s['jugados']
+
+        mufa = sorted(
+            ((nombres[i], mufa_n[i], mufa_ok[i], mufa_ok[i] * 100 / mufa_n[i]) for i in usuarios if mufa_n[i]),
+            key=lambda f: (-f[3], -f[1], f[0])
+        )
+        falso_profeta = sorted(
+            ((nombres[i], falso_n[i], falso_ok[i] * 100 / falso_n[i]) for i in usuarios if falso_n[i]),
+            key=lambda f: (f[2], -f[1], f[0])
+        )
+
+        optimismo = []
+        for i in usuarios:
+            if jugados[i]:
+                promedio = s['suma_indice'][i] / jugados[i]
+                varianza = max(0.0, s['suma_indice_cuad'][i] / jugados[i] - promedio * promedio)
+                optimismo.append((nombres[i], promedio, math.sqrt(varianza)))
+            else:
+                optimismo.append((nombres[i], None, None))
+        optimismo.sort(key=lambda f: (f[1] is None, -(f[1] or 0), f[0]))
+
+        mejor_predictor = sorted(
+            ((nombres[i], s['suma_error'][i] / jugados[i]) for i in usuarios if jugados[i]),
+            key=lambda f: (f[1], f[0])
+        )
+        estabilidad = [(nombres[i], s['est_filas'][i] / s['est_partidos'][i]) for i in usuarios if s['est_partidos'][i]]
+        rachas = [(nombres[i], s['racha_actual'][i], s['racha_record'][i]) for i in usuarios] if partidos_a else []
+
+        return {
+            'mufa': mufa,
+            'falso_profeta': falso_profeta,
+            'optimismo_pesimismo': optimismo,
+            'mejor_predictor': mejor_predictor,
+            'estabilidad': estabilidad,
+            'errores': s['errores'],
+            'rachas': rachas,
+            'partidos_firmeza': partidos_a,
+            'intentos': list(zip(s['firme'], s['dudoso'], s['cambiante'])),
+        }
+
+    def _resultados(self, edicion_id, anio):
+        clave = (edicion_id, anio)
+        resultados = self._por_filtro.get(clave)
+        if resultados is None:
+            with self._lock:
+                resultados = self._por_filtro.get(clave)
+                if resultados is None:
+                    resultados = self._calcular(edicion_id, anio)
+                    self._por_filtro[clave] = resultados
+        return resultados
+
+    # ---------------- RESULTADOS (mismas tuplas que BaseDeDatos) ----------------
+    def ranking_mufa(self, edicion_id=None, anio=None):
+        """(username, predicciones_derrota, derrotas_acertadas, porcentaje_mufa)"""
+        return list(self._resultados(edicion_id, anio)['mufa'])
+
+    def ranking_falso_profeta(self, edicion_id=None, anio=None):
+        """(username, victorias_pronosticadas, porcentaje_acierto)"""
+        return list(self._resultados(edicion_id, anio)['falso_profeta'])
+
+    def indice_optimismo_pesimismo(self, edicion_id=None, anio=None):
+        """(username, indice_promedio, desvio_estandar) de TODOS los usuarios (None si no jugó)"""
+        return list(self._resultados(edicion_id, anio)['optimismo_pesimismo'])
+
+    def ranking_mejor_predictor(self, edicion_id=None, anio=None):
+        """(username, promedio_error)"""
+        return list(self._resultados(edicion_id, anio)['mejor_predictor'])
+
+    def ranking_estabilidad(self, edicion_id=None, anio=None):
+        """(username, promedio_cambios)"""
+        return list(self._resultados(edicion_id, anio)['estabilidad'])
+
+    def rachas(self, edicion_id=None, anio=None):
+        """[(username, racha_actual, racha_record)] ordenado por username ([] si no hay partidos)."""
+        return list(self._resultados(edicion_id, anio)['rachas'])
+
+    def ranking_mayores_errores(self, usuario=None, edicion_id=None, anio=None, limite=10):
+        """
+        (username, rival, fecha_hora, fecha_prediccion, pred_cai, pred_rival, goles_cai, goles_rival, error_abs)
+        Incluye los empates del último puesto, como RANK() <= limite.
+        """
+        valores, indices = self._resultados(edicion_id, anio)['errores']
+        if usuario:
+            iu = self.indice_username.get(usuario, -1)
+            if self.vectorizar:
+                del_usuario = nucleo_puntajes.columna(self.pr_usuario)[nucleo_puntajes.columna(indices)] == iu
+                valores = nucleo_puntajes.columna(valores)[del_usuario]
+                indices = nucleo_puntajes.columna(indices)[del_usuario]
+            else:
+                pares = [(v, k) for v, k in zip(valores, indices) if self.pr_usuario[k] == iu]
+                valores = [v for v, _ in pares]
+                indices = [k for _, k in pares]
+
+        # Desempate por fecha del partido DESC: el índice del partido ya es cronológico
+        errores = sorted(
+            ((int(valores[j]), int(indices[j])) for j in nucleo_puntajes.mayores(valores, limite)),
+            key=lambda e: (-e[0], -self.pr_partido[e[1]])
+        )
+
+        filas = []
+        for error, k in errores:
+            ip = self.pr_partido[k]
+            filas.append((
+                self.u_nombre[self.pr_usuario[k]], self.p_rival[ip], self.p_fecha[ip], self.pr_fecha[k],
+                self.pr_pred_cai[k], self.pr_pred_rival[k], self.p_goles_cai[ip], self.p_goles_rival[ip], error
+            ))
+        return filas
+
+    def estadisticas_firmeza(self, usuario, edicion_id=None, anio=None):
+        """(total_partidos, sin_pronostico, firme, dudoso, cambiante), con None en los conteos si no hay partidos."""
+        resultados = self._resultados(edicion_id, anio)
+        total = resultados['partidos_firmeza']
+        if not total:
+            return (0, None, None, None, None)
+        iu = self.indice_username.get(usuario)
+        firme, dudoso, cambiante = resultados['intentos'][iu] if iu is not None else (0, 0, 0)
+        return (total, total - firme - dudoso - cambiante, firme, dudoso, cambiante)
@@ -3,23 +3,257 @@ import logging
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import sys
+import threading
+import time
+from bisect import bisect_left, insort
 import os # IMPORTANTE: Para encontrar el certificado
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from datetime import datetime, timedelta, timezone
+from pool_conexiones import obtener_pool, ConexionDelLote, TAMANIO_POOL_POR_DEFECTO, EDAD_MAXIMA_CONEXION
+from replica_local import ReplicaLocal, RUTA_REPLICA_LOCAL
+from filtro_consulta import FiltroConsulta
+from sesiones_telegram import CacheSesionesTelegram
+from base_de_datos_cache import (BaseDeDatosCacheada, CacheConsultas, CacheCompartida, CacheEdicionesFinalizadas,
+                                 TAMANIO_MAXIMO_CACHE_MB, TTL_CACHE_CONSULTAS, RUTA_CACHE_COMPARTIDA, RUTA_CACHE_FINALIZADAS)
 
 PUNTOS = 3
 MÁXIMA_CANTIDAD_DE_PUNTOS = 9
 LIMITE_MAYORES_ERRORES = 10
+TAMANIO_PAGINA_PRONOSTICOS = 200 # Filas por página del listado de pronósticos (obtener_pagina_pronosticos)
+
+# Estados del informe de ingresar_resultados
+RESULTADO_ACTUALIZADO = 'actualizado'
+RESULTADO_YA_CARGADO = 'ya_tenia_resultado'
+RESULTADO_RECHAZADO = 'rechazado'
+RESULTADO_SIN_DATOS = 'sin_resultado'
+RESULTADO_INEXISTENTE = 'inexistente'
+RESULTADO_ERROR = 'error'         # La base no aceptó esa fila por otro motivo (ej. 1062: otro partido ese día)
+RESULTADO_PENDIENTE = 'pendiente' # Falló el lote entero: no se guardó, hay que reintentarlo
+ERRORES_DE_TRANSACCION = (1205, 1213, 2006, 2013) # Bloqueos y conexión caída: invalidan todo el lote, no una fila
 MAYOR_ENTERO = 999999999
+TTL_CACHE_RACHAS = 60 # Segundos que se reutiliza el cálculo de rachas de un mismo filtro
+TTL_VERSION_DATOS = 60 # Segundos que se confía en la instantánea analítica sin volver a consultar la versión de datos
+
+# --- TABLA MATERIALIZADA: ÚLTIMO PRONÓSTICO POR USUARIO Y PARTIDO ---
+SQL_CREAR_ULTIMO_PRONOSTICO = """
+    CREATE TABLE IF NOT EXISTS ultimo_pronostico (
+        usuario_id INT NOT NULL,
+        partido_id INT NOT NULL,
+        id INT NOT NULL, -- ID del registro en 'pronosticos'
+        pred_goles_independiente INT NOT NULL,
+        pred_goles_rival INT NOT NULL,
+        fecha_prediccion DATETIME NOT NULL,
+        cant_intentos INT NOT NULL DEFAULT 1,
+        acierto_resultado TINYINT NULL,
+        acierto_cai TINYINT NULL,
+        acierto_rival TINYINT NULL,
+        puntos TINYINT NULL,
+        error_absoluto INT NULL,
+        PRIMARY KEY (usuario_id, partido_id),
+        KEY idx_ultimo_pronostico_partido (partido_id),
+        CONSTRAINT fk_ultimo_pronostico_usuario FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE,
+        CONSTRAINT fk_ultimo_pronostico_partido FOREIGN KEY (partido_id) REFERENCES partidos(id) ON DELETE CASCADE
+    )
+"""
+
+SQL_UPSERT_ULTIMO_PRONOSTICO = """
+    INSERT INTO ultimo_pronostico (usuario_id, partido_id, id, pred_goles_independiente, pred_goles_rival, fecha_prediccion, cant_intentos)
+    SELECT nuevo.usuario_id, nuevo.partido_id, nuevo.id, nuevo.pred_goles_independiente, nuevo.pred_goles_rival, nuevo.fecha_prediccion, 1
+    FROM pronosticos nuevo
+    WHERE nuevo.id = %s
+    ON DUPLICATE KEY UPDATE
+        id = nuevo.id,
+        pred_goles_independiente = nuevo.pred_goles_independiente,
+        pred_goles_rival = nuevo.pred_goles_rival,
+        fecha_prediccion = nuevo.fecha_prediccion,
+        cant_intentos = ultimo_pronostico.cant_intentos + 1
+"""
+
+# --- PUNTAJE GUARDADO POR PRONÓSTICO ---
+# Se calcula una sola vez cuando se carga (o corrige) el resultado del partido.
+# Mientras el partido no se jugó, las columnas quedan en NULL.
+COLUMNAS_PUNTAJE = {
+    'acierto_resultado': "TINYINT NULL", # 1 si acertó ganador/empate
+    'acierto_cai': "TINYINT NULL",       # 1 si acertó los goles del Rojo
+    'acierto_rival': "TINYINT NULL",     # 1 si acertó los goles del rival
+    'puntos': "TINYINT NULL",
+    'error_absoluto': "INT NULL"
+}
+
+# Fórmula en vivo (única fuente de verdad: la usan las lecturas sin columnas guardadas y el recálculo)
+def _sql_acierto_resultado(p="p", pr="pr"):
+    return (f"SIGN(CAST({p}.goles_independiente AS SIGNED) - CAST({p}.goles_rival AS SIGNED)) = "
+            f"SIGN(CAST({pr}.pred_goles_independiente AS SIGNED) - CAST({pr}.pred_goles_rival AS SIGNED))")
+
+def _sql_acierto_cai(p="p", pr="pr"):
+    return f"{p}.goles_independiente = {pr}.pred_goles_independiente"
+
+def _sql_acierto_rival(p="p", pr="pr"):
+    return f"{p}.goles_rival = {pr}.pred_goles_rival"
+
+def _sql_puntos_en_vivo(p="p", pr="pr"):
+    return (f"((CASE WHEN {_sql_acierto_resultado(p, pr)} THEN {PUNTOS} ELSE 0 END) + "
+            f"(CASE WHEN {_sql_acierto_cai(p, pr)} THEN {PUNTOS} ELSE 0 END) + "
+            f"(CASE WHEN {_sql_acierto_rival(p, pr)} THEN {PUNTOS} ELSE 0 END))")
+
+def _sql_error_absoluto_en_vivo(p="p", pr="pr"):
+    return (f"(ABS(CAST({p}.goles_independiente AS SIGNED) - CAST({pr}.pred_goles_independiente AS SIGNED)) + "
+            f"ABS(CAST({p}.goles_rival AS SIGNED) - CAST({pr}.pred_goles_rival AS SIGNED)))")
+
+def _sql_recalcular_puntajes(tabla, condicion):
+    """UPDATE que recalcula las columnas de puntaje de 'tabla' (alias pr) para las filas de la condición."""
+    sin_resultado = "p.goles_independiente IS NULL OR p.goles_rival IS NULL"
+    return f"""
+        UPDATE {tabla} pr
+        INNER JOIN partidos p ON pr.partido_id = p.id
+        SET pr.acierto_resultado = CASE WHEN {sin_resultado} THEN NULL ELSE ({_sql_acierto_resultado()}) END,
+            pr.acierto_cai = CASE WHEN {sin_resultado} THEN NULL ELSE ({_sql_acierto_cai()}) END,
+            pr.acierto_rival = CASE WHEN {sin_resultado} THEN NULL ELSE ({_sql_acierto_rival()}) END,
+            pr.puntos = CASE WHEN {sin_resultado} THEN NULL ELSE {_sql_puntos_en_vivo()} END,
+            pr.error_absoluto = CASE WHEN {sin_resultado} THEN NULL ELSE {_sql_error_absoluto_en_vivo()} END
+        WHERE {condicion}
+    """
+
+# --- TABLA DE POSICIONES PRECALCULADA ---
+# Una fila por usuario y ámbito: la edición, el año calendario del partido o el total histórico.
+# Guarda sumas (no promedios) para poder recalcular cualquier fila sin tocar las demás.
+SQL_CREAR_POSICIONES = """
+    CREATE TABLE IF NOT EXISTS posiciones (
+        ambito VARCHAR(10) NOT NULL, -- 'edicion', 'anio' o 'total'
+        ambito_id INT NOT NULL,      -- ID de la edición, número de año o 0 para el total
+        usuario_id INT NOT NULL,
+        total_puntos INT NOT NULL DEFAULT 0,
+        pts_resultado INT NOT NULL DEFAULT 0,
+        pts_cai INT NOT NULL DEFAULT 0,
+        pts_rival INT NOT NULL DEFAULT 0,
+        partidos_jugados INT NOT NULL DEFAULT 0,
+        suma_anticipacion BIGINT NOT NULL DEFAULT 0, -- Segundos
+        suma_error INT NOT NULL DEFAULT 0,
+        exactos INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (ambito, ambito_id, usuario_id),
+        CONSTRAINT fk_posiciones_usuario FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+    )
+"""
+
+# --- CAMPEONES POR EDICIÓN ---
+# Se escribe al finalizar una edición (o al corregir un partido de una edición ya finalizada).
+# Puede haber más de un campeón si empatan en los 4 criterios.
+SQL_CREAR_CAMPEONES = """
+    CREATE TABLE IF NOT EXISTS campeones (
+        edicion_id INT NOT NULL,
+        usuario_id INT NOT NULL,
+        total_puntos INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (edicion_id, usuario_id),
+        KEY idx_campeones_usuario (usuario_id),
+        CONSTRAINT fk_campeones_edicion FOREIGN KEY (edicion_id) REFERENCES ediciones(id) ON DELETE CASCADE,
+        CONSTRAINT fk_campeones_usuario FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE CASCADE
+    )
+"""
+
+# Expresión sobre 'partidos p' que identifica el ámbito de cada partido
+AMBITOS_POSICIONES = {
+    'edicion': "p.edicion_id",
+    'anio': "YEAR(p.fecha_hora)",
+    'total': "0"
+}
+
+# --- EVOLUCIÓN DE PUESTOS ---
+def calcular_evolucion_puestos(ids_usuarios, partidos, seleccionados):
+    """
+    Puesto de cada usuario seleccionado después de cada partido, manteniendo el ranking ordenado
+    de forma incremental: por partido solo se reubican los usuarios que lo pronosticaron.
+    - ids_usuarios: todos los usuario_id que compiten.
+    - partidos: lista cronológica; cada elemento es [(usuario_id, puntos, error, segundos_anticipacion), ...].
+    - seleccionados: {username: usuario_id} de los usuarios a graficar.
+    Criterios: más puntos, más partidos, menor error promedio, mayor anticipación promedio.
+    Los empatados comparten puesto. Retorna {username: [puesto tras cada partido]}.
+    """
+    puntos = dict.fromkeys(ids_usuarios, 0)
+    jugados = dict.fromkeys(ids_usuarios, 0)
+    suma_error = dict.fromkeys(ids_usuarios, 0.0)
+    suma_anticipacion = dict.fromkeys(ids_usuarios, 0.0)
+
+    def clave(uid):
+        partidos_jug = jugados[uid]
+        if partidos_jug > 0:
+            return (-puntos[uid], -partidos_jug, suma_error[uid] / partidos_jug, -(suma_anticipacion[uid] / partidos_jug))
+        return (-puntos[uid], 0, 999.0, 0.0) # Castigo por no jugar
+
+    claves = {uid: clave(uid) for uid in ids_usuarios}
+    ordenadas = sorted(claves.values())
+    historial = {nombre: [] for nombre in seleccionados}
+
+    # Si cambia más de esta fracción de usuarios, reordenar todo de una es más barato que reubicar uno por uno
+    limite_reubicar = max(1, len(claves) // 8)
+
+    for resultados in partidos:
+        cambiados = []
+        for uid, pts, err, segs in resultados:
+            if uid not in claves:
+                continue
+            puntos[uid] += pts or 0
+            jugados[uid] += 1
+            suma_error[uid] += float(err) if err is not None else 0.0
+            suma_anticipacion[uid] += float(segs) if segs is not None else 0.0
+            cambiados.append(uid)
+
+        if len(cambiados) > limite_reubicar:
+            for uid in cambiados:
+                claves[uid] = clave(uid)
+            ordenadas = sorted(claves.values())
+        else:
+            # Sacamos la clave vieja y ubicamos la nueva: el resto del ranking no se toca
+            for uid in cambiados:
+                del ordenadas[bisect_left(ordenadas, claves[uid])]
+                claves[uid] = clave(uid)
+                insort(ordenadas, claves[uid])
+
+        # Puesto = 1 + cuántos están estrictamente mejor
+        for nombre, uid in seleccionados.items():
+            historial[nombre].append(bisect_left(ordenadas, claves[uid]) + 1)
+
+    return historial
+
+# --- RACHAS ---
+def calcular_rachas(bits, cant_partidos):
+    """
+    Rachas a partir de un bitset: el bit i vale 1 si el usuario sumó puntos en el i-ésimo partido
+    (orden cronológico, el bit más alto es el más reciente).
+    Retorna (racha_actual, racha_record).
+    """
+    mascara = (1 << cant_partidos) - 1
+    # Actual: unos seguidos desde el partido más reciente hasta el primer cero
+    actual = cant_partidos - (~bits & mascara).bit_length()
+
+    # Récord: cada vuelta acorta en 1 todas las tiras de unos; las vueltas hasta vaciar = la más larga
+    record = 0
+    while bits:
+        bits &= bits << 1
+        record += 1
+    return actual, record
 
 # Configuración del Logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class BaseDeDatos:
-    def __init__(self):
-        self.ph = PasswordHasher()
+# --- CONFIGURACIÓN COMPARTIDA POR TODO EL PROCESO ---
+# Se resuelve una sola vez: antes cada BaseDeDatos() volvía a buscar el certificado,
+# releer el .env y crear un PasswordHasher nuevo.
+_configuracion = None
+_hasher = None
+_instancia_compartida = None
+_lock_configuracion = threading.Lock()
+
+def _cargar_configuracion():
+    """Resuelve la carpeta, el certificado y las variables de entorno (solo la primera vez)."""
+    global _configuracion
+    if _configuracion is not None:
+        return _configuracion
+
+    with _lock_configuracion:
+        if _configuracion is not None:
+            return _configuracion
 
         # --- SOLUCIÓN DEL ERROR EN EL EXE ---
         # Detectamos si estamos corriendo en el ejecutable (frozen) o en el script normal
@@ -47,17 +281,118 @@ class BaseDeDatos:
         db_host = os.getenv("DB_HOST", "gateway01.us-east-1.prod.aws.tidbcloud.com") 
         db_name = os.getenv("DB_NAME", "independiente") 
         
-        self.config = {
-            'user': db_user,       
-            'password': db_password, 
-            'host': db_host, 
-            'port': 4000,                                         
-            'database': db_name,          
-            'raise_on_warnings': True,
-            'ssl_ca': ruta_certificado,           
-            'ssl_verify_cert': True,
-            'use_pure': True
+        _configuracion = {
+            'conexion': {
+                'user': db_user,       
+                'password': db_password, 
+                'host': db_host, 
+                'port': 4000,                                         
+                'database': db_name,          
+                'raise_on_warnings': True,
+                'ssl_ca': ruta_certificado,           
+                'ssl_verify_cert': True,
+                'use_pure': True
+            },
+            'tamanio_pool': int(os.getenv("DB_POOL_SIZE", TAMANIO_POOL_POR_DEFECTO)),
+            'edad_maxima_pool': int(os.getenv("DB_POOL_EDAD_MAXIMA", EDAD_MAXIMA_CONEXION)),
+            # Interruptor para leer de la tabla materializada 'ultimo_pronostico' (activar tras el backfill)
+            'usar_ultimo_pronostico': os.getenv("DB_USAR_ULTIMO_PRONOSTICO", "0") == "1",
+            # Interruptor para sumar las columnas de puntaje guardadas en lugar de la fórmula en vivo (activar tras el backfill)
+            'usar_puntajes_guardados': os.getenv("DB_USAR_PUNTAJES_GUARDADOS", "0") == "1",
+            # Interruptor para leer el ranking de la tabla 'posiciones' (activar tras la reconstrucción)
+            'usar_posiciones': os.getenv("DB_USAR_POSICIONES", "0") == "1",
+            # Interruptor para leer los torneos ganados de la tabla 'campeones' (activar tras la reconstrucción)
+            'usar_campeones': os.getenv("DB_USAR_CAMPEONES", "0") == "1",
+            # Interruptor para calcular las estadísticas en memoria con la instantánea analítica (no requiere preparación;
+            # activar a conciencia: los promedios vuelven como float en lugar de Decimal)
+            'usar_instantanea': os.getenv("DB_USAR_INSTANTANEA", "0") == "1",
+            # Cache de resultados de lecturas en memoria (se invalida con cada escritura de este proceso
+            # y, por la versión de datos, con las de los otros procesos)
+            'usar_cache': os.getenv("DB_USAR_CACHE", "1") == "1",
+            'cache_mb': int(os.getenv("DB_CACHE_MB", TAMANIO_MAXIMO_CACHE_MB)),
+            'cache_ttl': int(os.getenv("DB_CACHE_TTL", TTL_CACHE_CONSULTAS)),
+            # Cache compartida entre procesos de la misma máquina (bot + web): archivo SQLite atado a la versión de datos
+            'usar_cache_compartida': os.getenv("DB_USAR_CACHE_COMPARTIDA", "0") == "1",
+            'ruta_cache_compartida': os.getenv("DB_RUTA_CACHE_COMPARTIDA", RUTA_CACHE_COMPARTIDA),
+            # Estadísticas de ediciones finalizadas guardadas en disco para siempre
+            'usar_cache_finalizadas': os.getenv("DB_USAR_CACHE_FINALIZADAS", "1") == "1",
+            'ruta_cache_finalizadas': os.getenv("DB_RUTA_CACHE_FINALIZADAS", RUTA_CACHE_FINALIZADAS),
+            # Réplica SQLite local de las tablas de estadísticas (app de escritorio): la instantánea se arma desde ahí
+            'usar_replica_local': os.getenv("DB_USAR_REPLICA_LOCAL", "0") == "1",
+            'ruta_replica_local': os.getenv("DB_RUTA_REPLICA_LOCAL", RUTA_REPLICA_LOCAL)
         }
+        return _configuracion
+
+def _obtener_hasher():
+    """PasswordHasher compartido (es seguro entre hilos y no guarda estado)."""
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher()
+    return _hasher
+
+def obtener_base_de_datos():
+    """
+    Devuelve la instancia de BaseDeDatos compartida por todo el proceso, creándola la primera vez.
+    La usan la app de escritorio, el despliegue web en Render y el RobotTelegram.
+    Con 'usar_cache' viene envuelta en BaseDeDatosCacheada (mismos métodos, lecturas cacheadas).
+    """
+    global _instancia_compartida
+    if _instancia_compartida is None:
+        instancia = BaseDeDatos()
+        configuracion = _cargar_configuracion()
+        if configuracion['usar_cache']:
+            compartida = None
+            if configuracion['usar_cache_compartida']:
+                compartida = CacheCompartida(instancia.obtener_version_datos, configuracion['ruta_cache_compartida'])
+            finalizadas = None
+            if configuracion['usar_cache_finalizadas']:
+                finalizadas = CacheEdicionesFinalizadas(instancia.obtener_sello_edicion_finalizada, configuracion['ruta_cache_finalizadas'])
+            instancia = BaseDeDatosCacheada(instancia, CacheConsultas(
+                tamanio_maximo=configuracion['cache_mb'] * 1024 * 1024,
+                ttl=configuracion['cache_ttl']
+            ), compartida, finalizadas, instancia.obtener_version_datos)
+        with _lock_configuracion:
+            if _instancia_compartida is None:
+                _instancia_compartida = instancia
+    return _instancia_compartida
+
+class BaseDeDatos:
+    def __init__(self):
+        configuracion = _cargar_configuracion()
+        self.ph = _obtener_hasher()
+        self.config = dict(configuracion['conexion'])
+        self.usar_ultimo_pronostico = configuracion['usar_ultimo_pronostico']
+        self.usar_puntajes_guardados = configuracion['usar_puntajes_guardados']
+        self.usar_posiciones = configuracion['usar_posiciones']
+        self.usar_campeones = configuracion['usar_campeones']
+        self.usar_instantanea = configuracion['usar_instantanea']
+
+        # Rachas calculadas por filtro: {(edicion_id, anio): (momento, resultado)}
+        self._cache_rachas = {}
+
+        # Instantánea analítica vigente y último momento en que se confirmó su versión de datos
+        self._instantanea = None
+        self._instantanea_verificada = 0.0
+
+        # Versión de datos vigente (obtener_version_datos_vigente): (momento, versión)
+        self._version_vigente = None
+        self._lock_instantanea = threading.Lock()
+
+        # Lote de lecturas en curso de cada hilo (obtener_lote): comparten una sola conexión
+        self._lote = threading.local()
+
+        # Identidad de quien le escribe al bot: id de Telegram -> usuario (obtener_sesion_telegram)
+        self.sesiones_telegram = CacheSesionesTelegram()
+
+        # Réplica local de solo lectura (las escrituras siempre van a TiDB)
+        self.replica = ReplicaLocal(configuracion['ruta_replica_local']) if configuracion['usar_replica_local'] else None
+
+        # Pool compartido por todo el proceso (se crea una sola vez por configuración)
+        self.pool = obtener_pool(
+            self.config,
+            tamanio=configuracion['tamanio_pool'],
+            edad_maxima=configuracion['edad_maxima_pool']
+        )
         
     def obtener_hora_argentina(self):
         """Retorna la hora exacta de Argentina (UTC-3) sin importar dónde esté el servidor."""
@@ -66,9 +401,17 @@ class BaseDeDatos:
         return (datetime.now(timezone.utc) - timedelta(hours=3)).replace(tzinfo=None)
 
     def abrir(self):
-        """Abre la conexión a la base de datos de forma segura."""
+        """Toma una conexión del pool. Al llamar a close() vuelve al pool en lugar de cerrarse."""
+        # Dentro de un lote todas las lecturas del hilo usan la misma conexión (se pide recién al necesitarla)
+        if getattr(self._lote, 'activo', False):
+            if self._lote.conexion is None:
+                self._lote.conexion = self._abrir_del_pool()
+            return ConexionDelLote(self._lote.conexion)
+        return self._abrir_del_pool()
+
+    def _abrir_del_pool(self):
         try:
-            conexion = mysql.connector.connect(**self.config)
+            conexion = self.pool.obtener()
             return conexion
         except mysql.connector.Error as err:
             # --- MODIFICACIÓN: Mostrar el error técnico completo en el EXE ---
@@ -79,6 +422,488 @@ class BaseDeDatos:
             else:
                 raise Exception(f"Error de Conexión: {msg}")
 
+    def obtener_lote(self, pedidos, origen=None):
+        """
+        Ejecuta varias lecturas seguidas con UNA sola conexión del pool y devuelve {clave: resultado}.
+        Cada lectura sigue siendo su propia consulta (un viaje a TiDB por método): lo único que se ahorra
+        es el ping y el rollback que cuesta cada préstamo de conexión. Como todas las lecturas van en la
+        misma transacción, además ven la misma foto de los datos.
+        - pedidos: {clave: 'obtener_x'} o {clave: ('obtener_x', {argumentos})}. Solo lecturas (obtener_*).
+        - origen: objeto sobre el que se llaman los métodos (BaseDeDatosCacheada pasa su envoltorio
+          para que las lecturas que están en cache ni siquiera pidan la conexión).
+        Ej: bd.obtener_lote({'ranking': ('obtener_ranking', {'edicion_id': 3}), 'usuarios': 'obtener_usuarios_con_id'})
+        """
+        origen = origen or self
+        llamadas = {}
+        for clave, pedido in pedidos.items():
+            nombre, argumentos = (pedido, {}) if isinstance(pedido, str) else pedido
+            if not nombre.startswith('obtener_') or nombre == 'obtener_lote':
+                raise Exception(f"'{nombre}' no es una lectura que se pueda pedir en un lote.")
+            llamadas[clave] = (getattr(origen, nombre), argumentos)
+
+        # Un lote dentro de otro reutiliza la conexión del de afuera
+        if getattr(self._lote, 'activo', False):
+            return {clave: metodo(**argumentos) for clave, (metodo, argumentos) in llamadas.items()}
+
+        self._lote.activo = True
+        self._lote.conexion = None
+        try:
+            return {clave: metodo(**argumentos) for clave, (metodo, argumentos) in llamadas.items()}
+        finally:
+            conexion = self._lote.conexion
+            self._lote.activo = False
+            self._lote.conexion = None
+            if conexion: conexion.close()
+
+    def obtener_metricas_pool(self):
+        """Devuelve el estado del pool de conexiones y los tiempos de espera para obtener una."""
+        return self.pool.obtener_metricas()
+
+    def obtener_metricas_sesiones(self):
+        """Aciertos, fallos, tasa de aciertos e invalidaciones de la cache de sesiones del bot."""
+        return self.sesiones_telegram.obtener_metricas()
+
+    def _origen_ultimos_pronosticos(self, condicion="", desde_historial=False):
+        """
+        Devuelve la tabla (o subconsulta) con el ÚLTIMO pronóstico de cada usuario por partido.
+        Columnas: id, usuario_id, partido_id, pred_goles_independiente, pred_goles_rival,
+        fecha_prediccion y cant_intentos (cuántas veces lo cargó), más las de COLUMNAS_PUNTAJE
+        si 'usar_puntajes_guardados' está activo.
+        - condicion: filtro opcional sobre 'pronosticos' (ej. "usuario_id = %s") que se aplica adentro.
+        - desde_historial: fuerza el cálculo desde 'pronosticos' (lo usa la reconstrucción).
+        Con 'usar_ultimo_pronostico' se lee la tabla materializada en lugar de agrupar todo el historial.
+        """
+        where_sql = f"WHERE {condicion}" if condicion else ""
+        if self.usar_ultimo_pronostico and not desde_historial:
+            if not condicion:
+                return "ultimo_pronostico"
+            return f"(SELECT * FROM ultimo_pronostico {where_sql})"
+
+        # Con los puntajes guardados activos, la subconsulta también tiene que traer esas columnas
+        columnas_puntaje = ""
+        if self.usar_puntajes_guardados:
+            columnas_puntaje = "".join(f", p1.{columna}" for columna in COLUMNAS_PUNTAJE)
+
+        return f"""(
+                SELECT p1.id, p1.usuario_id, p1.partido_id, p1.pred_goles_independiente,
+                       p1.pred_goles_rival, p1.fecha_prediccion, ult.cant_intentos{columnas_puntaje}
+                FROM pronosticos p1
+                INNER JOIN (
+                    SELECT MAX(id) as max_id, COUNT(*) as cant_intentos
+                    FROM pronosticos
+                    {where_sql}
+                    GROUP BY usuario_id, partido_id
+                ) ult ON p1.id = ult.max_id
+            )"""
+
+    def reconstruir_ultimo_pronostico(self):
+        """
+        Backfill / reparación de 'ultimo_pronostico': la crea si no existe y la vuelve a calcular
+        desde el historial completo de 'pronosticos' en una sola transacción.
+        Retorna la cantidad de filas (usuario, partido) cargadas.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+            # 'IF NOT EXISTS' igual genera un aviso si ya existe (y con raise_on_warnings es una excepción)
+            if not self._columnas_de_tabla(cursor, 'ultimo_pronostico'):
+                cursor.execute(SQL_CREAR_ULTIMO_PRONOSTICO)
+
+            # Calculamos siempre desde el historial, aunque el interruptor esté activado
+            origen = self._origen_ultimos_pronosticos(desde_historial=True)
+
+            cursor.execute("DELETE FROM ultimo_pronostico")
+            cursor.execute(f"""
+                INSERT INTO ultimo_pronostico (usuario_id, partido_id, id, pred_goles_independiente, pred_goles_rival, fecha_prediccion, cant_intentos)
+                SELECT usuario_id, partido_id, id, pred_goles_independiente, pred_goles_rival, fecha_prediccion, cant_intentos
+                FROM {origen} ult_calc
+            """)
+            filas = cursor.rowcount
+            self._recalcular_puntajes(cursor, "1=1", tablas=('ultimo_pronostico',))
+            conexion.commit()
+            logger.info(f"Tabla 'ultimo_pronostico' reconstruida con {filas} filas.")
+            return filas
+        except Exception as e:
+            if conexion: conexion.rollback()
+            logger.error(f"Error reconstruyendo ultimo_pronostico: {e}")
+            raise e
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
+    # --- PUNTAJE GUARDADO POR PRONÓSTICO ---
+    def _sql_puntos(self, p="p", pr="pr"):
+        """Expresión SQL con los puntos del pronóstico: columna guardada o fórmula en vivo."""
+        if self.usar_puntajes_guardados:
+            return f"{pr}.puntos"
+        return _sql_puntos_en_vivo(p, pr)
+
+    def _sql_puntos_resultado(self, p="p", pr="pr"):
+        if self.usar_puntajes_guardados:
+            return f"({pr}.acierto_resultado * {PUNTOS})"
+        return f"(CASE WHEN {_sql_acierto_resultado(p, pr)} THEN {PUNTOS} ELSE 0 END)"
+
+    def _sql_puntos_cai(self, p="p", pr="pr"):
+        if self.usar_puntajes_guardados:
+            return f"({pr}.acierto_cai * {PUNTOS})"
+        return f"(CASE WHEN {_sql_acierto_cai(p, pr)} THEN {PUNTOS} ELSE 0 END)"
+
+    def _sql_puntos_rival(self, p="p", pr="pr"):
+        if self.usar_puntajes_guardados:
+            return f"({pr}.acierto_rival * {PUNTOS})"
+        return f"(CASE WHEN {_sql_acierto_rival(p, pr)} THEN {PUNTOS} ELSE 0 END)"
+
+    def _sql_error_absoluto(self, p="p", pr="pr"):
+        """Expresión SQL con el error absoluto (goles errados en total) del pronóstico."""
+        if self.usar_puntajes_guardados:
+            return f"{pr}.error_absoluto"
+        return _sql_error_absoluto_en_vivo(p, pr)
+
+    def _columnas_de_tabla(self, cursor, tabla):
+        """Devuelve el conjunto de columnas de una tabla (vacío si la tabla no existe)."""
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (tabla,))
+        return {fila[0] for fila in cursor.fetchall()}
+
+    def _recalcular_puntajes(self, cursor, condicion, params=(), tablas=('pronosticos', 'ultimo_pronostico')):
+        """
+        Recalcula las columnas de puntaje de los pronósticos que cumplen la condición (alias 'pr').
+        Se llama dentro de la transacción que escribe el resultado, así nunca quedan desfasados.
+        Si la migración todavía no se corrió, solo avisa (igual que 'ultimo_pronostico').
+        """
+        filas = 0
+        for tabla in tablas:
+            try:
+                cursor.execute(_sql_recalcular_puntajes(tabla, condicion), tuple(params))
+                filas += cursor.rowcount
+            except mysql.connector.Error as err:
+                if err.errno not in (1054, 1146): # 1054 = Falta la columna, 1146 = Falta la tabla
+                    raise
+                logger.warning(f"'{tabla}' no tiene las columnas de puntaje. Ejecutá: python mantenimiento.py recalcular_puntajes")
+        return filas
+
+    def recalcular_puntajes(self):
+        """
+        Migración / backfill de las columnas de puntaje: agrega las que falten en 'pronosticos'
+        y 'ultimo_pronostico' y las recalcula para todo el historial.
+        Retorna la cantidad de filas actualizadas.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+
+            tablas = []
+            for tabla in ('pronosticos', 'ultimo_pronostico'):
+                existentes = self._columnas_de_tabla(cursor, tabla)
+                if not existentes:
+                    continue # 'ultimo_pronostico' puede no estar creada todavía
+                faltantes = [f"ADD COLUMN {columna} {tipo}" for columna, tipo in COLUMNAS_PUNTAJE.items() if columna not in existentes]
+                if faltantes:
+                    cursor.execute(f"ALTER TABLE {tabla} {', '.join(faltantes)}")
+                    logger.info(f"Columnas de puntaje agregadas a '{tabla}'.")
+                tablas.append(tabla)
+
+            filas = self._recalcular_puntajes(cursor, "1=1", tablas=tuple(tablas))
+            conexion.commit()
+            logger.info(f"Puntajes recalculados: {filas} filas.")
+            return filas
+        except Exception as e:
+            if conexion: conexion.rollback()
+            logger.error(f"Error recalculando puntajes: {e}")
+            raise e
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
+    def verificar_puntajes(self, limite=20):
+        """
+        Compara las columnas de puntaje guardadas contra la fórmula en vivo.
+        Retorna {tabla: (cantidad_de_diferencias, [filas de ejemplo])}. Todo en cero = consistente.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor(dictionary=True)
+
+            sin_resultado = "p.goles_independiente IS NULL OR p.goles_rival IS NULL"
+            esperado = {
+                'acierto_resultado': f"(CASE WHEN {sin_resultado} THEN NULL ELSE ({_sql_acierto_resultado()}) END)",
+                'acierto_cai': f"(CASE WHEN {sin_resultado} THEN NULL ELSE ({_sql_acierto_cai()}) END)",
+                'acierto_rival': f"(CASE WHEN {sin_resultado} THEN NULL ELSE ({_sql_acierto_rival()}) END)",
+                'puntos': f"(CASE WHEN {sin_resultado} THEN NULL ELSE {_sql_puntos_en_vivo()} END)",
+                'error_absoluto': f"(CASE WHEN {sin_resultado} THEN NULL ELSE {_sql_error_absoluto_en_vivo()} END)"
+            }
+            # <=> compara también los NULL (un puntaje guardado en un partido sin resultado es un error)
+            diferencias_sql = " OR ".join(f"NOT (pr.{columna} <=> {formula})" for columna, formula in esperado.items())
+            columnas_sql = ", ".join(f"pr.{columna}, {formula} as {columna}_formula" for columna, formula in esperado.items())
+
+            resultado = {}
+            for tabla in ('pronosticos', 'ultimo_pronostico'):
+                if not COLUMNAS_PUNTAJE.keys() <= self._columnas_de_tabla(cursor, tabla):
+                    continue
+                desde = f"FROM {tabla} pr INNER JOIN partidos p ON pr.partido_id = p.id WHERE {diferencias_sql}"
+                cursor.execute(f"SELECT COUNT(*) as cantidad {desde}")
+                cantidad = cursor.fetchone()['cantidad']
+                cursor.execute(f"SELECT pr.id, pr.partido_id, {columnas_sql} {desde} LIMIT %s", (limite,))
+                resultado[tabla] = (cantidad, cursor.fetchall())
+            return resultado
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
+    # --- TABLA DE POSICIONES ---
+    def _sql_calcular_posiciones(self, condicion="1=1", ambito=None):
+        """
+        SELECT que agrega los últimos pronósticos de partidos jugados por usuario (alias 'pr' y 'p').
+        Con 'ambito' agrega las columnas ambito/ambito_id y agrupa también por él.
+        """
+        columnas_ambito = ""
+        agrupar = "pr.usuario_id"
+        if ambito:
+            expresion = AMBITOS_POSICIONES[ambito]
+            columnas_ambito = f"'{ambito}' as ambito, {expresion} as ambito_id,"
+            if ambito != 'total': # GROUP BY 0 se interpretaría como número de columna
+                agrupar = f"{expresion}, pr.usuario_id"
+
+        return f"""
+            SELECT 
+                {columnas_ambito}
+                pr.usuario_id,
+                COALESCE(SUM({self._sql_puntos()}), 0) as total_puntos,
+                COALESCE(SUM({self._sql_puntos_resultado()}), 0) as pts_resultado,
+                COALESCE(SUM({self._sql_puntos_cai()}), 0) as pts_cai,
+                COALESCE(SUM({self._sql_puntos_rival()}), 0) as pts_rival,
+                COUNT(pr.id) as partidos_jugados,
+                COALESCE(SUM(TIMESTAMPDIFF(SECOND, pr.fecha_prediccion, p.fecha_hora)), 0) as suma_anticipacion,
+                COALESCE(SUM({self._sql_error_absoluto()}), 0) as suma_error,
+                COALESCE(SUM(
+                    CASE WHEN p.goles_independiente = pr.pred_goles_independiente 
+                          AND p.goles_rival = pr.pred_goles_rival
+                         THEN 1 ELSE 0 END
+                ), 0) as exactos
+            FROM {self._origen_ultimos_pronosticos()} pr
+            JOIN partidos p ON pr.partido_id = p.id
+            WHERE p.goles_independiente IS NOT NULL 
+              AND p.goles_rival IS NOT NULL
+              AND {condicion}
+            GROUP BY {agrupar}
+        """
+
+    def _sql_insertar_posiciones(self, ambito, condicion="1=1"):
+        return f"""
+            INSERT INTO posiciones (ambito, ambito_id, usuario_id, total_puntos, pts_resultado, pts_cai, pts_rival,
+                                    partidos_jugados, suma_anticipacion, suma_error, exactos)
+            {self._sql_calcular_posiciones(condicion, ambito)}
+        """
+
+    def _ambitos_de_partidos(self, cursor, partido_ids, solo_jugados=False):
+        """Devuelve los ámbitos de 'posiciones' que dependen de esos partidos: {('edicion', id), ('anio', año), ('total', 0)}."""
+        if not partido_ids:
+            return set()
+        placeholders = ', '.join(['%s'] * len(partido_ids))
+        filtro_jugados = "AND goles_independiente IS NOT NULL" if solo_jugados else ""
+        cursor.execute(f"""
+            SELECT DISTINCT edicion_id, YEAR(fecha_hora) FROM partidos
+            WHERE id IN ({placeholders}) {filtro_jugados}
+        """, tuple(partido_ids))
+
+        ambitos = set()
+        for edicion_id, anio in cursor.fetchall():
+            ambitos.update({('edicion', edicion_id), ('anio', anio), ('total', 0)})
+        return ambitos
+
+    def _actualizar_posiciones(self, cursor, ambitos, filtro_usuarios="", params_usuarios=()):
+        """
+        Recalcula las filas de 'posiciones' de esos ámbitos dentro de la transacción del llamador.
+        - filtro_usuarios: subconsulta opcional con los usuario_id afectados (el resto de las filas no cambia).
+        Si la tabla todavía no existe, solo avisa.
+        """
+        if not ambitos:
+            return
+        condicion_usuarios = f" AND usuario_id IN ({filtro_usuarios})" if filtro_usuarios else ""
+        condicion_usuarios_pr = f" AND pr.usuario_id IN ({filtro_usuarios})" if filtro_usuarios else ""
+        try:
+            for ambito, ambito_id in sorted(ambitos):
+                cursor.execute(
+                    f"DELETE FROM posiciones WHERE ambito = %s AND ambito_id = %s{condicion_usuarios}",
+                    (ambito, ambito_id, *params_usuarios)
+                )
+                cursor.execute(
+                    self._sql_insertar_posiciones(ambito, f"{AMBITOS_POSICIONES[ambito]} = %s{condicion_usuarios_pr}"),
+                    (ambito_id, *params_usuarios)
+                )
+        except mysql.connector.Error as err:
+            if err.errno != 1146: # La tabla todavía no fue creada
+                raise
+            logger.warning("La tabla 'posiciones' no existe. Ejecutá: python mantenimiento.py reconstruir_posiciones")
+
+    def _actualizar_posiciones_de_partidos(self, cursor, partido_ids, ambitos_previos=()):
+        """
+        Atajo para cuando cambia el resultado de partidos: solo se recalculan los usuarios que los pronosticaron.
+        Retorna los ámbitos tocados (sirven también para actualizar 'campeones').
+        """
+        if not partido_ids:
+            return set()
+        ambitos = self._ambitos_de_partidos(cursor, partido_ids) | set(ambitos_previos)
+        placeholders = ', '.join(['%s'] * len(partido_ids))
+        self._actualizar_posiciones(
+            cursor, ambitos,
+            f"SELECT usuario_id FROM pronosticos WHERE partido_id IN ({placeholders})", partido_ids
+        )
+        return ambitos
+
+    def reconstruir_posiciones(self):
+        """
+        Reconstrucción completa (auditoría / reparación) de 'posiciones': la crea si no existe
+        y recalcula todos los ámbitos en una sola transacción. Retorna la cantidad de filas.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+            if not self._columnas_de_tabla(cursor, 'posiciones'):
+                cursor.execute(SQL_CREAR_POSICIONES)
+
+            cursor.execute("DELETE FROM posiciones")
+            filas = 0
+            for ambito in AMBITOS_POSICIONES:
+                cursor.execute(self._sql_insertar_posiciones(ambito))
+                filas += cursor.rowcount
+            conexion.commit()
+            logger.info(f"Tabla 'posiciones' reconstruida con {filas} filas.")
+            return filas
+        except Exception as e:
+            if conexion: conexion.rollback()
+            logger.error(f"Error reconstruyendo posiciones: {e}")
+            raise e
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
+    # --- CAMPEONES ---
+    def _sql_puestos_ediciones_finalizadas(self, filtro_sql=""):
+        """
+        WITH que deja en 'RankedUsers' el puesto de cada usuario en cada edición finalizada,
+        con los 4 criterios de desempate. 'filtro_sql' se usa 2 veces (hay que duplicar los params).
+        """
+        return f"""
+            WITH LatestPredictions AS (
+                -- CTE 1: Calcula Puntos, Cantidad de Partidos y Anticipación (usando el ÚLTIMO pronóstico)
+                SELECT 
+                    pr.usuario_id,
+                    p.edicion_id,
+                    SUM({self._sql_puntos()}) as total_puntos,
+                    COUNT(p.id) as cant_partidos,
+                    AVG(TIMESTAMPDIFF(SECOND, pr.fecha_prediccion, p.fecha_hora)) as avg_anticipacion
+                FROM {self._origen_ultimos_pronosticos()} pr
+                JOIN partidos p ON pr.partido_id = p.id
+                JOIN ediciones e ON p.edicion_id = e.id
+                JOIN anios a ON e.anio_id = a.id
+                WHERE p.goles_independiente IS NOT NULL 
+                  AND e.finalizado = TRUE
+                  {filtro_sql}
+                GROUP BY pr.usuario_id, p.edicion_id
+            ),
+            TotalAttempts AS (
+                -- CTE 2: Calcula el total de intentos (historial) para el desempate de eficiencia
+                SELECT 
+                    pr.usuario_id,
+                    p.edicion_id,
+                    COUNT(*) as total_intentos
+                FROM pronosticos pr
+                JOIN partidos p ON pr.partido_id = p.id
+                JOIN ediciones e ON p.edicion_id = e.id
+                JOIN anios a ON e.anio_id = a.id
+                WHERE e.finalizado = TRUE
+                  {filtro_sql}
+                GROUP BY pr.usuario_id, p.edicion_id
+            ),
+            RankedUsers AS (
+                -- CTE 3: Aplica el RANK() con los 4 criterios
+                SELECT 
+                    lp.usuario_id,
+                    lp.edicion_id,
+                    lp.total_puntos,
+                    RANK() OVER (
+                        PARTITION BY lp.edicion_id 
+                        ORDER BY 
+                            lp.total_puntos DESC,           -- 1. Más Puntos
+                            lp.cant_partidos DESC,          -- 2. Más Partidos Jugados
+                            lp.avg_anticipacion DESC,       -- 3. Mayor Anticipación
+                            (COALESCE(ta.total_intentos, 0) / NULLIF(lp.cant_partidos, 0)) ASC -- 4. Menor Promedio Intentos
+                    ) as ranking
+                FROM LatestPredictions lp
+                JOIN TotalAttempts ta ON lp.usuario_id = ta.usuario_id AND lp.edicion_id = ta.edicion_id
+            )
+        """
+
+    def _actualizar_campeones(self, cursor, edicion_ids):
+        """
+        Recalcula los campeones de esas ediciones dentro de la transacción del llamador.
+        Las que no están finalizadas quedan sin campeón. Si la tabla todavía no existe, solo avisa.
+        """
+        edicion_ids = sorted(set(edicion_ids))
+        if not edicion_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(edicion_ids))
+        try:
+            cursor.execute(f"DELETE FROM campeones WHERE edicion_id IN ({placeholders})", tuple(edicion_ids))
+            sql = self._sql_puestos_ediciones_finalizadas(f" AND e.id IN ({placeholders}) ") + """
+                SELECT edicion_id, usuario_id, total_puntos FROM RankedUsers WHERE ranking = 1
+            """
+            cursor.execute(sql, tuple(edicion_ids * 2))
+            ganadores = cursor.fetchall()
+            if ganadores:
+                cursor.executemany(
+                    "INSERT INTO campeones (edicion_id, usuario_id, total_puntos) VALUES (%s, %s, %s)",
+                    [tuple(fila) for fila in ganadores]
+                )
+        except mysql.connector.Error as err:
+            if err.errno != 1146: # La tabla todavía no fue creada
+                raise
+            logger.warning("La tabla 'campeones' no existe. Ejecutá: python mantenimiento.py reconstruir_campeones")
+
+    def _actualizar_campeones_de_ambitos(self, cursor, ambitos):
+        """Campeones de las ediciones incluidas en un conjunto de ámbitos de 'posiciones'."""
+        self._actualizar_campeones(cursor, [ambito_id for ambito, ambito_id in ambitos if ambito == 'edicion'])
+
+    def reconstruir_campeones(self):
+        """
+        Recalcula 'campeones' para todas las ediciones finalizadas (la crea si no existe).
+        Sirve después de corregir datos a mano. Retorna la cantidad de campeones guardados.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+            if not self._columnas_de_tabla(cursor, 'campeones'):
+                cursor.execute(SQL_CREAR_CAMPEONES)
+
+            cursor.execute("DELETE FROM campeones")
+            cursor.execute("SELECT id FROM ediciones WHERE finalizado = TRUE")
+            self._actualizar_campeones(cursor, [fila[0] for fila in cursor.fetchall()])
+            cursor.execute("SELECT COUNT(*) FROM campeones")
+            filas = cursor.fetchone()[0]
+            conexion.commit()
+            logger.info(f"Tabla 'campeones' reconstruida con {filas} campeones.")
+            return filas
+        except Exception as e:
+            if conexion: conexion.rollback()
+            logger.error(f"Error reconstruyendo campeones: {e}")
+            raise e
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
     def obtener_rivales_completo(self):
         """Obtiene ID y Nombre de todos los rivales (Sin 'otro_nombre')."""
         conexion = None
@@ -113,28 +938,50 @@ class BaseDeDatos:
             if cursor: cursor.close()
             if conexion: conexion.close()
     
-    def obtener_usuario_por_telegram(self, id_telegram):
-        """Busca el username de un usuario usando su ID de Telegram."""
+    def obtener_sesion_telegram(self, id_telegram):
+        """
+        Usuario vinculado a un ID de Telegram: {'usuario_id', 'username', 'tipo', 'es_admin'}, o None si no hay.
+        Se guarda en memoria (sesiones_telegram) para no consultar TiDB en cada mensaje del bot.
+        """
+        encontrado, sesion = self.sesiones_telegram.obtener(id_telegram)
+        if encontrado:
+            return sesion
+
         conexion = None
         cursor = None
         try:
             conexion = self.abrir()
-            # Usamos dictionary=True para que devuelva los nombres de columnas
             cursor = conexion.cursor(dictionary=True)
-            sql = "SELECT username FROM usuarios WHERE id_telegram = %s"
+            sql = "SELECT id, username, tipo FROM usuarios WHERE id_telegram = %s"
             cursor.execute(sql, (id_telegram,))
             res = cursor.fetchone()
             
+            sesion = None
             if res:
-                return res['username']
-            return None
+                sesion = {'usuario_id': res['id'], 'username': res['username'], 'tipo': res['tipo'],
+                          'es_admin': res['tipo'] == 'administrador'}
+            self.sesiones_telegram.guardar(id_telegram, sesion)
+            return sesion
         except Exception as e:
+            # Los errores no se guardan: el próximo mensaje vuelve a consultar
             logger.error(f"Error buscando por Telegram ID: {e}")
             return None
         finally:
             if cursor: cursor.close()
             if conexion: conexion.close()
 
+    def obtener_usuario_por_telegram(self, id_telegram):
+        """Busca el username de un usuario usando su ID de Telegram."""
+        sesion = self.obtener_sesion_telegram(id_telegram)
+        return sesion['username'] if sesion else None
+
+    def olvidar_sesion_telegram(self, id_telegram=None, usuario_id=None, username=None):
+        """Descarta la identidad guardada de ese ID de Telegram / usuario (sin argumentos, todas)."""
+        if id_telegram is None and usuario_id is None and username is None:
+            self.sesiones_telegram.limpiar()
+        else:
+            self.sesiones_telegram.invalidar(id_telegram=id_telegram, usuario_id=usuario_id, username=username)
+
     def actualizar_id_telegram(self, username, id_telegram):
         """Vincula el ID de Telegram a la cuenta del usuario en TiDB."""
         conexion = None
@@ -157,6 +1004,8 @@ class BaseDeDatos:
             logger.error(f"Error actualizando ID de Telegram: {e}")
             raise e
         finally:
+            # El ID pudo pasar de una cuenta a otra (aunque falle, parte pudo haberse confirmado)
+            self.olvidar_sesion_telegram(id_telegram=id_telegram, username=username)
             if cursor: cursor.close()
             if conexion: conexion.close()
     
@@ -195,6 +1044,7 @@ class BaseDeDatos:
             sql = "UPDATE rivales SET nombre = %s WHERE id = %s"
             cursor.execute(sql, (nuevo_nombre, id_rival))
             conexion.commit()
+            self._invalidar_caches_analiticos()
             return True
             
         except mysql.connector.Error as e:
@@ -227,6 +1077,7 @@ class BaseDeDatos:
 
             cursor.execute(sql, valores)
             conexion.commit()
+            self._invalidar_caches_analiticos()
             
             logger.info(f"Usuario '{username}' registrado exitosamente.")
             return True
@@ -400,7 +1251,23 @@ class BaseDeDatos:
             """
             
             cursor.execute(consulta, (usuario, id_partido, goles_cai, goles_rival, fecha_hora))
+            id_nuevo = cursor.lastrowid
+
+            # Mantenemos 'ultimo_pronostico' en la misma transacción: el nuevo registro siempre es el último
+            try:
+                cursor.execute(SQL_UPSERT_ULTIMO_PRONOSTICO, (id_nuevo,))
+            except mysql.connector.Error as err:
+                if err.errno != 1146: # 1146 = La tabla todavía no fue creada (falta el backfill)
+                    raise
+                logger.warning("La tabla 'ultimo_pronostico' no existe. Ejecutá: python mantenimiento.py reconstruir_ultimo_pronostico")
+
+            # Si el partido ya tiene resultado (carga fuera de término del admin), el puntaje queda calculado
+            self._recalcular_puntajes(cursor, "pr.id = %s", (id_nuevo,))
+            ambitos = self._ambitos_de_partidos(cursor, [id_partido], solo_jugados=True)
+            self._actualizar_posiciones(cursor, ambitos, "SELECT id FROM usuarios WHERE username = %s", (usuario,))
+
             conexion.commit()
+            self._invalidar_caches_analiticos()
             
         except Exception as e:
             print(f"Error al insertar pronóstico: {e}")
@@ -410,46 +1277,129 @@ class BaseDeDatos:
             conexion.close()
 
     def actualizar_resultados_pendientes(self, lista_jugados):
-        """Actualiza resultados usando directamente el ID de FotMob. Adiós a las búsquedas complejas."""
+        """Actualiza resultados usando directamente el ID de FotMob. Retorna True si se cargó al menos uno (ver ingresar_resultados)."""
+        informe = self.ingresar_resultados(lista_jugados)
+        return RESULTADO_ACTUALIZADO in informe.values()
+
+    def ingresar_resultados(self, lista_jugados):
+        """
+        Carga en bloque los resultados traídos de FotMob (lista de dicts con fotmob_id, goles_cai,
+        goles_rival, fecha, condicion y rival) y devuelve un informe {fotmob_id: estado}:
+            - 'actualizado': se cargó el resultado.
+            - 'ya_tenia_resultado': el partido ya tenía goles; no se toca.
+            - 'rechazado': los datos violan los CHECK de 'partidos' (error 3819, ej. goles negativos).
+            - 'sin_resultado': FotMob todavía no informa los goles.
+            - 'inexistente': el id no está en la tabla 'partidos'.
+            - 'error': la base no aceptó ese partido por otro motivo (ej. 1062 en 'fecha_unica' si FotMob
+              lo movió al día de otro partido); los demás se cargan igual.
+            - 'pendiente': falló el lote entero y no se guardó nada; se puede volver a intentar.
+        El informe tiene una entrada por cada partido recibido.
+        Todo va en una transacción: un SELECT ... FOR UPDATE para clasificar, un único UPDATE con los
+        datos de todos los partidos y un solo recálculo de puntajes, posiciones y campeones para el lote.
+        """
+        informe = {}
+        validos = {}
+        for datos in lista_jugados:
+            fotmob_id = datos['fotmob_id']
+            if datos['goles_cai'] is None or datos['goles_rival'] is None:
+                informe[fotmob_id] = RESULTADO_SIN_DATOS
+            elif datos['goles_cai'] < 0 or datos['goles_rival'] < 0 or datos['condicion'] not in (-1, 0, 1, None):
+                # Mismas reglas que los CHECK de la tabla: se rechaza sin mandarlo a la base
+                logger.warning(f"⚠️ ALERTA API: FotMob envió datos inválidos para el partido vs {datos['rival']}.")
+                informe[fotmob_id] = RESULTADO_RECHAZADO
+            else:
+                validos[fotmob_id] = datos
+
+        if not validos:
+            return informe
+
         conexion = None
         cursor = None
         try:
             conexion = self.abrir()
             cursor = conexion.cursor()
-            count = 0
-
-            for datos in lista_jugados:
-                if datos['goles_cai'] is not None:
-                    try:
-                        sql = """
-                            UPDATE partidos 
-                            SET goles_independiente = %s, goles_rival = %s, fecha_hora = %s, condicion = %s
-                            WHERE id = %s AND goles_independiente IS NULL
-                        """
-                        cursor.execute(sql, (
-                            datos['goles_cai'], 
-                            datos['goles_rival'], 
-                            datos['fecha'],
-                            datos['condicion'],
-                            datos['fotmob_id']
-                        ))
-                        
-                        if cursor.rowcount > 0:
-                            count += 1
-                            
-                    except mysql.connector.Error as err:
-                        if err.errno == 3819:
-                            logger.warning(f"⚠️ ALERTA API: FotMob envió goles negativos para el partido vs {datos['rival']}.")
+
+            # 1. Estado actual de los partidos del lote (bloqueados hasta el commit)
+            ids = list(validos)
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f"SELECT id, goles_independiente FROM partidos WHERE id IN ({placeholders}) FOR UPDATE", ids)
+            existentes = dict(cursor.fetchall())
+
+            pendientes = []
+            for fotmob_id in ids:
+                if fotmob_id not in existentes:
+                    informe[fotmob_id] = RESULTADO_INEXISTENTE
+                elif existentes[fotmob_id] is not None:
+                    informe[fotmob_id] = RESULTADO_YA_CARGADO
+                else:
+                    pendientes.append(validos[fotmob_id])
+
+            # 2. Un solo UPDATE para todo el lote
+            if pendientes:
+                try:
+                    self._actualizar_partidos_en_bloque(cursor, pendientes)
+                    for datos in pendientes:
+                        informe[datos['fotmob_id']] = RESULTADO_ACTUALIZADO
+                except mysql.connector.Error as err:
+                    if err.errno in ERRORES_DE_TRANSACCION:
+                        raise
+                    # Algún partido que la base no acepta (CHECK, UNIQUE...): se repite de a uno para saber cuál fue
+                    for datos in pendientes:
+                        try:
+                            self._actualizar_partidos_en_bloque(cursor, [datos])
+                            informe[datos['fotmob_id']] = RESULTADO_ACTUALIZADO
+                        except mysql.connector.Error as err_fila:
+                            if err_fila.errno in ERRORES_DE_TRANSACCION:
+                                raise
+                            if err_fila.errno == 3819:
+                                logger.warning(f"⚠️ ALERTA API: la base rechazó el resultado del partido vs {datos['rival']}.")
+                                informe[datos['fotmob_id']] = RESULTADO_RECHAZADO
+                            else:
+                                logger.error(f"Error al cargar el resultado del partido vs {datos['rival']} (se sigue con el resto): {err_fila}")
+                                informe[datos['fotmob_id']] = RESULTADO_ERROR
+
+            # 3. Puntajes, posiciones y campeones: una sola vez para todo el lote, en la misma transacción
+            actualizados = [fotmob_id for fotmob_id, estado in informe.items() if estado == RESULTADO_ACTUALIZADO]
+            if actualizados:
+                placeholders = ', '.join(['%s'] * len(actualizados))
+                self._recalcular_puntajes(cursor, f"pr.partido_id IN ({placeholders})", actualizados)
+                ambitos = self._actualizar_posiciones_de_partidos(cursor, actualizados)
+                self._actualizar_campeones_de_ambitos(cursor, ambitos)
 
             conexion.commit()
-            return count > 0
+            if actualizados:
+                self._invalidar_caches_analiticos()
+            return informe
 
         except Exception as e:
-            return False
+            if conexion: conexion.rollback()
+            logger.error(f"Error al ingresar resultados: {e}")
+            # Nada quedó guardado: los que figuraban como actualizados (o no se llegaron a clasificar) quedan pendientes
+            for fotmob_id in validos:
+                if informe.get(fotmob_id) in (None, RESULTADO_ACTUALIZADO):
+                    informe[fotmob_id] = RESULTADO_PENDIENTE
+            return informe
         finally:
             if cursor: cursor.close()
             if conexion: conexion.close()
 
+    def _actualizar_partidos_en_bloque(self, cursor, lista_datos):
+        """UPDATE de varios partidos en una sola sentencia (JOIN contra una tabla armada con los datos)."""
+        filas_sql = " UNION ALL ".join(
+            ["SELECT %s AS id, %s AS goles_cai, %s AS goles_rival, %s AS fecha, %s AS condicion"] * len(lista_datos)
+        )
+        params = []
+        for datos in lista_datos:
+            params += [datos['fotmob_id'], datos['goles_cai'], datos['goles_rival'], datos['fecha'], datos['condicion']]
+
+        cursor.execute(f"""
+            UPDATE partidos p
+            JOIN ({filas_sql}) d ON p.id = d.id
+            SET p.goles_independiente = d.goles_cai, p.goles_rival = d.goles_rival,
+                p.fecha_hora = d.fecha, p.condicion = d.condicion
+            WHERE p.goles_independiente IS NULL
+        """, params)
+
     def obtener_campeonatos_completo(self):
         """Obtiene ID y Nombre de todos los campeonatos."""
         conexion = None
@@ -501,8 +1451,8 @@ class BaseDeDatos:
             conexion = self.abrir()
             cursor = conexion.cursor()
 
-            # Parametros base para las subconsultas de usuario
-            params = [usuario, usuario]
+            # Parametro base para la subconsulta de usuario
+            params = [usuario]
             
             # Lista de condiciones WHERE. Arrancamos con 1=1 para concatenar con AND
             condiciones = ["1=1"]
@@ -535,6 +1485,9 @@ class BaseDeDatos:
             # Unir condiciones
             where_clause = " WHERE " + " AND ".join(condiciones)
 
+            # Último pronóstico del usuario para cada partido
+            origen_pr = self._origen_ultimos_pronosticos("usuario_id = (SELECT id FROM usuarios WHERE username = %s)")
+
             sql = f"""
             SELECT 
                 p.id,
@@ -554,18 +1507,13 @@ class BaseDeDatos:
                 CASE 
                     WHEN p.goles_independiente IS NULL THEN NULL 
                     WHEN pr.pred_goles_independiente IS NULL THEN 0 
-                    ELSE
-                        (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN SIGN(p.goles_independiente - p.goles_rival) = SIGN(pr.pred_goles_independiente - pr.pred_goles_rival) THEN {PUNTOS} ELSE 0 END)
+                    ELSE {self._sql_puntos()}
                 END as tus_puntos,
                 
                 -- ERROR ABSOLUTO
                 CASE 
                     WHEN p.goles_independiente IS NULL OR pr.pred_goles_independiente IS NULL THEN NULL
-                    ELSE
-                        ABS(CAST(p.goles_independiente AS SIGNED) - CAST(pr.pred_goles_independiente AS SIGNED)) + 
-                        ABS(CAST(p.goles_rival AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED))
+                    ELSE {self._sql_error_absoluto()}
                 END as error_absoluto,
                 
                 -- CONDICIÓN (Índice 12)
@@ -577,20 +1525,7 @@ class BaseDeDatos:
             JOIN campeonatos c ON e.campeonato_id = c.id
             JOIN anios a ON e.anio_id = a.id
             
-            LEFT JOIN (
-                SELECT 
-                    p1.partido_id, 
-                    p1.pred_goles_independiente, 
-                    p1.pred_goles_rival
-                FROM pronosticos p1
-                INNER JOIN (
-                    SELECT partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    WHERE usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-                    GROUP BY partido_id
-                ) p2 ON p1.partido_id = p2.partido_id AND p1.fecha_prediccion = p2.max_fecha
-                WHERE p1.usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-            ) pr ON p.id = pr.partido_id
+            LEFT JOIN {origen_pr} pr ON p.id = pr.partido_id
             
             {where_clause}
             ORDER BY p.fecha_hora {orden_sql}
@@ -608,7 +1543,8 @@ class BaseDeDatos:
             if conexion: conexion.close() 
 
     def obtener_agenda_partidos_futuros(self):
-        """Devuelve ID, rival, fecha, edicion_id y nombre del torneo para configurar alarmas."""
+        """Devuelve ID, rival, fecha, edicion_id y nombre del torneo para configurar alarmas.
+        Si la consulta falla retorna None (no []): una agenda vacía cancelaría todas las alarmas."""
         conexion = None
         cursor = None
         try:
@@ -628,7 +1564,7 @@ class BaseDeDatos:
             return cursor.fetchall()
         except Exception as e:
             print(f"Error obteniendo agenda de partidos: {e}")
-            return []
+            return None
         finally:
             if cursor: cursor.close()
             if conexion: conexion.close()
@@ -702,6 +1638,8 @@ class BaseDeDatos:
     def obtener_datos_evolucion_puestos(self, edicion_id, usuarios_seleccionados):
         """
         Calcula la evolución del ranking aplicando los NUEVOS CRITERIOS.
+        Trae todos los resultados de la edición en una sola consulta y arma el ranking
+        partido a partido con calcular_evolucion_puestos.
         """
         conexion = None
         cursor = None
@@ -709,119 +1647,48 @@ class BaseDeDatos:
             conexion = self.abrir()
             cursor = conexion.cursor()
 
-            # 1. Contar total de usuarios
-            cursor.execute("SELECT COUNT(*) FROM usuarios")
-            total_usuarios = cursor.fetchone()[0]
+            # 1. Obtener usuarios
+            cursor.execute("SELECT id, username FROM usuarios")
+            usuarios_bd = cursor.fetchall()
+            total_usuarios = len(usuarios_bd)
+            ids_usuarios = [u[0] for u in usuarios_bd]
+            id_por_nombre = {u[1]: u[0] for u in usuarios_bd}
 
-            # 2. Obtener partidos TERMINADOS ordenados por fecha"
-            sql_partidos = """
-                SELECT id 
-                FROM partidos 
-                WHERE edicion_id = %s 
-                  AND goles_independiente IS NOT NULL 
-                  AND goles_rival IS NOT NULL
-                ORDER BY fecha_hora ASC
+            # 2. Partidos TERMINADOS (en orden) con el último pronóstico de cada usuario, todo junto.
+            # El LEFT JOIN conserva los partidos que nadie pronosticó (también suman un punto del gráfico).
+            origen_pr = self._origen_ultimos_pronosticos("partido_id IN (SELECT id FROM partidos WHERE edicion_id = %s)")
+            sql = f"""
+                SELECT 
+                    p.id,
+                    pr.usuario_id,
+                    {self._sql_puntos()} as puntos,
+                    {self._sql_error_absoluto()} as error_match,
+                    TIMESTAMPDIFF(SECOND, pr.fecha_prediccion, p.fecha_hora) as segundos_anticipacion
+                FROM partidos p
+                LEFT JOIN {origen_pr} pr ON pr.partido_id = p.id
+                WHERE p.edicion_id = %s 
+                  AND p.goles_independiente IS NOT NULL 
+                  AND p.goles_rival IS NOT NULL
+                ORDER BY p.fecha_hora ASC, p.id ASC
             """
-            cursor.execute(sql_partidos, (edicion_id,))
-            partidos = [row[0] for row in cursor.fetchall()]
+            cursor.execute(sql, (edicion_id, edicion_id))
+
+            partidos = []
+            partido_actual = None
+            for partido_id, uid, pts, err, segs in cursor.fetchall():
+                if partido_id != partido_actual:
+                    partido_actual = partido_id
+                    partidos.append([])
+                if uid is not None:
+                    partidos[-1].append((uid, pts, err, segs))
 
             if not partidos:
                 return 0, total_usuarios, {}
 
-            # 3. Obtener usuarios
-            cursor.execute("SELECT id, username FROM usuarios")
-            usuarios_bd = cursor.fetchall()
-            
-            ids_usuarios = [u[0] for u in usuarios_bd]
-            mapa_nombres = {u[0]: u[1] for u in usuarios_bd}
-            
-            # Acumuladores
-            puntos_acumulados = {uid: 0 for uid in ids_usuarios} 
-            cant_partidos_jugados = {uid: 0 for uid in ids_usuarios} 
-            suma_error_absoluto = {uid: 0.0 for uid in ids_usuarios} 
-            suma_anticipacion = {uid: 0.0 for uid in ids_usuarios}   
-            
+            # 3. Ranking incremental (los nombres se resuelven una sola vez)
+            seleccionados = {u: id_por_nombre[u] for u in usuarios_seleccionados if u in id_por_nombre}
             historial_grafico = {user: [] for user in usuarios_seleccionados}
-
-            # 4. Iterar partido a partido
-            for partido_id in partidos:
-                sql_datos_partido = f"""
-                    SELECT 
-                        pr.usuario_id,
-                        -- Puntos
-                        (
-                            (CASE WHEN SIGN(CAST(p.goles_independiente AS SIGNED) - CAST(p.goles_rival AS SIGNED)) = 
-                                       SIGN(CAST(pr.pred_goles_independiente AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED)) 
-                                  THEN {PUNTOS} ELSE 0 END) +
-                            (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                            (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END)
-                        ) as puntos,
-                        -- Error Absoluto del partido
-                        (ABS(p.goles_independiente - pr.pred_goles_independiente) + 
-                         ABS(p.goles_rival - pr.pred_goles_rival)) as error_match,
-                        -- Anticipación (Segundos)
-                        TIMESTAMPDIFF(SECOND, pr.fecha_prediccion, p.fecha_hora) as segundos_anticipacion
-                    
-                    FROM pronosticos pr
-                    JOIN (
-                        SELECT usuario_id, MAX(id) as max_id
-                        FROM pronosticos
-                        WHERE partido_id = %s
-                        GROUP BY usuario_id
-                    ) last_pred ON pr.id = last_pred.max_id
-                    JOIN partidos p ON pr.partido_id = p.id
-                    WHERE p.id = %s
-                """
-                cursor.execute(sql_datos_partido, (partido_id, partido_id))
-                resultados = cursor.fetchall()
-
-                # Actualizar acumulados
-                for uid, pts, err, segs in resultados:
-                    if uid in puntos_acumulados:
-                        puntos_acumulados[uid] += pts
-                        cant_partidos_jugados[uid] += 1
-                        
-                        val_error = float(err) if err is not None else 0.0
-                        suma_error_absoluto[uid] += val_error
-                        
-                        val_sec = float(segs) if segs is not None else 0.0
-                        suma_anticipacion[uid] += val_sec
-
-                # --- CÁLCULO DE RANKING DEL MOMENTO ---
-                def get_sort_key(uid):
-                    pts = puntos_acumulados[uid]
-                    partidos_jug = cant_partidos_jugados[uid]
-                    
-                    if partidos_jug > 0:
-                        avg_error = suma_error_absoluto[uid] / partidos_jug
-                        avg_ant = suma_anticipacion[uid] / partidos_jug
-                    else:
-                        avg_error = 999.0 # Castigo por no jugar
-                        avg_ant = 0.0
-
-                    return (-pts, -partidos_jug, avg_error, -avg_ant)
-
-                # Ordenar
-                ranking_ordenado = sorted(ids_usuarios, key=get_sort_key)
-                
-                # Asignar puestos
-                mapa_puestos = {}
-                prev_key = None
-                puesto_actual = 0
-                
-                for i, uid in enumerate(ranking_ordenado):
-                    current_key = get_sort_key(uid)
-                    if current_key != prev_key:
-                        puesto_actual = i + 1
-                        prev_key = current_key
-                    mapa_puestos[uid] = puesto_actual
-
-                # Guardar historial
-                for usuario_target in usuarios_seleccionados:
-                    target_id = next((k for k, v in mapa_nombres.items() if v == usuario_target), None)
-                    if target_id:
-                        puesto = mapa_puestos.get(target_id, total_usuarios)
-                        historial_grafico[usuario_target].append(puesto)
+            historial_grafico.update(calcular_evolucion_puestos(ids_usuarios, partidos, seleccionados))
 
             return len(partidos), total_usuarios, historial_grafico
 
@@ -871,18 +1738,8 @@ class BaseDeDatos:
                 SELECT 
                     pr.partido_id,
                     u.username,
-                    (CASE WHEN SIGN(CAST(p.goles_independiente AS SIGNED) - CAST(p.goles_rival AS SIGNED)) = 
-                               SIGN(CAST(pr.pred_goles_independiente AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED)) 
-                          THEN {PUNTOS} ELSE 0 END) +
-                    (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                    (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) as puntos_partido
-                FROM pronosticos pr
-                
-                INNER JOIN (
-                    SELECT MAX(id) as max_id
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) ultimos ON pr.id = ultimos.max_id
+                    {self._sql_puntos()} as puntos_partido
+                FROM {self._origen_ultimos_pronosticos()} pr
                 
                 JOIN partidos p ON pr.partido_id = p.id
                 JOIN usuarios u ON pr.usuario_id = u.id
@@ -932,36 +1789,25 @@ class BaseDeDatos:
             conexion = self.abrir()
             cursor = conexion.cursor()
 
+            origen_pr = self._origen_ultimos_pronosticos("usuario_id = (SELECT id FROM usuarios WHERE username = %s)")
+
             sql = f"""
             SELECT 
                 CASE 
                     WHEN p.goles_independiente IS NULL THEN 0
                     WHEN pr.pred_goles_independiente IS NULL THEN 0
-                    ELSE
-                        (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN SIGN(p.goles_independiente - p.goles_rival) = SIGN(pr.pred_goles_independiente - pr.pred_goles_rival) THEN {PUNTOS} ELSE 0 END)
+                    ELSE {self._sql_puntos()}
                 END as puntos
             FROM partidos p
             -- Subconsulta para obtener SOLO el último pronóstico del usuario para cada partido
-            LEFT JOIN (
-                SELECT p1.partido_id, p1.pred_goles_independiente, p1.pred_goles_rival
-                FROM pronosticos p1
-                INNER JOIN (
-                    SELECT partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    WHERE usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-                    GROUP BY partido_id
-                ) p2 ON p1.partido_id = p2.partido_id AND p1.fecha_prediccion = p2.max_fecha
-                WHERE p1.usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-            ) pr ON p.id = pr.partido_id
+            LEFT JOIN {origen_pr} pr ON p.id = pr.partido_id
             WHERE p.edicion_id = %s 
               AND p.goles_independiente IS NOT NULL
             ORDER BY p.fecha_hora ASC
             """
             
-            # Pasamos 'usuario' dos veces (para las subconsultas) y luego 'edicion_id'
-            cursor.execute(sql, (usuario, usuario, edicion_id))
+            # Pasamos 'usuario' (para la subconsulta) y luego 'edicion_id'
+            cursor.execute(sql, (usuario, edicion_id))
             resultados = cursor.fetchall()
             
             return [row[0] for row in resultados]
@@ -982,6 +1828,7 @@ class BaseDeDatos:
         4. Eficiencia / Promedio Intentos (Menor).
         
         Solo cuenta torneos finalizados (e.finalizado = TRUE).
+        Con 'usar_campeones' lee los campeones ya guardados en lugar de recalcular cada edición.
         """
         conexion = None
         cursor = None
@@ -996,66 +1843,28 @@ class BaseDeDatos:
                 filtro_anio = " AND a.numero = %s "
                 params.append(anio)
 
-            sql = f"""
-            WITH LatestPredictions AS (
-                -- CTE 1: Calcula Puntos, Cantidad de Partidos y Anticipación (usando el ÚLTIMO pronóstico)
-                SELECT 
-                    pr.usuario_id,
-                    p.edicion_id,
-                    SUM(
-                        (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN SIGN(p.goles_independiente - p.goles_rival) = SIGN(pr.pred_goles_independiente - pr.pred_goles_rival) THEN {PUNTOS} ELSE 0 END)
-                    ) as total_puntos,
-                    COUNT(p.id) as cant_partidos,
-                    AVG(TIMESTAMPDIFF(SECOND, pr.fecha_prediccion, p.fecha_hora)) as avg_anticipacion
-                FROM pronosticos pr
-                INNER JOIN (
-                    -- Filtro para obtener solo el último pronóstico por partido/usuario
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) last_pr ON pr.usuario_id = last_pr.usuario_id 
-                         AND pr.partido_id = last_pr.partido_id 
-                         AND pr.fecha_prediccion = last_pr.max_fecha
-                JOIN partidos p ON pr.partido_id = p.id
-                JOIN ediciones e ON p.edicion_id = e.id
-                JOIN anios a ON e.anio_id = a.id
-                WHERE p.goles_independiente IS NOT NULL 
-                  AND e.finalizado = TRUE
-                  {filtro_anio}
-                GROUP BY pr.usuario_id, p.edicion_id
-            ),
-            TotalAttempts AS (
-                -- CTE 2: Calcula el total de intentos (historial) para el desempate de eficiencia
-                SELECT 
-                    pr.usuario_id,
-                    p.edicion_id,
-                    COUNT(*) as total_intentos
-                FROM pronosticos pr
-                JOIN partidos p ON pr.partido_id = p.id
-                JOIN ediciones e ON p.edicion_id = e.id
-                JOIN anios a ON e.anio_id = a.id
-                WHERE e.finalizado = TRUE
-                  {filtro_anio}
-                GROUP BY pr.usuario_id, p.edicion_id
-            ),
-            RankedUsers AS (
-                -- CTE 3: Aplica el RANK() con los 4 criterios
+            if self.usar_campeones:
+                # Las ediciones finalizadas no cambian: sus campeones ya están guardados
+                sql = f"""
                 SELECT 
-                    lp.usuario_id,
-                    lp.edicion_id,
-                    RANK() OVER (
-                        PARTITION BY lp.edicion_id 
-                        ORDER BY 
-                            lp.total_puntos DESC,           -- 1. Más Puntos
-                            lp.cant_partidos DESC,          -- 2. Más Partidos Jugados
-                            lp.avg_anticipacion DESC,       -- 3. Mayor Anticipación
-                            (COALESCE(ta.total_intentos, 0) / NULLIF(lp.cant_partidos, 0)) ASC -- 4. Menor Promedio Intentos
-                    ) as ranking
-                FROM LatestPredictions lp
-                JOIN TotalAttempts ta ON lp.usuario_id = ta.usuario_id AND lp.edicion_id = ta.edicion_id
-            )
+                    u.username,
+                    COUNT(c.edicion_id) as copas
+                FROM usuarios u
+                LEFT JOIN (
+                    SELECT c.edicion_id, c.usuario_id
+                    FROM campeones c
+                    JOIN ediciones e ON c.edicion_id = e.id
+                    JOIN anios a ON e.anio_id = a.id
+                    WHERE e.finalizado = TRUE
+                      {filtro_anio}
+                ) c ON u.id = c.usuario_id
+                GROUP BY u.id, u.username
+                ORDER BY copas DESC, u.username ASC
+                """
+                cursor.execute(sql, tuple(params))
+                return cursor.fetchall()
+
+            sql = self._sql_puestos_ediciones_finalizadas(filtro_anio) + """
             -- Consulta Final: Cuenta cuántas veces quedó 1º cada usuario
             SELECT 
                 u.username,
@@ -1075,133 +1884,298 @@ class BaseDeDatos:
         finally:
             if cursor: cursor.close()
             if conexion: conexion.close()
-            
-    def obtener_usuarios(self):
-        """Obtiene la lista de nombres de usuario registrados."""
+            
+    def obtener_usuarios(self):
+        """Obtiene la lista de nombres de usuario registrados."""
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+            # Ordenamos alfabéticamente
+            cursor.execute("SELECT username FROM usuarios ORDER BY username ASC")
+            # Retornamos una lista simple de strings
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error obteniendo usuarios: {e}")
+            return []
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+    
+    def _calcular_rachas(self, edicion_id=None, anio=None):
+        """
+        Motor común de rachas: una sola pasada para la racha actual y el récord de todos los usuarios.
+        En lugar de cruzar usuarios x partidos, trae la lista de partidos jugados y solo los pronósticos
+        que sumaron puntos, y arma un bitset por usuario.
+        Retorna [(username, racha_actual, racha_record)] ordenado por username ([] si no hay partidos).
+        El resultado se reutiliza TTL_CACHE_RACHAS segundos (o hasta que se cargue un resultado/pronóstico).
+        """
+        datos = self._desde_instantanea('rachas', edicion_id, anio)
+        if datos is not None:
+            return datos
+
+        clave = (edicion_id, anio)
+        en_cache = self._cache_rachas.get(clave)
+        if en_cache and time.monotonic() - en_cache[0] < TTL_CACHE_RACHAS:
+            return en_cache[1]
+
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+
+            params = []
+            filtro_sql = ""
+
+            if edicion_id is not None:
+                filtro_sql = " AND p.edicion_id = %s "
+                params.append(edicion_id)
+            elif anio is not None:
+                filtro_sql = " AND a.numero = %s "
+                params.append(anio)
+
+            desde_partidos = """
+                FROM partidos p
+                JOIN ediciones e ON p.edicion_id = e.id
+                JOIN anios a ON e.anio_id = a.id
+            """
+
+            # 1. Partidos jugados del filtro, en orden cronológico (cada uno es un bit)
+            cursor.execute(f"""
+                SELECT p.id {desde_partidos}
+                WHERE p.goles_independiente IS NOT NULL {filtro_sql}
+                ORDER BY p.fecha_hora ASC, p.id ASC
+            """, tuple(params))
+            posicion = {fila[0]: i for i, fila in enumerate(cursor.fetchall())}
+            if not posicion:
+                resultado = []
+            else:
+                # 2. Solo los pronósticos que sumaron (no pronosticar o sacar 0 corta la racha)
+                cursor.execute(f"""
+                    SELECT pr.usuario_id, p.id {desde_partidos}
+                    JOIN {self._origen_ultimos_pronosticos()} pr ON pr.partido_id = p.id
+                    WHERE p.goles_independiente IS NOT NULL {filtro_sql}
+                      AND {self._sql_puntos()} > 0
+                """, tuple(params))
+                bits = {}
+                for usuario_id, partido_id in cursor.fetchall():
+                    bits[usuario_id] = bits.get(usuario_id, 0) | (1 << posicion[partido_id])
+
+                # 3. Todos los usuarios compiten (los que nunca sumaron quedan en 0)
+                cursor.execute("SELECT id, username FROM usuarios ORDER BY username ASC")
+                resultado = []
+                for usuario_id, username in cursor.fetchall():
+                    actual, record = calcular_rachas(bits.get(usuario_id, 0), len(posicion))
+                    resultado.append((username, actual, record))
+
+            self._cache_rachas[clave] = (time.monotonic(), resultado)
+            return resultado
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
+    def _invalidar_caches_analiticos(self):
+        """Se llama después de confirmar un cambio en pronósticos, partidos, rivales, ediciones o usuarios."""
+        self._cache_rachas.clear()
+        self._instantanea = None
+        self._version_vigente = None
+
+    # ---------------- INSTANTÁNEA ANALÍTICA ----------------
+    def _version_datos(self, cursor):
+        """
+        Huella barata de los datos que usan las estadísticas y las listas de referencia. Cambia si
+        cualquier proceso (el bot, la app de escritorio o la web) carga un pronóstico, un resultado
+        o edita usuarios / rivales / torneos / ediciones / años.
+        'pronosticos' solo se lee por índice (MAX del id y COUNT); el resto son tablas chicas.
+        """
+        cursor.execute("""
+            SELECT
+                (SELECT COALESCE(MAX(id), 0) FROM pronosticos),
+                (SELECT COUNT(*) FROM pronosticos),
+                (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, edicion_id, rival_id, condicion, fecha_hora, goles_independiente, goles_rival))), 0) FROM partidos),
+                (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, username))), 0) FROM usuarios),
+                (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, nombre))), 0) FROM rivales),
+                (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, nombre))), 0) FROM campeonatos),
+                (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, numero))), 0) FROM anios),
+                (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, campeonato_id, anio_id, finalizado))), 0) FROM ediciones)
+        """)
+        return cursor.fetchone()
+
+    def obtener_version_datos(self):
+        """Versión actual de los datos (ver _version_datos). La usa la cache compartida entre procesos."""
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+            return self._version_datos(cursor)
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
+    def obtener_version_datos_vigente(self):
+        """
+        Versión de datos consultada a lo sumo cada TTL_VERSION_DATOS segundos (las escrituras de este
+        proceso la descartan al instante). Sirve de clave para guardar resultados ya armados,
+        como el texto de la tabla de posiciones del bot.
+        """
+        vigente = self._version_vigente
+        if vigente and time.monotonic() - vigente[0] < TTL_VERSION_DATOS:
+            return vigente[1]
+        version = self.obtener_version_datos()
+        self._version_vigente = (time.monotonic(), version)
+        return version
+
+    def obtener_sello_edicion_finalizada(self, edicion_id):
+        """
+        Si la edición está finalizada, devuelve un sello (texto) de todo lo que puede cambiar sus
+        estadísticas: sus partidos, sus pronósticos (el admin puede cargar uno fuera de término), los
+        nombres de sus rivales y los nombres de usuario. Si no está finalizada devuelve None.
+        Lo usa la cache permanente de ediciones finalizadas para no servir datos de otra versión.
+        """
         conexion = None
         cursor = None
         try:
             conexion = self.abrir()
             cursor = conexion.cursor()
-            # Ordenamos alfabéticamente
-            cursor.execute("SELECT username FROM usuarios ORDER BY username ASC")
-            # Retornamos una lista simple de strings
-            return [row[0] for row in cursor.fetchall()]
-        except Exception as e:
-            logger.error(f"Error obteniendo usuarios: {e}")
-            return []
+            cursor.execute("""
+                SELECT
+                    e.finalizado,
+                    (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, rival_id, condicion, fecha_hora, goles_independiente, goles_rival))), 0)
+                     FROM partidos WHERE edicion_id = e.id),
+                    (SELECT COUNT(*) FROM partidos WHERE edicion_id = e.id),
+                    (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', id, username))), 0) FROM usuarios),
+                    (SELECT CONCAT(COUNT(*), ':', COALESCE(MAX(pr.id), 0)) FROM pronosticos pr
+                     JOIN partidos pp ON pr.partido_id = pp.id WHERE pp.edicion_id = e.id),
+                    -- Mayores errores muestra el nombre del rival: renombrarlo también invalida
+                    (SELECT COALESCE(SUM(CRC32(CONCAT_WS(',', r.id, r.nombre))), 0) FROM rivales r
+                     WHERE r.id IN (SELECT rival_id FROM partidos WHERE edicion_id = e.id))
+                FROM ediciones e
+                WHERE e.id = %s
+            """, (edicion_id,))
+            fila = cursor.fetchone()
+            if not fila or not fila[0]:
+                return None
+            return "|".join(str(valor) for valor in fila[1:])
         finally:
             if cursor: cursor.close()
             if conexion: conexion.close()
-    
-    def obtener_racha_actual(self, edicion_id=None, anio=None):
+
+    def obtener_instantanea_analitica(self):
         """
-        Calcula la racha actual (partidos consecutivos sumando puntos).
-        Si el torneo finalizó, calcula la racha con la que el usuario terminó el torneo.
+        Devuelve la InstantaneaAnalitica vigente, cargándola si hace falta.
+        - Dentro de TTL_VERSION_DATOS segundos desde la última verificación se usa sin consultar nada.
+        - Pasado ese tiempo se consulta la versión de datos: si no cambió, se sigue usando la misma.
+        - Las escrituras de este proceso la descartan al instante (_invalidar_caches_analiticos).
+        - Con la réplica local activa se sincroniza lo nuevo y los datos se leen de la copia SQLite.
+        """
+        instantanea = self._instantanea
+        if instantanea and time.monotonic() - self._instantanea_verificada < TTL_VERSION_DATOS:
+            return instantanea
+
+        from analitica import InstantaneaAnalitica
+
+        with self._lock_instantanea:
+            # Otro hilo pudo haberla renovado mientras esperábamos
+            instantanea = self._instantanea
+            if instantanea and time.monotonic() - self._instantanea_verificada < TTL_VERSION_DATOS:
+                return instantanea
+
+            conexion = None
+            cursor = None
+            try:
+                conexion = self.abrir()
+                cursor = conexion.cursor()
+
+                version = self._version_datos(cursor)
+                if (instantanea is None or instantanea.version != version) and self.replica:
+                    # Solo viaja lo que cambió; el resto se lee del archivo local
+                    self.replica.sincronizar(cursor, version)
+                    usuarios, partidos, pronosticos = self.replica.datos_instantanea()
+                    instantanea = InstantaneaAnalitica(usuarios, partidos, pronosticos, version)
+                elif instantanea is None or instantanea.version != version:
+                    cursor.execute("SELECT id, username FROM usuarios")
+                    usuarios = cursor.fetchall()
+
+                    cursor.execute("""
+                        SELECT p.id, p.edicion_id, a.numero, YEAR(p.fecha_hora), p.fecha_hora,
+                               r.nombre, p.goles_independiente, p.goles_rival
+                        FROM partidos p
+                        LEFT JOIN ediciones e ON p.edicion_id = e.id
+                        LEFT JOIN anios a ON e.anio_id = a.id
+                        LEFT JOIN rivales r ON p.rival_id = r.id
+                        WHERE p.goles_independiente IS NOT NULL AND p.goles_rival IS NOT NULL
+                        ORDER BY p.fecha_hora ASC, p.id ASC
+                    """)
+                    partidos = cursor.fetchall()
+
+                    cursor.execute(f"""
+                        SELECT pr.usuario_id, pr.partido_id, pr.pred_goles_independiente, pr.pred_goles_rival,
+                               pr.fecha_prediccion, pr.cant_intentos
+                        FROM {self._origen_ultimos_pronosticos()} pr
+                        JOIN partidos p ON pr.partido_id = p.id
+                        WHERE p.goles_independiente IS NOT NULL AND p.goles_rival IS NOT NULL
+                    """)
+                    pronosticos = cursor.fetchall()
+
+                    instantanea = InstantaneaAnalitica(usuarios, partidos, pronosticos, version)
+
+                self._instantanea = instantanea
+                self._instantanea_verificada = time.monotonic()
+                return instantanea
+            finally:
+                if cursor: cursor.close()
+                if conexion: conexion.close()
+
+    def sincronizar_replica_local(self, desde_cero=False):
         """
+        Trae a la réplica local lo que cambió en TiDB (con desde_cero la copia entera).
+        Retorna la cantidad de filas copiadas. Requiere DB_USAR_REPLICA_LOCAL=1.
+        """
+        if not self.replica:
+            raise Exception("La réplica local no está activa (DB_USAR_REPLICA_LOCAL=1).")
+        if desde_cero:
+            self.replica.borrar()
         conexion = None
         cursor = None
         try:
             conexion = self.abrir()
             cursor = conexion.cursor()
+            return self.replica.sincronizar(cursor, self._version_datos(cursor))
+        except Exception as e:
+            logger.error(f"Error al sincronizar la réplica local: {e}")
+            raise e
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
 
-            params = []
-            filtro_sql = ""
-
-            if edicion_id is not None:
-                filtro_sql = " AND p.edicion_id = %s "
-                params.append(edicion_id)
-            elif anio is not None:
-                filtro_sql = " AND a.numero = %s "
-                params.append(anio)
-
-            # Lógica:
-            # 1. Obtenemos TODOS los partidos jugados (goles no nulos) del filtro.
-            # 2. Cruzamos con Usuarios para evaluar partido a partido.
-            # 3. Ordenamos por Fecha DESC (Del último partido jugado hacia atrás).
-            sql = f"""
-            SELECT 
-                u.username,
-                p.fecha_hora,
-                CASE 
-                    WHEN pr.pred_goles_independiente IS NULL THEN 0 -- Si no pronosticó, rompe racha
-                    ELSE
-                        (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN SIGN(p.goles_independiente - p.goles_rival) = SIGN(pr.pred_goles_independiente - pr.pred_goles_rival) THEN {PUNTOS} ELSE 0 END)
-                END as puntos
-            FROM usuarios u
-            CROSS JOIN partidos p 
-            JOIN ediciones e ON p.edicion_id = e.id
-            JOIN anios a ON e.anio_id = a.id
-            LEFT JOIN (
-                SELECT p1.usuario_id, p1.partido_id, p1.pred_goles_independiente, p1.pred_goles_rival
-                FROM pronosticos p1
-                INNER JOIN (
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) p2 ON p1.usuario_id = p2.usuario_id 
-                    AND p1.partido_id = p2.partido_id 
-                    AND p1.fecha_prediccion = p2.max_fecha
-            ) pr ON u.id = pr.usuario_id AND p.id = pr.partido_id
-            WHERE 
-                p.goles_independiente IS NOT NULL -- Solo partidos que ya se jugaron
-                {filtro_sql}
-            ORDER BY u.username ASC, p.fecha_hora DESC
-            """
-            
-            cursor.execute(sql, tuple(params))
-            resultados = cursor.fetchall()
-            
-            # --- Cálculo de Racha ---
-            rachas = []
-            
-            if resultados:
-                usuario_actual = None
-                racha_actual = 0
-                racha_activa = True 
-                
-                for row in resultados:
-                    user = row[0]
-                    puntos = row[2]
-                    
-                    if user != usuario_actual:
-                        # Guardar racha del usuario anterior
-                        if usuario_actual is not None:
-                            rachas.append((usuario_actual, racha_actual))
-                        
-                        # Iniciar nuevo usuario
-                        usuario_actual = user
-                        racha_actual = 0
-                        racha_activa = True
-                        
-                        # Evaluamos el partido MÁS RECIENTE del filtro
-                        if puntos > 0:
-                            racha_actual += 1
-                        else:
-                            racha_activa = False # Si falló el último, racha actual es 0
-                    else:
-                        # Partidos anteriores (hacia atrás en el tiempo)
-                        if racha_activa:
-                            if puntos > 0:
-                                racha_actual += 1
-                            else:
-                                racha_activa = False # Se cortó la racha aquí
-                
-                # Guardar el último usuario del loop
-                if usuario_actual is not None:
-                    rachas.append((usuario_actual, racha_actual))
+    def _desde_instantanea(self, metodo, *args):
+        """
+        Resuelve una estadística con la instantánea analítica si 'usar_instantanea' está activo.
+        Retorna None si está apagado o si falla (y el método sigue con su consulta SQL).
+        """
+        if not self.usar_instantanea:
+            return None
+        try:
+            return getattr(self.obtener_instantanea_analitica(), metodo)(*args)
+        except Exception as e:
+            logger.error(f"Error en la instantánea analítica ({metodo}), se calcula con SQL: {e}")
+            return None
 
+    def obtener_racha_actual(self, edicion_id=None, anio=None):
+        """
+        Calcula la racha actual (partidos consecutivos sumando puntos).
+        Si el torneo finalizó, calcula la racha con la que el usuario terminó el torneo.
+        """
+        try:
+            rachas = [(username, actual) for username, actual, _ in self._calcular_rachas(edicion_id, anio)]
             # Ordenar por quien tiene la racha activa más larga
             return sorted(rachas, key=lambda x: x[1], reverse=True)
-
         except Exception as e:
             logger.error(f"Error calculando racha actual: {e}")
             return []
-        finally:
-            if cursor: cursor.close()
-            if conexion: conexion.close()
     
     def insertar_partido_manual(self, edicion_id, rival_id, condicion, fecha_str, goles_cai, goles_rival):
         """
@@ -1227,6 +2201,7 @@ class BaseDeDatos:
             
             cursor.execute(query, valores)
             conexion.commit()
+            self._invalidar_caches_analiticos()
             
         except Exception as e:
             conexion.rollback()
@@ -1264,6 +2239,7 @@ class BaseDeDatos:
             cursor = conexion.cursor()
             cursor.execute("UPDATE rivales SET nombre = %s WHERE id = %s", (nombre, rival_id))
             conexion.commit()
+            self._invalidar_caches_analiticos()
         finally:
             if 'cursor' in locals() and cursor: cursor.close()
             if conexion: conexion.close()
@@ -1303,12 +2279,17 @@ class BaseDeDatos:
             
             # 1. Los pronósticos se borrarán automáticamente por el ON DELETE CASCADE de MySQL.
             # Solo necesitamos borrar los partidos atados a este rival_id.
+            cursor.execute("SELECT id FROM partidos WHERE rival_id = %s", (rival_id,))
+            ambitos = self._ambitos_de_partidos(cursor, [fila[0] for fila in cursor.fetchall()], solo_jugados=True)
             cursor.execute("DELETE FROM partidos WHERE rival_id = %s", (rival_id,))
+            self._actualizar_posiciones(cursor, ambitos)
+            self._actualizar_campeones_de_ambitos(cursor, ambitos)
             
             # 2. Ahora que no hay partidos atados, podemos borrar el equipo.
             cursor.execute("DELETE FROM rivales WHERE id = %s", (rival_id,))
             
             conexion.commit()
+            self._invalidar_caches_analiticos()
             return True
         except Exception as e:
             conexion.rollback()
@@ -1376,6 +2357,9 @@ class BaseDeDatos:
             
         try:
             cursor = conexion.cursor()
+
+            # Si cambia la edición o el año, la tabla de posiciones vieja también hay que recalcularla
+            ambitos_previos = self._ambitos_de_partidos(cursor, [partido_id])
             
             query = """
                 UPDATE partidos 
@@ -1390,7 +2374,13 @@ class BaseDeDatos:
             valores = (edicion_id, rival_id, condicion, fecha_str, goles_cai, goles_rival, partido_id)
             
             cursor.execute(query, valores)
+            # Si se corrigió (o borró) el resultado, los puntajes guardados se recalculan con él
+            self._recalcular_puntajes(cursor, "pr.partido_id = %s", (partido_id,))
+            ambitos = self._actualizar_posiciones_de_partidos(cursor, [partido_id], ambitos_previos)
+            # Corrección de un partido de una edición ya finalizada: puede cambiar el campeón
+            self._actualizar_campeones_de_ambitos(cursor, ambitos)
             conexion.commit()
+            self._invalidar_caches_analiticos()
             
         except Exception as e:
             conexion.rollback()
@@ -1413,8 +2403,13 @@ class BaseDeDatos:
             cursor = conexion.cursor()
             
             # Solo necesitamos borrar el partido, la base de datos hace el resto
+            ambitos = self._ambitos_de_partidos(cursor, [partido_id], solo_jugados=True)
             cursor.execute("DELETE FROM partidos WHERE id = %s", (partido_id,))
+            # Los pronósticos ya no existen, así que se recalcula el ámbito completo
+            self._actualizar_posiciones(cursor, ambitos)
+            self._actualizar_campeones_de_ambitos(cursor, ambitos)
             conexion.commit()
+            self._invalidar_caches_analiticos()
             
         except Exception as e:
             conexion.rollback()
@@ -1428,141 +2423,56 @@ class BaseDeDatos:
         """
         Calcula la MEJOR racha (récord) de partidos consecutivos sumando puntos en la historia (o filtro).
         """
-        conexion = None
-        cursor = None
         try:
-            conexion = self.abrir()
-            cursor = conexion.cursor()
-
-            params = []
-            filtro_sql = ""
-
-            if edicion_id is not None:
-                filtro_sql = " AND p.edicion_id = %s "
-                params.append(edicion_id)
-            elif anio is not None:
-                filtro_sql = " AND a.numero = %s "
-                params.append(anio)
-
-            # Query: Misma estructura que racha actual, pero ordenado por Fecha ASCENDENTE
-            # para poder calcular la continuidad desde el principio.
-            sql = f"""
-            SELECT 
-                u.username,
-                p.fecha_hora,
-                CASE 
-                    WHEN pr.pred_goles_independiente IS NULL THEN 0
-                    ELSE
-                        (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN SIGN(p.goles_independiente - p.goles_rival) = SIGN(pr.pred_goles_independiente - pr.pred_goles_rival) THEN {PUNTOS} ELSE 0 END)
-                END as puntos
-            FROM usuarios u
-            CROSS JOIN partidos p 
-            JOIN ediciones e ON p.edicion_id = e.id
-            JOIN anios a ON e.anio_id = a.id
-            LEFT JOIN (
-                SELECT p1.usuario_id, p1.partido_id, p1.pred_goles_independiente, p1.pred_goles_rival
-                FROM pronosticos p1
-                INNER JOIN (
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) p2 ON p1.usuario_id = p2.usuario_id 
-                    AND p1.partido_id = p2.partido_id 
-                    AND p1.fecha_prediccion = p2.max_fecha
-            ) pr ON u.id = pr.usuario_id AND p.id = pr.partido_id
-            WHERE 
-                p.goles_independiente IS NOT NULL
-                {filtro_sql}
-            ORDER BY u.username ASC, p.fecha_hora ASC
-            """
-            
-            cursor.execute(sql, tuple(params))
-            resultados = cursor.fetchall()
-            
-            # --- Algoritmo para encontrar el MAX streak por usuario ---
-            mapa_maximos = {} # {username: max_racha}
-            
-            if resultados:
-                usuario_actual = None
-                racha_temporal = 0
-                
-                for row in resultados:
-                    user = row[0]
-                    puntos = row[2]
-                    
-                    if user != usuario_actual:
-                        # Cambio de usuario, reseteamos contadores
-                        usuario_actual = user
-                        racha_temporal = 0
-                        if user not in mapa_maximos:
-                            mapa_maximos[user] = 0
-                    
-                    if puntos > 0:
-                        racha_temporal += 1
-                        # Si la racha actual supera al máximo guardado, actualizamos
-                        if racha_temporal > mapa_maximos[user]:
-                            mapa_maximos[user] = racha_temporal
-                    else:
-                        # Cortó racha
-                        racha_temporal = 0
-            
-            # Convertir diccionario a lista de tuplas para ordenar
-            lista_final = [(k, v) for k, v in mapa_maximos.items()]
-            
+            lista_final = [(username, record) for username, _, record in self._calcular_rachas(edicion_id, anio)]
             # Ordenar por racha récord descendente
             return sorted(lista_final, key=lambda x: x[1], reverse=True)
-
         except Exception as e:
             logger.error(f"Error calculando racha récord: {e}")
             return []
-        finally:
-            if cursor: cursor.close()
-            if conexion: conexion.close()
 
-    def obtener_todos_pronosticos(self, filtro_tiempo='todos', filtro_torneo=None, filtro_equipo=None, filtro_usuario=None):
+    def _consulta_todos_pronosticos(self, filtro_tiempo, filtro_torneo, filtro_equipo, filtro_usuario, filtro=None):
         """
-        Obtiene el listado de pronósticos.
-        Ahora filtra directamente desde la base de datos y ordena ascendentemente si es 'futuros'.
+        Arma el listado de pronósticos: (SELECT ... FROM ... sin WHERE, condiciones, parámetros, orden de la fecha del partido).
+        Columnas: las 11 del listado más pr.id al final (desempate de la paginación).
+        - filtro: FiltroConsulta con ids ya resueltos (usa índices). Los filtros por nombre
+          (torneo / equipo / usuario) quedan por compatibilidad y comparan textos.
         """
-        conexion = None
-        cursor = None
-        try:
-            conexion = self.abrir()
-            cursor = conexion.cursor()
-
-            condiciones = ["1=1"]
-            params = []
+        condiciones = ["1=1"]
+        params = []
 
-            # 1. Filtro de tiempo y Ordenamiento
-            if filtro_tiempo == 'futuros':
-                condiciones.append("p.fecha_hora > DATE_SUB(NOW(), INTERVAL 3 HOUR)")
-                orden = "ASC"  # <--- ORDEN ASCENDENTE PARA LOS QUE FALTAN JUGAR
-            elif filtro_tiempo == 'jugados':
-                condiciones.append("p.fecha_hora <= DATE_SUB(NOW(), INTERVAL 3 HOUR)")
-                orden = "DESC" # <--- ORDEN DESCENDENTE PARA EL HISTORIAL
-            else:
-                orden = "DESC"
+        # 1. Filtro de tiempo y Ordenamiento
+        if filtro_tiempo == 'futuros':
+            condiciones.append("p.fecha_hora > DATE_SUB(NOW(), INTERVAL 3 HOUR)")
+            orden = "ASC"  # <--- ORDEN ASCENDENTE PARA LOS QUE FALTAN JUGAR
+        elif filtro_tiempo == 'jugados':
+            condiciones.append("p.fecha_hora <= DATE_SUB(NOW(), INTERVAL 3 HOUR)")
+            orden = "DESC" # <--- ORDEN DESCENDENTE PARA EL HISTORIAL
+        else:
+            orden = "DESC"
 
-            # 2. Filtro de Torneo
-            if filtro_torneo:
-                condiciones.append("CONCAT(c.nombre, ' ', a.numero) = %s")
-                params.append(filtro_torneo)
+        # 2. Filtro de Torneo
+        if filtro_torneo:
+            condiciones.append("CONCAT(c.nombre, ' ', a.numero) = %s")
+            params.append(filtro_torneo)
 
-            # 3. Filtro de Equipo
-            if filtro_equipo:
-                condiciones.append("r.nombre = %s")
-                params.append(filtro_equipo)
+        # 3. Filtro de Equipo
+        if filtro_equipo:
+            condiciones.append("r.nombre = %s")
+            params.append(filtro_equipo)
 
-            # 4. Filtro de Usuario
-            if filtro_usuario:
-                condiciones.append("u.username = %s")
-                params.append(filtro_usuario)
+        # 4. Filtro de Usuario
+        if filtro_usuario:
+            condiciones.append("u.username = %s")
+            params.append(filtro_usuario)
 
-            where_clause = " AND ".join(condiciones)
+        # 5. Filtros por id / rango de fechas
+        if filtro:
+            condiciones_filtro, params_filtro = filtro.condiciones()
+            condiciones += condiciones_filtro
+            params += params_filtro
 
-            sql = f"""
+        sql = f"""
             SELECT 
                 r.nombre,
                 p.fecha_hora,
@@ -1576,11 +2486,8 @@ class BaseDeDatos:
                 -- CÁLCULO DE PUNTOS
                 CASE 
                     WHEN p.goles_independiente IS NULL THEN NULL
-                    WHEN pr.fecha_prediccion < latest.max_fecha THEN NULL
-                    ELSE
-                        (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END) +
-                        (CASE WHEN SIGN(p.goles_independiente - p.goles_rival) = SIGN(pr.pred_goles_independiente - pr.pred_goles_rival) THEN {PUNTOS} ELSE 0 END)
+                    WHEN pr.id <> latest.id THEN NULL
+                    ELSE {self._sql_puntos()}
                 END as puntos,
                 
                 pr.fecha_prediccion,
@@ -1588,11 +2495,11 @@ class BaseDeDatos:
                 -- ERROR ABSOLUTO
                 CASE 
                     WHEN p.goles_independiente IS NULL OR pr.pred_goles_independiente IS NULL THEN NULL
-                    WHEN pr.fecha_prediccion < latest.max_fecha THEN NULL
-                    ELSE
-                        ABS(CAST(p.goles_independiente AS SIGNED) - CAST(pr.pred_goles_independiente AS SIGNED)) + 
-                        ABS(CAST(p.goles_rival AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED))
-                END as error_absoluto
+                    WHEN pr.id <> latest.id THEN NULL
+                    ELSE {self._sql_error_absoluto()}
+                END as error_absoluto,
+
+                pr.id
 
             FROM pronosticos pr  
             JOIN partidos p ON pr.partido_id = p.id
@@ -1602,18 +2509,30 @@ class BaseDeDatos:
             JOIN campeonatos c ON e.campeonato_id = c.id
             JOIN anios a ON e.anio_id = a.id
             
-            INNER JOIN (
-                SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                FROM pronosticos
-                GROUP BY usuario_id, partido_id
-            ) latest ON pr.usuario_id = latest.usuario_id AND pr.partido_id = latest.partido_id
-            
-            WHERE {where_clause}
-            ORDER BY p.fecha_hora {orden}, pr.fecha_prediccion DESC
+            INNER JOIN {self._origen_ultimos_pronosticos()} latest ON pr.usuario_id = latest.usuario_id AND pr.partido_id = latest.partido_id
+            """
+        return sql, condiciones, params, orden
+
+    def obtener_todos_pronosticos(self, filtro_tiempo='todos', filtro_torneo=None, filtro_equipo=None, filtro_usuario=None, filtro=None):
+        """
+        Obtiene el listado de pronósticos.
+        Ahora filtra directamente desde la base de datos y ordena ascendentemente si es 'futuros'.
+        Trae TODO el historial: para mostrarlo en pantalla usar obtener_pagina_pronosticos.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+
+            sql, condiciones, params, orden = self._consulta_todos_pronosticos(filtro_tiempo, filtro_torneo, filtro_equipo, filtro_usuario, filtro)
+            sql += f"""
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY p.fecha_hora {orden}, pr.fecha_prediccion DESC, pr.id DESC
             """
             
             cursor.execute(sql, tuple(params))
-            return cursor.fetchall()
+            return [fila[:11] for fila in cursor.fetchall()]
         except Exception as e:
             logger.error(f"Error obteniendo pronósticos: {e}")
             return []
@@ -1621,6 +2540,64 @@ class BaseDeDatos:
             if cursor: cursor.close()
             if conexion: conexion.close()
 
+    def obtener_pagina_pronosticos(self, filtro_tiempo='todos', filtro_torneo=None, filtro_equipo=None, filtro_usuario=None,
+                                   filtro=None, despues_de=None, tamanio_pagina=TAMANIO_PAGINA_PRONOSTICOS,
+                                   por_fecha_prediccion=False):
+        """
+        Igual que obtener_todos_pronosticos (mismas filas y mismo orden) pero de a una página.
+        Paginación por clave (fecha del partido, fecha de predicción, id): en lugar de OFFSET se sigue
+        desde la última fila vista, así cada página cuesta lo mismo aunque el historial crezca.
+        - despues_de: cursor que devolvió la página anterior (None para la primera).
+        - por_fecha_prediccion: ordena solo por fecha de predicción (más recientes primero), como el
+          historial del bot; la clave pasa a ser (fecha de predicción, id).
+        Retorna (filas, siguiente): 'siguiente' es el cursor de la próxima página, o None si no hay más.
+        """
+        conexion = None
+        cursor = None
+        try:
+            conexion = self.abrir()
+            cursor = conexion.cursor()
+
+            sql, condiciones, params, orden = self._consulta_todos_pronosticos(filtro_tiempo, filtro_torneo, filtro_equipo, filtro_usuario, filtro)
+            if por_fecha_prediccion:
+                if despues_de:
+                    fecha_prediccion, pronostico_id = despues_de
+                    condiciones.append("(pr.fecha_prediccion < %s OR (pr.fecha_prediccion = %s AND pr.id < %s))")
+                    params += [fecha_prediccion, fecha_prediccion, pronostico_id]
+                orden_sql = "pr.fecha_prediccion DESC, pr.id DESC"
+            else:
+                if despues_de:
+                    fecha_hora, fecha_prediccion, pronostico_id = despues_de
+                    comparador = ">" if orden == "ASC" else "<"
+                    condiciones.append(f"""(p.fecha_hora {comparador} %s OR (p.fecha_hora = %s AND
+                        (pr.fecha_prediccion < %s OR (pr.fecha_prediccion = %s AND pr.id < %s))))""")
+                    params += [fecha_hora, fecha_hora, fecha_prediccion, fecha_prediccion, pronostico_id]
+                orden_sql = f"p.fecha_hora {orden}, pr.fecha_prediccion DESC, pr.id DESC"
+
+            # Una fila de más para saber si hay otra página sin contar el total
+            sql += f"""
+            WHERE {" AND ".join(condiciones)}
+            ORDER BY {orden_sql}
+            LIMIT %s
+            """
+            params.append(tamanio_pagina + 1)
+
+            cursor.execute(sql, tuple(params))
+            filas = cursor.fetchall()
+
+            siguiente = None
+            if len(filas) > tamanio_pagina:
+                filas = filas[:tamanio_pagina]
+                ultima = filas[-1]
+                siguiente = (ultima[9], ultima[11]) if por_fecha_prediccion else (ultima[1], ultima[9], ultima[11])
+            return [fila[:11] for fila in filas], siguiente
+        except Exception as e:
+            logger.error(f"Error obteniendo la página de pronósticos: {e}")
+            return [], None
+        finally:
+            if cursor: cursor.close()
+            if conexion: conexion.close()
+
     def obtener_partido_por_fecha_exacta(self, fecha_dmy):
         """Busca un partido en la base de datos usando una fecha exacta DD/MM/AAAA."""
         try:
@@ -1672,7 +2649,11 @@ class BaseDeDatos:
             
             sql = "UPDATE partidos SET goles_independiente = %s, goles_rival = %s WHERE id = %s"
             cursor.execute(sql, (goles_cai, goles_rival, partido_id))
+            self._recalcular_puntajes(cursor, "pr.partido_id = %s", (partido_id,))
+            ambitos = self._actualizar_posiciones_de_partidos(cursor, [partido_id])
+            self._actualizar_campeones_de_ambitos(cursor, ambitos)
             conexion.commit()
+            self._invalidar_caches_analiticos()
             return True
         except Exception as e:
             raise Exception(f"Error actualizando goles del partido: {e}")
@@ -1691,7 +2672,8 @@ class BaseDeDatos:
             conexion = self.abrir()
             cursor = conexion.cursor()
 
-            params = [usuario, usuario] # Para las subconsultas de pronósticos
+            params = [usuario] # Para la subconsulta de pronósticos
+            origen_pr = self._origen_ultimos_pronosticos("usuario_id = (SELECT id FROM usuarios WHERE username = %s)")
             filtro_sql = ""
 
             # Filtros dinámicos
@@ -1724,17 +2706,7 @@ class BaseDeDatos:
             JOIN anios a ON e.anio_id = a.id
             
             -- Left Join para ver si el usuario pronosticó (solo el último pronóstico)
-            LEFT JOIN (
-                SELECT p1.partido_id, p1.pred_goles_independiente, p1.pred_goles_rival
-                FROM pronosticos p1
-                INNER JOIN (
-                    SELECT partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    WHERE usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-                    GROUP BY partido_id
-                ) p2 ON p1.partido_id = p2.partido_id AND p1.fecha_prediccion = p2.max_fecha
-                WHERE p1.usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-            ) pr ON p.id = pr.partido_id
+            LEFT JOIN {origen_pr} pr ON p.id = pr.partido_id
             
             WHERE 
                 p.goles_independiente IS NOT NULL -- Solo partidos que ya se jugaron (historia)
@@ -1795,7 +2767,8 @@ class BaseDeDatos:
             conexion = self.abrir()
             cursor = conexion.cursor()
 
-            params = [usuario, usuario]
+            params = [usuario]
+            origen_pr = self._origen_ultimos_pronosticos("usuario_id = (SELECT id FROM usuarios WHERE username = %s)")
             filtro_sql = ""
 
             if edicion_id is not None:
@@ -1864,17 +2837,7 @@ class BaseDeDatos:
             JOIN ediciones e ON p.edicion_id = e.id
             JOIN anios a ON e.anio_id = a.id
             
-            LEFT JOIN (
-                SELECT p1.partido_id, p1.pred_goles_independiente, p1.pred_goles_rival
-                FROM pronosticos p1
-                INNER JOIN (
-                    SELECT partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    WHERE usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-                    GROUP BY partido_id
-                ) p2 ON p1.partido_id = p2.partido_id AND p1.fecha_prediccion = p2.max_fecha
-                WHERE p1.usuario_id = (SELECT id FROM usuarios WHERE username = %s)
-            ) pr ON p.id = pr.partido_id
+            LEFT JOIN {origen_pr} pr ON p.id = pr.partido_id
             
             WHERE 
                 p.goles_independiente IS NOT NULL
@@ -1921,20 +2884,20 @@ class BaseDeDatos:
         Adaptado al esquema: JOIN con rivales, fecha_hora, etc.
         Filtro agregado: Solo el ÚLTIMO pronóstico de cada usuario por partido.
         """
+        datos = self._desde_instantanea('ranking_mayores_errores', usuario, edicion_id, anio, LIMITE_MAYORES_ERRORES)
+        if datos is not None:
+            return datos
+
         conexion = self.abrir()
         if not conexion: return []
         cursor = conexion.cursor()
 
         # Condición para partidos terminados
         filtros = ["p.goles_independiente IS NOT NULL"] 
-        params = []
 
-        if edicion_id:
-            filtros.append("p.edicion_id = %s")
-            params.append(edicion_id)
-        if anio:
-            filtros.append("YEAR(p.fecha_hora) = %s")
-            params.append(anio)
+        # Edición y año como rango de fechas: los dos usan índices de 'partidos'
+        condiciones, params = FiltroConsulta(edicion_id=edicion_id, anio=anio).condiciones()
+        filtros += condiciones
         if usuario:
             filtros.append("u.username = %s")
             params.append(usuario)
@@ -1953,18 +2916,11 @@ class BaseDeDatos:
                     pr.pred_goles_rival,        
                     p.goles_independiente,      
                     p.goles_rival,              
-                    (ABS(p.goles_independiente - pr.pred_goles_independiente) + ABS(p.goles_rival - pr.pred_goles_rival)) as error_abs,
+                    {self._sql_error_absoluto()} as error_abs,
                     RANK() OVER (
-                        ORDER BY (ABS(p.goles_independiente - pr.pred_goles_independiente) + ABS(p.goles_rival - pr.pred_goles_rival)) DESC
+                        ORDER BY {self._sql_error_absoluto()} DESC
                     ) as puesto_ranking
-                FROM pronosticos pr
-                
-                -- FILTRO CLAVE: Solo el último pronóstico de cada usuario para cada partido
-                INNER JOIN (
-                    SELECT MAX(id) as max_id
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) ultimos ON pr.id = ultimos.max_id
+                FROM {self._origen_ultimos_pronosticos()} pr
                 
                 JOIN partidos p ON pr.partido_id = p.id
                 JOIN rivales r ON p.rival_id = r.id  
@@ -1986,10 +2942,12 @@ class BaseDeDatos:
             ORDER BY error_abs DESC, fecha_hora DESC
         """
         
-        cursor.execute(sql, tuple(params))
-        datos = cursor.fetchall()
-        cursor.close()
-        conexion.close()
+        try:
+            cursor.execute(sql, tuple(params))
+            datos = cursor.fetchall()
+        finally:
+            cursor.close()
+            conexion.close()
         return datos
            
     def obtener_estadisticas_firmeza_pronostico(self, usuario, edicion_id=None, anio=None):
@@ -2002,6 +2960,10 @@ class BaseDeDatos:
         - 3+ intentos: Cambiante
         - 0 intentos (o NULL): No participativo
         """
+        datos = self._desde_instantanea('estadisticas_firmeza', usuario, edicion_id, anio)
+        if datos is not None:
+            return datos
+
         conexion = None
         cursor = None
         try:
@@ -2155,6 +3117,11 @@ class BaseDeDatos:
                 cursor.execute(sql, (camp_id, anio_id))
                 
                 if cursor.rowcount > 0:
+                    # 4. Guardamos el/los campeón(es) en la misma transacción
+                    cursor.execute("SELECT id FROM ediciones WHERE campeonato_id = %s AND anio_id = %s", (camp_id, anio_id))
+                    self._actualizar_campeones(cursor, [fila[0] for fila in cursor.fetchall()])
+                    conexion.commit()
+                    self._invalidar_caches_analiticos()
                     logger.info(f"Torneo marcado como FINALIZADO: {nombre_torneo} {anio_str}")
                     return True
             return False
@@ -2172,6 +3139,10 @@ class BaseDeDatos:
         Mufa = Usuario que pronostica derrota y el equipo PIERDE.
         Fórmula: (Derrotas Acertadas / Total Predicciones de Derrota) * 100
         """
+        datos = self._desde_instantanea('ranking_mufa', edicion_id, anio)
+        if datos is not None:
+            return datos
+
         conexion = None
         cursor = None
         try:
@@ -2203,14 +3174,7 @@ class BaseDeDatos:
                     SUM(CASE WHEN p.goles_independiente < p.goles_rival THEN 1 ELSE 0 END) as derrotas_acertadas,
                     -- Cálculo de porcentaje
                     (SUM(CASE WHEN p.goles_independiente < p.goles_rival THEN 1 ELSE 0 END) / COUNT(*)) * 100 as porcentaje_mufa
-                FROM pronosticos pr
-                INNER JOIN (
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) p2 ON pr.usuario_id = p2.usuario_id 
-                    AND pr.partido_id = p2.partido_id 
-                    AND pr.fecha_prediccion = p2.max_fecha
+                FROM {self._origen_ultimos_pronosticos()} pr
                 JOIN partidos p ON pr.partido_id = p.id
                 JOIN ediciones e ON p.edicion_id = e.id
                 JOIN anios a ON e.anio_id = a.id
@@ -2242,6 +3206,10 @@ class BaseDeDatos:
         Ranking de Falso Profeta.
         CAMBIO: Se usa INNER JOIN para excluir usuarios que nunca pronosticaron victoria.
         """
+        datos = self._desde_instantanea('ranking_falso_profeta', edicion_id, anio)
+        if datos is not None:
+            return datos
+
         conexion = None
         cursor = None
         try:
@@ -2269,14 +3237,7 @@ class BaseDeDatos:
                     pr.usuario_id,
                     COUNT(*) as victorias_pronosticadas,
                     (SUM(CASE WHEN p.goles_independiente > p.goles_rival THEN 1 ELSE 0 END) / COUNT(*)) * 100 as porcentaje_acierto
-                FROM pronosticos pr
-                INNER JOIN (
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) p2 ON pr.usuario_id = p2.usuario_id 
-                    AND pr.partido_id = p2.partido_id 
-                    AND pr.fecha_prediccion = p2.max_fecha
+                FROM {self._origen_ultimos_pronosticos()} pr
                 JOIN partidos p ON pr.partido_id = p.id
                 JOIN ediciones e ON p.edicion_id = e.id
                 JOIN anios a ON e.anio_id = a.id
@@ -2306,6 +3267,8 @@ class BaseDeDatos:
     def obtener_ranking(self, edicion_id=None, anio=None):
         """
         Ranking Definitivo:
+        Con 'usar_posiciones' se lee la tabla precalculada (un rango de la clave primaria);
+        si no, o si se combinan edición y año, se calcula en vivo con la misma fórmula.
         """
         conexion = self.abrir()
         if not conexion:
@@ -2313,78 +3276,52 @@ class BaseDeDatos:
         
         cursor = conexion.cursor()
         
-        filtro_sql = ""
-        params = []
-        
-        if edicion_id:
-            filtro_sql += " AND p.edicion_id = %s"
-            params.append(edicion_id)
-        if anio:
-            filtro_sql += " AND YEAR(p.fecha_hora) = %s"
-            params.append(anio)
+        # Edición y año como rango de fechas: los dos usan índices de 'partidos'
+        condiciones, params = FiltroConsulta(edicion_id=edicion_id, anio=anio).condiciones()
+        filtro_sql = "".join(f" AND {condicion}" for condicion in condiciones)
+
+        if self.usar_posiciones and not (edicion_id and anio):
+            if edicion_id:
+                ambito, ambito_id = 'edicion', edicion_id
+            elif anio:
+                ambito, ambito_id = 'anio', anio
+            else:
+                ambito, ambito_id = 'total', 0
+            origen = "(SELECT * FROM posiciones WHERE ambito = %s AND ambito_id = %s)"
+            params = [ambito, ambito_id]
+        else:
+            origen = f"({self._sql_calcular_posiciones('1=1' + filtro_sql)})"
 
         sql = f"""
             SELECT 
                 u.username,                                                     
                 
                 -- 1. TOTAL PUNTOS
-                COALESCE(SUM(
-                    (CASE WHEN SIGN(CAST(p.goles_independiente AS SIGNED) - CAST(p.goles_rival AS SIGNED)) = 
-                               SIGN(CAST(pr.pred_goles_independiente AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED)) 
-                          THEN {PUNTOS} ELSE 0 END) +
-                    (CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END) +
-                    (CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END)
-                ), 0) as total_puntos,
+                ps.total_puntos,
 
                 -- 2. Puntos Resultado
-                COALESCE(SUM(
-                    CASE WHEN SIGN(CAST(p.goles_independiente AS SIGNED) - CAST(p.goles_rival AS SIGNED)) = 
-                              SIGN(CAST(pr.pred_goles_independiente AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED)) 
-                         THEN {PUNTOS} ELSE 0 END
-                ), 0) as pts_resultado,
+                ps.pts_resultado,
 
                 -- 3. Puntos Goles CAI
-                COALESCE(SUM(CASE WHEN p.goles_independiente = pr.pred_goles_independiente THEN {PUNTOS} ELSE 0 END), 0) as pts_cai,
+                ps.pts_cai,
 
                 -- 4. Puntos Goles Rival
-                COALESCE(SUM(CASE WHEN p.goles_rival = pr.pred_goles_rival THEN {PUNTOS} ELSE 0 END), 0) as pts_rival,
+                ps.pts_rival,
 
                 -- 5. Partidos Jugados
-                COUNT(pr.id) as partidos_jugados,
+                ps.partidos_jugados,
 
                 -- 6. Anticipación Promedio
-                AVG(TIMESTAMPDIFF(SECOND, pr.fecha_prediccion, p.fecha_hora)) as ant_avg,
+                ps.suma_anticipacion / ps.partidos_jugados as ant_avg,
 
                 -- 7. Error Promedio
-                AVG(
-                    ABS(p.goles_independiente - pr.pred_goles_independiente) + 
-                    ABS(p.goles_rival - pr.pred_goles_rival)
-                ) as error_promedio,
+                ps.suma_error / ps.partidos_jugados as error_promedio,
 
                 -- 8. EFECTIVIDAD (Porcentaje de resultados exactos)
-                COALESCE(ROUND(
-                    (SUM(
-                        CASE WHEN p.goles_independiente = pr.pred_goles_independiente 
-                              AND p.goles_rival = pr.pred_goles_rival
-                             THEN 1 ELSE 0 END
-                    ) / NULLIF(COUNT(pr.id), 0)) * 100
-                , 2), 0) as efectividad
+                COALESCE(ROUND((ps.exactos / NULLIF(ps.partidos_jugados, 0)) * 100, 2), 0) as efectividad
 
-            FROM usuarios u
-            JOIN pronosticos pr ON u.id = pr.usuario_id
-            
-            INNER JOIN (
-                SELECT MAX(id) as max_id
-                FROM pronosticos
-                GROUP BY usuario_id, partido_id
-            ) ultimos ON pr.id = ultimos.max_id
-            
-            JOIN partidos p ON pr.partido_id = p.id
-            
-            WHERE p.goles_independiente IS NOT NULL 
-              AND p.goles_rival IS NOT NULL
-            {filtro_sql}
-            GROUP BY u.id
+            FROM {origen} ps
+            JOIN usuarios u ON u.id = ps.usuario_id
             ORDER BY 
                 total_puntos DESC,
                 partidos_jugados DESC,
@@ -2408,6 +3345,10 @@ class BaseDeDatos:
         Calcula el índice unificado de Optimismo/Pesimismo mostrando a TODOS los usuarios.
         Formula: (Pred_CAI - Pred_Rival) - (Real_CAI - Real_Rival)
         """
+        datos = self._desde_instantanea('indice_optimismo_pesimismo', edicion_id, anio)
+        if datos is not None:
+            return datos
+
         conexion = None
         cursor = None
         try:
@@ -2445,15 +3386,7 @@ class BaseDeDatos:
                         (CAST(p.goles_independiente AS SIGNED) - CAST(p.goles_rival AS SIGNED))
                     ) as desvio_estandar
                     
-                FROM pronosticos pr
-                INNER JOIN (
-                    -- Último pronóstico por partido
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) p2 ON pr.usuario_id = p2.usuario_id 
-                    AND pr.partido_id = p2.partido_id 
-                    AND pr.fecha_prediccion = p2.max_fecha
+                FROM {self._origen_ultimos_pronosticos()} pr
                 JOIN partidos p ON pr.partido_id = p.id
                 JOIN ediciones e ON p.edicion_id = e.id
                 JOIN anios a ON e.anio_id = a.id
@@ -2484,6 +3417,10 @@ class BaseDeDatos:
         Fórmula por partido: |G_Real_CAI - G_Pred_CAI| + |G_Real_Rival - G_Pred_Rival|
         El ranking se ordena por el PROMEDIO de ese error (ASCENDENTE, menor es mejor).
         """
+        datos = self._desde_instantanea('ranking_mejor_predictor', edicion_id, anio)
+        if datos is not None:
+            return datos
+
         conexion = None
         cursor = None
         try:
@@ -2509,19 +3446,8 @@ class BaseDeDatos:
                 SELECT 
                     pr.usuario_id,
                     -- Calculamos el promedio del error absoluto sumado de ambos equipos
-                    AVG(
-                        ABS(CAST(p.goles_independiente AS SIGNED) - CAST(pr.pred_goles_independiente AS SIGNED)) + 
-                        ABS(CAST(p.goles_rival AS SIGNED) - CAST(pr.pred_goles_rival AS SIGNED))
-                    ) as promedio_error
-                FROM pronosticos pr
-                INNER JOIN (
-                    -- Solo el último pronóstico por partido
-                    SELECT usuario_id, partido_id, MAX(fecha_prediccion) as max_fecha
-                    FROM pronosticos
-                    GROUP BY usuario_id, partido_id
-                ) p2 ON pr.usuario_id = p2.usuario_id 
-                    AND pr.partido_id = p2.partido_id 
-                    AND pr.fecha_prediccion = p2.max_fecha
+                    AVG({self._sql_error_absoluto()}) as promedio_error
+                FROM {self._origen_ultimos_pronosticos()} pr
                 JOIN partidos p ON pr.partido_id = p.id
                 JOIN ediciones e ON p.edicion_id = e.id
                 JOIN anios a ON e.anio_id = a.id
@@ -2740,6 +3666,8 @@ class BaseDeDatos:
             sql = "UPDATE usuarios SET username = %s WHERE id = %s"
             cursor.execute(sql, (nuevo_username, id_usuario))
             conexion.commit()
+            self._invalidar_caches_analiticos()
+            self.olvidar_sesion_telegram(usuario_id=id_usuario)
             return True
             
         except mysql.connector.Error as e:
@@ -2777,20 +3705,20 @@ class BaseDeDatos:
         considerando ÚNICAMENTE partidos terminados (goles cargados).
         Fórmula: Total de filas en 'pronosticos' para partidos jugados / Cantidad de partidos jugados distintos.
         """
+        datos = self._desde_instantanea('ranking_estabilidad', edicion_id, anio)
+        if datos is not None:
+            return datos
+
         conexion = self.abrir()
         if not conexion: return []
         cursor = conexion.cursor()
 
         # Filtro base: Solo partidos que tienen resultado cargado (goles_independiente IS NOT NULL)
         filtros = ["p.goles_independiente IS NOT NULL"] 
-        params = []
 
-        if edicion_id:
-            filtros.append("p.edicion_id = %s")
-            params.append(edicion_id)
-        if anio:
-            filtros.append("YEAR(p.fecha_hora) = %s")
-            params.append(anio)
+        # Edición y año como rango de fechas: los dos usan índices de 'partidos'
+        condiciones, params = FiltroConsulta(edicion_id=edicion_id, anio=anio).condiciones()
+        filtros += condiciones
 
         where_clause = " AND ".join(filtros)
 
@@ -2911,7 +3839,10 @@ class BaseDeDatos:
             conexion = self.abrir()
             cursor = conexion.cursor()
             cursor.execute("UPDATE ediciones SET campeonato_id=%s, anio_id=%s, finalizado=%s WHERE id=%s", (campeonato_id, anio_id, finalizado, edicion_id))
+            # Si se finalizó, se guardan sus campeones; si se reabrió, se borran
+            self._actualizar_campeones(cursor, [edicion_id])
             conexion.commit()
+            self._invalidar_caches_analiticos()
         except mysql.connector.Error as e:
             if e.errno == 1062:
                 raise Exception("Esta edición (Torneo + Año) ya existe en la base de datos.")
@@ -2966,6 +3897,7 @@ class BaseDeDatos:
                 
             cursor.execute("DELETE FROM ediciones WHERE id = %s", (edicion_id,))
             conexion.commit()
+            self._invalidar_caches_analiticos()
         except Exception as e:
             raise e
         finally:
@@ -0,0 +1,45 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from base_de_datos import obtener_base_de_datos
+
+class BaseDeDatosAsync:
+    """
+    Versión asíncrona de BaseDeDatos para el bot de Telegram.
+    Cada método se ejecuta en un grupo acotado de hilos, así una consulta a TiDB
+    no congela el event loop mientras se atiende al resto de los chats.
+    Los métodos conservan exactamente los mismos argumentos, resultados y excepciones:
+        ranking = await db_async.obtener_ranking(edicion_id=3)
+    """
+    def __init__(self, db=None, concurrencia=None):
+        self.db = db or obtener_base_de_datos()
+
+        # Por defecto permitimos tantas consultas simultáneas como conexiones tiene el pool
+        if concurrencia is None:
+            concurrencia = os.getenv("DB_ASYNC_CONCURRENCIA", self.db.pool.tamanio)
+        self.concurrencia = max(1, int(concurrencia))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix="bd_async")
+        self._metodos = {}
+
+    def __getattr__(self, nombre):
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+
+        metodo = getattr(self.db, nombre)
+        if not callable(metodo):
+            return metodo
+
+        envoltorio = self._metodos.get(nombre)
+        if envoltorio is None:
+            @functools.wraps(metodo)
+            async def envoltorio(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, functools.partial(metodo, *args, **kwargs))
+            self._metodos[nombre] = envoltorio
+        return envoltorio
+
+    def cerrar(self):
+        """Espera a que terminen las consultas en curso y libera los hilos."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,603 @@
+import copy
+import hashlib
+import inspect
+import os
+import sys
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+TAMANIO_MAXIMO_CACHE_MB = 32 # Tope de memoria estimada de los resultados guardados
+TTL_CACHE_CONSULTAS = 60     # Segundos: acota lo que tarda en verse una escritura hecha por OTRO proceso
+TTL_VERSION_DATOS_COMPARTIDA = 5 # Segundos que se confía en la versión de datos antes de volver a consultarla
+TTL_VERSION_DATOS_MEMORIA = 5    # Ídem para la cache en memoria (ve las escrituras de OTROS procesos a lo sumo con este atraso)
+MAXIMO_ENTRADAS_COMPARTIDAS = 5000
+# En la carpeta del usuario (no en /tmp): el archivo se lee con pickle, así que otro usuario de la
+# máquina no tiene que poder dejar uno preparado
+RUTA_CACHE_COMPARTIDA = os.path.join(os.path.expanduser("~"), ".independiente", "cache_compartida.sqlite3")
+TTL_EDICION_NO_FINALIZADA = 5 * 60 # Segundos que se recuerda que una edición no está finalizada (sin consultar el sello)
+RUTA_CACHE_FINALIZADAS = os.path.join(os.path.expanduser("~"), ".independiente", "ediciones_finalizadas")
+
+# Tablas que usan las estadísticas (ranking, evolución, rachas, mufa, etc.)
+TABLAS_ANALITICA = ('partidos', 'pronosticos', 'usuarios', 'ediciones', 'anios', 'rivales', 'campeonatos')
+
+# --- LECTURAS CACHEABLES: método -> tablas de las que depende su resultado ---
+# Quedan afuera las que dependen de la hora (futuros, agenda, notificaciones), las de login/tokens
+# y las que se usan justo antes de escribir (disponibilidad de username/email).
+LECTURAS = {
+    'obtener_rivales': ('rivales',),
+    'obtener_rivales_completo': ('rivales',),
+    'obtener_campeonatos_completo': ('campeonatos',),
+    'obtener_anios': ('anios',),
+    'obtener_anios_admin': ('anios',),
+    'obtener_ediciones': ('ediciones', 'anios', 'campeonatos', 'partidos'),
+    'obtener_ediciones_admin': ('ediciones', 'anios', 'campeonatos'),
+    'obtener_usuarios': ('usuarios',),
+    'obtener_usuarios_con_id': ('usuarios',),
+    'obtener_partidos_por_rival': ('partidos', 'ediciones', 'anios', 'campeonatos'),
+    'obtener_partidos_admin_por_edicion': ('partidos', 'rivales'),
+    'obtener_ranking': TABLAS_ANALITICA,
+    'obtener_datos_evolucion_puestos': TABLAS_ANALITICA,
+    'obtener_datos_evolucion_puntos': TABLAS_ANALITICA,
+    'obtener_historial_puntos_usuario': TABLAS_ANALITICA,
+    'obtener_torneos_ganados': TABLAS_ANALITICA,
+    'obtener_racha_actual': TABLAS_ANALITICA,
+    'obtener_racha_record': TABLAS_ANALITICA,
+    'obtener_estadisticas_estilo_pronostico': TABLAS_ANALITICA,
+    'obtener_estadisticas_tendencia_pronostico': TABLAS_ANALITICA,
+    'obtener_estadisticas_firmeza_pronostico': TABLAS_ANALITICA,
+    'obtener_ranking_mayores_errores': TABLAS_ANALITICA,
+    'obtener_ranking_mufa': TABLAS_ANALITICA,
+    'obtener_ranking_falso_profeta': TABLAS_ANALITICA,
+    'obtener_indice_optimismo_pesimismo': TABLAS_ANALITICA,
+    'obtener_ranking_mejor_predictor': TABLAS_ANALITICA,
+    'obtener_ranking_estabilidad': TABLAS_ANALITICA,
+}
+
+# Estadísticas que reciben 'edicion_id': si la edición está finalizada su resultado ya no cambia
+LECTURAS_POR_EDICION = {
+    'obtener_ranking', 'obtener_datos_evolucion_puestos', 'obtener_datos_evolucion_puntos',
+    'obtener_historial_puntos_usuario', 'obtener_racha_actual', 'obtener_racha_record',
+    'obtener_estadisticas_estilo_pronostico', 'obtener_estadisticas_tendencia_pronostico',
+    'obtener_estadisticas_firmeza_pronostico', 'obtener_ranking_mayores_errores', 'obtener_ranking_mufa',
+    'obtener_ranking_falso_profeta', 'obtener_indice_optimismo_pesimismo', 'obtener_ranking_mejor_predictor',
+    'obtener_ranking_estabilidad',
+}
+
+# Acciones de administración que pueden modificar una edición ya finalizada
+LIMPIAN_FINALIZADAS = ('editar_edicion_admin', 'actualizar_partido_manual')
+
+# --- ESCRITURAS: método -> tablas cuya versión sube al terminar ---
+ESCRITURAS = {
+    'insertar_pronostico': ('pronosticos',),
+    'actualizar_resultados_pendientes': ('partidos',),
+    'ingresar_resultados': ('partidos',),
+    'insertar_partido_manual': ('partidos',),
+    'actualizar_partido_manual': ('partidos',),
+    'actualizar_goles_partido': ('partidos',),
+    'eliminar_partido_manual': ('partidos', 'pronosticos'),
+    'insertar_rival_manual': ('rivales',),
+    'actualizar_rival_manual': ('rivales',),
+    'actualizar_rival': ('rivales',),
+    'eliminar_rival_manual': ('rivales',),
+    'eliminar_rival_y_partidos': ('rivales', 'partidos', 'pronosticos'),
+    'actualizar_campeonato': ('campeonatos',),
+    'insertar_torneo_manual': ('campeonatos',),
+    'actualizar_torneo_manual': ('campeonatos',),
+    'eliminar_torneo_manual': ('campeonatos',),
+    'agregar_edicion_admin': ('ediciones',),
+    'editar_edicion_admin': ('ediciones',),
+    'eliminar_edicion_admin': ('ediciones', 'partidos', 'pronosticos'),
+    'marcar_edicion_finalizada': ('ediciones',),
+    'registrar_anio_actual': ('anios',),
+    'insertar_usuario': ('usuarios',),
+    'actualizar_username': ('usuarios',),
+    'actualizar_id_telegram': ('usuarios',),
+    'actualizar_email_usuario': ('usuarios',),
+    # Mantenimiento: recalculan tablas derivadas que leen las estadísticas
+    'reconstruir_ultimo_pronostico': ('pronosticos',),
+    'recalcular_puntajes': ('pronosticos',),
+    'reconstruir_posiciones': ('pronosticos',),
+    'reconstruir_campeones': ('ediciones',),
+}
+
+def _congelar(valor):
+    """Convierte listas / dicts / sets de los argumentos en algo que sirva de clave."""
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (set, frozenset)):
+        return frozenset(_congelar(v) for v in valor)
+    return valor
+
+def _tamanio_aproximado(valor):
+    """Bytes aproximados de un resultado (listas de tuplas de valores simples)."""
+    tamanio = sys.getsizeof(valor)
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        for elemento in valor:
+            tamanio += _tamanio_aproximado(elemento)
+    elif isinstance(valor, dict):
+        for clave, elemento in valor.items():
+            tamanio += _tamanio_aproximado(clave) + _tamanio_aproximado(elemento)
+    return tamanio
+
+class CacheConsultas:
+    """
+    Cache LRU de resultados en memoria, seguro entre hilos.
+    Cada tabla tiene una versión que sube con cada escritura. La clave de una entrada incluye
+    las versiones de las tablas de las que depende: una escritura descarta solo las entradas
+    afectadas, y un resultado calculado durante una escritura nunca queda guardado.
+    """
+    def __init__(self, tamanio_maximo=TAMANIO_MAXIMO_CACHE_MB * 1024 * 1024, ttl=TTL_CACHE_CONSULTAS):
+        self.tamanio_maximo = tamanio_maximo
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict() # clave -> (momento, tamaño, resultado, tablas)
+        self._versiones = {}
+        self._tamanio = 0
+
+        # Métricas
+        self._aciertos = 0
+        self._fallos = 0
+        self._descartadas = 0
+
+    def version(self, tablas):
+        with self._lock:
+            return tuple(self._versiones.get(tabla, 0) for tabla in tablas)
+
+    def subir_version(self, tablas):
+        """Sube la versión de las tablas escritas y libera ya las entradas que dependían de ellas."""
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+            viejas = [clave for clave, entrada in self._entradas.items() if not entrada[3].isdisjoint(tablas)]
+            for clave in viejas:
+                self._sacar(clave)
+
+    def obtener(self, clave):
+        """Retorna (True, resultado) si hay una entrada vigente, o (False, None)."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or time.monotonic() - entrada[0] >= self.ttl:
+                if entrada is not None:
+                    self._sacar(clave)
+                self._fallos += 1
+                return False, None
+            self._entradas.move_to_end(clave)
+            self._aciertos += 1
+            return True, entrada[2]
+
+    def guardar(self, clave, resultado, tablas, version):
+        """Guarda el resultado salvo que alguna de sus tablas haya cambiado mientras se calculaba."""
+        tamanio = _tamanio_aproximado(resultado)
+        if tamanio > self.tamanio_maximo:
+            return
+        with self._lock:
+            if tuple(self._versiones.get(tabla, 0) for tabla in tablas) != version:
+                return
+            if clave in self._entradas:
+                self._sacar(clave)
+            self._entradas[clave] = (time.monotonic(), tamanio, resultado, frozenset(tablas))
+            self._tamanio += tamanio
+            # Sacamos las menos usadas hasta volver debajo del tope
+            while self._tamanio > self.tamanio_maximo:
+                self._sacar(next(iter(self._entradas)))
+                self._descartadas += 1
+
+    def _sacar(self, clave):
+        tamanio = self._entradas.pop(clave)[1]
+        self._tamanio -= tamanio
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._tamanio = 0
+
+    def obtener_metricas(self):
+        """Devuelve un diccionario con el uso de la cache y la tasa de aciertos."""
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._tamanio,
+                'bytes_maximo': self.tamanio_maximo,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'tasa_aciertos': (self._aciertos / consultas) if consultas else 0.0,
+                'descartadas': self._descartadas
+            }
+
+class CacheCompartida:
+    """
+    Cache de resultados compartida entre procesos de la MISMA máquina (bot, app de escritorio, web),
+    guardada en un archivo SQLite: no hace falta ningún servicio externo.
+    Cada entrada queda asociada a la versión de datos de la base (BaseDeDatos.obtener_version_datos),
+    así lo que calcula un proceso lo aprovecha el otro hasta la próxima escritura, la haga quien la haga.
+    La versión se vuelve a consultar cada TTL_VERSION_DATOS_COMPARTIDA segundos o después de escribir.
+    Cualquier error del archivo se registra y la lectura sigue contra la base.
+    """
+    def __init__(self, obtener_version, ruta=RUTA_CACHE_COMPARTIDA, ttl_version=TTL_VERSION_DATOS_COMPARTIDA,
+                 maximo_entradas=MAXIMO_ENTRADAS_COMPARTIDAS):
+        self.obtener_version = obtener_version
+        self.ruta = ruta
+        self.ttl_version = ttl_version
+        self.maximo_entradas = maximo_entradas
+
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_consultada = 0.0
+
+        # Métricas
+        self._aciertos = 0
+        self._fallos = 0
+
+        self._crear_tabla()
+
+    def _abrir(self):
+        conexion = sqlite3.connect(self.ruta, timeout=5)
+        conexion.execute("PRAGMA journal_mode=WAL") # Lectores y un escritor a la vez sin bloquearse
+        return conexion
+
+    def _crear_tabla(self):
+        conexion = None
+        try:
+            carpeta = os.path.dirname(self.ruta)
+            if carpeta:
+                os.makedirs(carpeta, mode=0o700, exist_ok=True)
+            conexion = self._abrir()
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS resultados (
+                    clave TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    resultado BLOB NOT NULL,
+                    momento REAL NOT NULL
+                )
+            """)
+            conexion.commit()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"No se pudo preparar la cache compartida en {self.ruta}: {e}")
+        finally:
+            if conexion: conexion.close()
+
+    def version_datos(self):
+        """Versión de datos vigente como texto (None si no se pudo consultar)."""
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._version_consultada < self.ttl_version:
+                return self._version
+        try:
+            version = "|".join(str(valor) for valor in self.obtener_version())
+        except Exception as e:
+            logger.warning(f"No se pudo consultar la versión de datos: {e}")
+            return None
+
+        with self._lock:
+            cambio = version != self._version
+            self._version = version
+            self._version_consultada = time.monotonic()
+        if cambio:
+            self._purgar(version)
+        return version
+
+    def olvidar_version(self):
+        """Después de escribir: la próxima lectura vuelve a consultar la versión."""
+        with self._lock:
+            self._version = None
+
+    def obtener(self, clave, version):
+        """Retorna (True, resultado) si otro proceso (o este) ya lo calculó con esta versión de datos."""
+        conexion = None
+        try:
+            conexion = self._abrir()
+            fila = conexion.execute(
+                "SELECT resultado FROM resultados WHERE clave = ? AND version = ?", (clave, version)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error leyendo la cache compartida: {e}")
+            fila = None
+        finally:
+            if conexion: conexion.close()
+
+        with self._lock:
+            if fila is None:
+                self._fallos += 1
+                return False, None
+            self._aciertos += 1
+        # El archivo solo lo escriben los procesos de esta app
+        return True, pickle.loads(fila[0])
+
+    def guardar(self, clave, version, resultado):
+        conexion = None
+        try:
+            conexion = self._abrir()
+            conexion.execute(
+                "INSERT OR REPLACE INTO resultados (clave, version, resultado, momento) VALUES (?, ?, ?, ?)",
+                (clave, version, pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL), time.time())
+            )
+            # Tope de entradas: se van las más viejas
+            conexion.execute("""
+                DELETE FROM resultados WHERE clave IN (
+                    SELECT clave FROM resultados ORDER BY momento DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.maximo_entradas,))
+            conexion.commit()
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            logger.warning(f"Error guardando en la cache compartida: {e}")
+        finally:
+            if conexion: conexion.close()
+
+    def _purgar(self, version):
+        """Borra las entradas de versiones anteriores (ya no las puede pedir nadie)."""
+        conexion = None
+        try:
+            conexion = self._abrir()
+            conexion.execute("DELETE FROM resultados WHERE version <> ?", (version,))
+            conexion.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error limpiando la cache compartida: {e}")
+        finally:
+            if conexion: conexion.close()
+
+    def obtener_metricas(self):
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                'ruta': self.ruta,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'tasa_aciertos': (self._aciertos / consultas) if consultas else 0.0
+            }
+
+class CacheEdicionesFinalizadas:
+    """
+    Almacén permanente en disco de las estadísticas de ediciones finalizadas (no cambian más).
+    Un archivo por resultado (pickle comprimido con zlib) dentro de una carpeta por edición;
+    se escribe la primera vez que se calcula y se reutiliza en todas las sesiones siguientes.
+    Lo borran las acciones de LIMPIAN_FINALIZADAS. Además, cada archivo lleva en el nombre el
+    sello de la edición (BaseDeDatos.obtener_sello_edicion_finalizada): si otro proceso la
+    modificó, el sello cambia y el archivo viejo simplemente deja de encontrarse.
+    """
+    def __init__(self, obtener_sello, ruta=RUTA_CACHE_FINALIZADAS):
+        self.obtener_sello = obtener_sello
+        self.ruta = ruta
+
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        # edicion_id -> momento (monotonic) en que se vio que NO estaba finalizada
+        self._no_finalizadas = {}
+
+    def sello(self, edicion_id):
+        """Sello de la edición si está finalizada; None si no lo está o si no se pudo consultar."""
+        with self._lock:
+            visto = self._no_finalizadas.get(edicion_id)
+        if visto is not None and time.monotonic() - visto < TTL_EDICION_NO_FINALIZADA:
+            # Edición en curso: no vale la pena consultar el sello en cada lectura
+            return None
+        try:
+            sello = self.obtener_sello(edicion_id)
+        except Exception as e:
+            logger.warning(f"No se pudo consultar el estado de la edición {edicion_id}: {e}")
+            return None
+        with self._lock:
+            if sello is None:
+                self._no_finalizadas[edicion_id] = time.monotonic()
+            else:
+                self._no_finalizadas.pop(edicion_id, None)
+        return sello
+
+    def _archivo(self, edicion_id, sello, clave):
+        nombre = hashlib.sha1(f"{sello}|{clave}".encode("utf-8")).hexdigest()
+        return os.path.join(self.ruta, str(edicion_id), nombre + ".bin")
+
+    def obtener(self, edicion_id, sello, clave):
+        archivo = self._archivo(edicion_id, sello, clave)
+        try:
+            with open(archivo, "rb") as f:
+                resultado = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            with self._lock:
+                self._fallos += 1
+            return False, None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Archivo de cache dañado ({archivo}), se recalcula: {e}")
+            return False, None
+        with self._lock:
+            self._aciertos += 1
+        return True, resultado
+
+    def guardar(self, edicion_id, sello, clave, resultado):
+        archivo = self._archivo(edicion_id, sello, clave)
+        temporal = f"{archivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(archivo), exist_ok=True)
+            with open(temporal, "wb") as f:
+                f.write(zlib.compress(pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL)))
+            # Reemplazo atómico: otro proceso nunca lee un archivo a medio escribir
+            os.replace(temporal, archivo)
+        except (OSError, pickle.PicklingError) as e:
+            logger.warning(f"No se pudo guardar la cache de la edición {edicion_id}: {e}")
+
+    def limpiar(self):
+        """Borra todo el almacén (una edición finalizada pudo cambiar)."""
+        with self._lock:
+            self._no_finalizadas.clear()
+        for carpeta, _, archivos in os.walk(self.ruta, topdown=False):
+            for archivo in archivos:
+                try:
+                    os.remove(os.path.join(carpeta, archivo))
+                except OSError as e:
+                    logger.warning(f"No se pudo borrar {archivo} de la cache de ediciones: {e}")
+            if carpeta != self.ruta:
+                try:
+                    os.rmdir(carpeta)
+                except OSError:
+                    pass
+
+    def obtener_metricas(self):
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                'ruta': self.ruta,
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'tasa_aciertos': (self._aciertos / consultas) if consultas else 0.0
+            }
+
+class BaseDeDatosCacheada:
+    """
+    Envoltorio de BaseDeDatos que guarda el resultado de las lecturas de LECTURAS
+    y lo descarta cuando alguna de las escrituras de ESCRITURAS toca sus tablas.
+    Con 'obtener_version' (BaseDeDatos.obtener_version_datos) las entradas de memoria quedan atadas a la
+    versión de datos de la base, así también se descartan las escrituras de OTROS procesos (el bot y la
+    app de escritorio), consultándola a lo sumo cada TTL_VERSION_DATOS_MEMORIA segundos.
+    Con 'compartida' (CacheCompartida), lo que falta en memoria se busca en el archivo compartido
+    con los otros procesos antes de ir a la base; la versión de datos sale de ahí.
+    Con 'finalizadas' (CacheEdicionesFinalizadas), las estadísticas de una edición finalizada
+    se leen de disco antes de calcularlas.
+    Los métodos conservan exactamente los mismos argumentos, resultados y excepciones;
+    el resto de los métodos y atributos pasan directo a la BaseDeDatos original.
+    """
+    def __init__(self, db, cache=None, compartida=None, finalizadas=None, obtener_version=None):
+        self.db = db
+        self.obtener_version = obtener_version
+        self._version_memoria = None # (momento, versión) de la última consulta
+        self.cache = cache or CacheConsultas()
+        self.compartida = compartida
+        self.finalizadas = finalizadas
+        self._metodos = {}
+        self._version_datos_vista = None
+
+    def __getattr__(self, nombre):
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+
+        metodo = getattr(self.db, nombre)
+        if not callable(metodo) or (nombre not in LECTURAS and nombre not in ESCRITURAS):
+            return metodo
+
+        envoltorio = self._metodos.get(nombre)
+        if envoltorio is None:
+            if nombre in LECTURAS:
+                envoltorio = self._envolver_lectura(nombre, metodo, LECTURAS[nombre])
+            else:
+                envoltorio = self._envolver_escritura(nombre, metodo, ESCRITURAS[nombre])
+            self._metodos[nombre] = envoltorio
+        return envoltorio
+
+    def _envolver_lectura(self, nombre, metodo, tablas):
+        cache = self.cache
+        compartida = self.compartida
+        finalizadas = self.finalizadas if nombre in LECTURAS_POR_EDICION else None
+        firma = inspect.signature(metodo)
+
+        def envoltorio(*args, **kwargs):
+            # Clave por argumentos ya resueltos: obtener_ranking(3) y obtener_ranking(edicion_id=3) son la misma
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            version = cache.version(tablas)
+            version_datos = self._version_datos()
+            clave = (nombre, _congelar(argumentos.arguments), version, version_datos)
+            encontrado, resultado = cache.obtener(clave)
+
+            clave_compartida = repr(clave[:2])
+            if not encontrado and compartida and version_datos is not None:
+                encontrado, resultado = compartida.obtener(clave_compartida, version_datos)
+                if encontrado:
+                    cache.guardar(clave, resultado, tablas, version)
+
+            edicion_id = sello = None
+            if not encontrado and finalizadas:
+                edicion_id = argumentos.arguments.get('edicion_id')
+                sello = finalizadas.sello(edicion_id) if edicion_id else None
+                if sello:
+                    encontrado, resultado = finalizadas.obtener(edicion_id, sello, clave_compartida)
+                    if encontrado:
+                        cache.guardar(clave, resultado, tablas, version)
+
+            if not encontrado:
+                resultado = metodo(*args, **kwargs)
+                # Las listas vacías / None suelen ser un error ya registrado: no se guardan
+                if resultado:
+                    cache.guardar(clave, resultado, tablas, version)
+                    if compartida and version_datos is not None:
+                        compartida.guardar(clave_compartida, version_datos, resultado)
+                    if sello:
+                        finalizadas.guardar(edicion_id, sello, clave_compartida, resultado)
+            # Copia superficial: hay pantallas que ordenan la lista que reciben
+            return copy.copy(resultado) if isinstance(resultado, (list, dict)) else resultado
+
+        envoltorio.__name__ = nombre
+        envoltorio.__doc__ = metodo.__doc__
+        return envoltorio
+
+    def _version_datos(self):
+        """Versión de datos vigente como texto (None si no hay con qué consultarla o si falló)."""
+        if self.compartida:
+            return self.compartida.version_datos()
+        if self.obtener_version is None:
+            return None
+        vista = self._version_memoria
+        if vista and time.monotonic() - vista[0] < TTL_VERSION_DATOS_MEMORIA:
+            return vista[1]
+        try:
+            version = "|".join(str(valor) for valor in self.obtener_version())
+        except Exception as e:
+            logger.warning(f"No se pudo consultar la versión de datos: {e}")
+            return None
+        if vista and vista[1] != version:
+            # Escribió otro proceso: lo guardado con la versión anterior ya no se va a pedir
+            self.cache.limpiar()
+        self._version_memoria = (time.monotonic(), version)
+        return version
+
+    def _envolver_escritura(self, nombre, metodo, tablas):
+        cache = self.cache
+        compartida = self.compartida
+        finalizadas = self.finalizadas if nombre in LIMPIAN_FINALIZADAS else None
+
+        def envoltorio(*args, **kwargs):
+            try:
+                return metodo(*args, **kwargs)
+            finally:
+                # Aunque falle, parte de la escritura pudo haberse confirmado
+                cache.subir_version(tablas)
+                if compartida:
+                    compartida.olvidar_version()
+                self._version_memoria = None
+                if finalizadas:
+                    finalizadas.limpiar()
+
+        envoltorio.__name__ = metodo.__name__
+        envoltorio.__doc__ = metodo.__doc__
+        return envoltorio
+
+    def obtener_version_datos_vigente(self):
+        """
+        Igual que en BaseDeDatos. Si la versión cambió por una escritura de OTRO proceso, se descartan
+        las lecturas guardadas para que lo que se arme con esta versión no use datos viejos.
+        """
+        version = self.db.obtener_version_datos_vigente()
+        if self._version_datos_vista is not None and version != self._version_datos_vista:
+            self.cache.limpiar()
+        self._version_datos_vista = version
+        return version
+
+    def obtener_lote(self, pedidos):
+        """Igual que BaseDeDatos.obtener_lote, pero cada lectura pasa primero por la cache."""
+        return self.db.obtener_lote(pedidos, origen=self)
+
+    def obtener_metricas_cache(self):
+        metricas = self.cache.obtener_metricas()
+        if self.compartida:
+            metricas['compartida'] = self.compartida.obtener_metricas()
+        if self.finalizadas:
+            metricas['finalizadas'] = self.finalizadas.obtener_metricas()
+        return metricas
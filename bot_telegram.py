@@ -2,8 +2,7 @@ import os
 import random
 import datetime
 import sys
-from datetime import timedelta
-import threading
+import asyncio
 import pytz
 import smtplib
 from email.message import EmailMessage
@@ -13,7 +12,12 @@ from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler, 
     filters, ContextTypes, ConversationHandler
 )
-from base_de_datos import BaseDeDatos
+from base_de_datos import obtener_base_de_datos
+from base_de_datos_async import BaseDeDatosAsync
+from filtro_consulta import FiltroConsulta
+from difusion_telegram import DifusorTelegram, ENVIO_OK
+from registro_bot import RegistroAsincrono
+from agenda_recordatorios import ReconciliadorRecordatorios, ALARMA_INSISTENCIA, ALARMA_POSICIONES, ALARMA_CUMPLIDORES
 
 # Intentar activar el Wake Lock automáticamente al arrancar el bot
 try:
@@ -23,6 +27,7 @@ except:
     print("⚠️ No se pudo activar el Wake Lock (¿No estás en Termux?)")
 
 SEGUNDOS_ANTES = 12 * 3600 # 12 horas antes del partido, en segundos
+SEGUNDOS_ENTRE_RECONCILIACIONES = 15 * 60 # Cada cuánto se comparan las alarmas con la agenda (cambios hechos desde la app de escritorio)
 
 class RobotTelegram:
     # --- ESTADOS DE CONVERSACIÓN (Atributos de Clase) ---
@@ -73,8 +78,18 @@ class RobotTelegram:
         self.email_pass = os.getenv("EMAIL_PASSWORD")
         self.limite_errores = 10 # Podría ser un env también
 
-        # Instanciamos la base de datos
-        self.db = BaseDeDatos()
+        # Logs: los handlers solo encolan y un hilo los escribe en lotes (junto al script o al ejecutable)
+        carpeta_logs = sys._MEIPASS if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+        self.registro = RegistroAsincrono(carpeta_logs, pytz.timezone('America/Argentina/Buenos_Aires'))
+
+        # Usamos la base de datos compartida del proceso
+        self.db = obtener_base_de_datos()
+        # Versión asíncrona para los handlers: las consultas corren en hilos y no frenan el event loop
+        self.db_async = BaseDeDatosAsync(self.db)
+        # Envíos masivos concurrentes respetando los límites de Telegram
+        self.difusor = DifusorTelegram()
+        # Textos de la tabla de posiciones ya armados: {(edicion_id, titulo, versión de datos): mensaje}
+        self._tablas_armadas = {}
 
         # Construimos la aplicación de Telegram
         self.app = ApplicationBuilder().token(self.token).build()
@@ -82,15 +97,27 @@ class RobotTelegram:
         # Registramos los flujos
         self._setup_handlers()
 
-        # 🚀 DISPARAMOS EL CÁLCULO DE CRONÓMETROS 
-        self._programar_cronometros_partidos()
+        # 🚀 CRONÓMETROS: se restauran del archivo local sin esperar a la base y, ya con el bot escuchando,
+        # se reconcilian contra la agenda en segundo plano (solo se tocan los partidos que cambiaron)
+        self.recordatorios = ReconciliadorRecordatorios(self.app.job_queue, {
+            ALARMA_INSISTENCIA: self._disparar_recordatorio,
+            ALARMA_POSICIONES: self._disparar_alerta_posiciones,
+            ALARMA_CUMPLIDORES: self._disparar_recordatorio_cumplidores,
+        })
+        self._restaurar_cronometros_partidos()
+        self.app.job_queue.run_repeating(
+            self._tarea_reconciliar_cronometros,
+            interval=SEGUNDOS_ENTRE_RECONCILIACIONES,
+            first=0,
+            name="reconciliar_cronometros"
+        )
     
     # --- MÉTODOS GENÉRICOS PARA RANKINGS ---
     
     async def _iniciar_ranking_generico(self, update: Update, context: ContextTypes.DEFAULT_TYPE, mensaje: str, estado_siguiente: int):
         """Paso 1 Genérico: Pregunta Histórica vs Torneo."""
         id_telegram = update.message.from_user.id
-        if not self.db.obtener_usuario_por_telegram(id_telegram):
+        if not await self.db_async.obtener_usuario_por_telegram(id_telegram):
             await update.message.reply_text("❌ Tenés que asociar tu cuenta primero.")
             return ConversationHandler.END
 
@@ -114,7 +141,7 @@ class RobotTelegram:
             return await funcion_imprimir(update, context, edicion_id=None, titulo="Histórica")
             
         elif texto == "2_ Por Torneo":
-            ediciones = self.db.obtener_ediciones(solo_finalizados=solo_finalizados)
+            ediciones = await self.db_async.obtener_ediciones(solo_finalizados=solo_finalizados)
             if not ediciones:
                 await update.message.reply_text("❌ No hay torneos registrados (o con partidos finalizados) todavía.")
                 await self.mostrar_menu(update, context)
@@ -158,9 +185,9 @@ class RobotTelegram:
         return await funcion_imprimir(update, context, edicion_id=edicion_id, titulo=texto)
 
     # --- FÁBRICAS DE CALLBACKS (Solución al error de __name__) ---
-    def _generar_botones_ediciones(self, incluir_historico=True):
+    async def _generar_botones_ediciones(self, incluir_historico=True):
         """Genera el teclado con todos los torneos disponibles leyendo la BD."""
-        ediciones = self.db.obtener_ediciones()
+        ediciones = await self.db_async.obtener_ediciones()
         botones = []
         
         # Opcionalmente agregamos el botón Histórico al principio
@@ -206,9 +233,9 @@ class RobotTelegram:
     async def iniciar_administracion(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Menú principal de Administración (Exclusivo para Admins)."""
         id_telegram = update.message.from_user.id
-        username = self.db.obtener_usuario_por_telegram(id_telegram)
+        username = await self.db_async.obtener_usuario_por_telegram(id_telegram)
         
-        if username not in self.db.obtener_administradores():
+        if username not in await self.db_async.obtener_administradores():
             await update.message.reply_text("⛔ *Acceso Denegado*", parse_mode="Markdown")
             return ConversationHandler.END
             
@@ -297,7 +324,7 @@ class RobotTelegram:
         
         try:
             # Mandamos a eliminar de forma limpia
-            self.db.eliminar_rival_manual(equipo_elegido['id'])
+            await self.db_async.eliminar_rival_manual(equipo_elegido['id'])
             
             await update.message.reply_text(
                 f"✅ ¡El equipo *{equipo_elegido['nombre']}* fue eliminado correctamente de la base de datos!",
@@ -347,7 +374,7 @@ class RobotTelegram:
             return await self.iniciar_admin_equipos(update, context)
             
         if texto == "1_ Ver partidos":
-            partidos = self.db.obtener_partidos_por_rival(equipo['id'])
+            partidos = await self.db_async.obtener_partidos_por_rival(equipo['id'])
             if not partidos:
                 await update.message.reply_text("No se encontraron partidos.")
                 return self.esperando_confirmacion_eliminar_equipo
@@ -387,10 +414,11 @@ class RobotTelegram:
         elif texto == "2_ Sí":
             try:
                 # 1. Primero borramos todos los partidos (y sus pronósticos caen solos)
-                self.db.eliminar_partidos_por_rival(equipo['id'])
+                await self.db_async.eliminar_partidos_por_rival(equipo['id'])
+                self._reconciliar_cronometros_en_segundo_plano()
                 
                 # 2. Ahora que el equipo está "limpio", lo borramos
-                self.db.eliminar_equipo_forzado(equipo['id']) # O usar self.db.eliminar_rival_manual(equipo['id'])
+                await self.db_async.eliminar_equipo_forzado(equipo['id']) # O usar self.db.eliminar_rival_manual(equipo['id'])
                 
                 await update.message.reply_text(
                     f"✅ *¡ELIMINACIÓN FORZADA EXITOSA!*\n\nEl equipo *{equipo['nombre']}* y todo su rastro "
@@ -417,7 +445,7 @@ class RobotTelegram:
 
     async def _mostrar_lista_equipos(self, update: Update, context: ContextTypes.DEFAULT_TYPE, texto_pregunta: str):
         """Función reutilizable: Lista los equipos enumerados desde 1 y devuelve un mapa de IDs."""
-        rivales = self.db.obtener_rivales()
+        rivales = await self.db_async.obtener_rivales()
         if not rivales:
             await update.message.reply_text("❌ No hay equipos registrados en la base de datos.")
             return False
@@ -511,7 +539,7 @@ class RobotTelegram:
             
         try:
             # Usamos la función actualizar_rival que ya tiene el manejo de errores MySQL integrado
-            self.db.actualizar_rival(equipo['id'], nuevo_nombre)
+            await self.db_async.actualizar_rival(equipo['id'], nuevo_nombre)
             
             await update.message.reply_text(
                 f"✅ ¡Excelente! El equipo *{equipo['nombre']}* ahora se llama *{nuevo_nombre}* en la base de datos.",
@@ -558,7 +586,7 @@ class RobotTelegram:
             
         try:
             # Intentamos insertar en la base de datos
-            self.db.insertar_rival_manual(texto)
+            await self.db_async.insertar_rival_manual(texto)
             
             await update.message.reply_text(
                 f"✅ ¡El equipo *{texto}* fue agregado con éxito a la base de datos!",
@@ -581,7 +609,7 @@ class RobotTelegram:
     
     async def iniciar_ver_partidos_admin(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Paso 1 Admin Ver Partidos: Usa la función existente para listar los torneos."""
-        botones = self._generar_botones_ediciones(incluir_historico=False)
+        botones = await self._generar_botones_ediciones(incluir_historico=False)
         await update.message.reply_text(
             "📋 *Ver Partidos*\n\n"
             "Seleccioná el torneo del cual querés ver el listado de partidos:",
@@ -595,7 +623,7 @@ class RobotTelegram:
         texto_edicion = update.message.text.strip()
         
         # 1. Obtenemos el ID del torneo usando tu lógica reutilizable
-        ediciones = self.db.obtener_ediciones()
+        ediciones = await self.db_async.obtener_ediciones()
         edicion_id_real = None
         
         for ed in ediciones:
@@ -608,7 +636,7 @@ class RobotTelegram:
             return self.esperando_edicion_ver_partidos
             
         # 2. Buscamos los partidos usando la nueva función
-        partidos = self.db.obtener_partidos_admin_por_edicion(edicion_id_real)
+        partidos = await self.db_async.obtener_partidos_admin_por_edicion(edicion_id_real)
         
         if not partidos:
             await update.message.reply_text(f"🤷‍♂️ Todavía no hay partidos cargados para *{texto_edicion}*.", parse_mode="Markdown")
@@ -690,7 +718,7 @@ class RobotTelegram:
                 return self.esperando_fecha_resultado
                 
             # 2. Buscar en la base de datos
-            partido = self.db.obtener_partido_por_fecha_exacta(texto_fecha)
+            partido = await self.db_async.obtener_partido_por_fecha_exacta(texto_fecha)
             
             if not partido:
                 await update.message.reply_text(
@@ -756,7 +784,7 @@ class RobotTelegram:
             goles_rival = int(partes[1].strip())
             
             # 1. Actualizar DB
-            self.db.actualizar_goles_partido(partido['id'], goles_cai, goles_rival)
+            await self.db_async.actualizar_goles_partido(partido['id'], goles_cai, goles_rival)
             
             # 2. Armar texto de confirmación
             rival = partido['rival']
@@ -1122,16 +1150,48 @@ class RobotTelegram:
         self.app.add_handler(conv_handler)
         self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.mostrar_menu))
 
-    def _generar_texto_tabla_posiciones(self, edicion_id, titulo):
-        """Extrae la lógica de dibujo de la tabla para que el bot pueda enviarla automáticamente."""
-        ranking = self.db.obtener_ranking(edicion_id=edicion_id)
-        usuarios_db = self.db.obtener_usuarios_con_id()
+    async def _generar_texto_tabla_posiciones(self, edicion_id, titulo):
+        """
+        Extrae la lógica de dibujo de la tabla para que el bot pueda enviarla automáticamente.
+        El texto armado se guarda por (edición, título, versión de datos): mientras nadie cargue
+        un pronóstico o un resultado, los pedidos, alertas y difusiones siguientes lo reutilizan.
+        Si no se pudo leer la versión o alguna lectura vino vacía (puede ser un error de la base),
+        la tabla se arma igual pero no se guarda.
+        """
+        try:
+            version = await self.db_async.obtener_version_datos_vigente()
+        except Exception as e:
+            tipo_error = type(e).__name__
+            self._registrar_log(f"No se pudo leer la versión de datos para la tabla '{titulo}'. Tipo: {tipo_error} | Detalle: {e}", archivo="logs_errores_bot.txt")
+            mensaje, _ = await self._armar_texto_tabla_posiciones(edicion_id, titulo)
+            return mensaje
+
+        clave = (edicion_id, titulo, version)
+        mensaje = self._tablas_armadas.get(clave)
+        if mensaje is None:
+            mensaje, completa = await self._armar_texto_tabla_posiciones(edicion_id, titulo)
+            # Las tablas de versiones anteriores ya no se van a pedir
+            self._tablas_armadas = {c: m for c, m in self._tablas_armadas.items() if c[2] == version}
+            if completa:
+                self._tablas_armadas[clave] = mensaje
+        return mensaje
+
+    async def _armar_texto_tabla_posiciones(self, edicion_id, titulo):
+        """Retorna (mensaje, completa): completa es False si el ranking o los usuarios vinieron vacíos."""
+        lote = await self.db_async.obtener_lote({
+            'ranking': ('obtener_ranking', {'edicion_id': edicion_id}),
+            'usuarios': 'obtener_usuarios_con_id',
+        })
+        ranking = lote['ranking']
+        usuarios_db = lote['usuarios']
+        # Igual que BaseDeDatosCacheada: un resultado vacío puede ser un error ya registrado
+        completa = bool(ranking) and bool(usuarios_db)
         todos_los_usuarios = [u[1] for u in usuarios_db]
-        usuarios_con_puntos = [row[0] for row in ranking]
+        usuarios_con_puntos = {row[0] for row in ranking}
         usuarios_sin_pronosticos = [u for u in todos_los_usuarios if u not in usuarios_con_puntos]
         
         if not ranking and not usuarios_sin_pronosticos:
-            return "📉 Todavía no hay usuarios registrados en el sistema."
+            return "📉 Todavía no hay usuarios registrados en el sistema.", completa
             
         mensaje = f"🏆 *Tabla de Posiciones: {titulo}* 🏆\n\n"
         
@@ -1158,18 +1218,15 @@ class RobotTelegram:
             lista_nombres = ", ".join(usuarios_sin_pronosticos)
             mensaje += f"🚫 *Últimos (Sin pronósticos):*\n_{lista_nombres}_"
             
-        return mensaje
+        return mensaje, completa
 
     async def imprimir_tabla(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Se activa cuando el usuario toca manualmente 'Ver posiciones'."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Posiciones ({titulo})"), 
-            daemon=True
-        ).start()
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Posiciones ({titulo})"))
 
         try: # 🌟 NUEVO BLOQUE TRY
-            mensaje = self._generar_texto_tabla_posiciones(edicion_id, titulo)
+            mensaje = await self._generar_texto_tabla_posiciones(edicion_id, titulo)
             
             # Agregamos el botón de explicar reglas junto al de volver
             botones_tabla = [
@@ -1226,7 +1283,7 @@ class RobotTelegram:
         fecha_str = datos['fecha'].strftime('%d/%m a las %H:%M')
         
         # Obtenemos quiénes SÍ pronosticaron este partido
-        cumplidores = self.db.obtener_usuarios_con_pronostico_por_partido(partido_id)
+        cumplidores = await self.db_async.obtener_usuarios_con_pronostico_por_partido(partido_id)
         if not cumplidores: return
         
         # Botón único para limpiar la pantalla y dejar solo el regreso al menú
@@ -1240,67 +1297,58 @@ class RobotTelegram:
             f"Tu pronóstico ya se encuentra registrado y asegurado. ¡Éxitos! 👹"
         )
         
-        for tg_id, username in cumplidores:
-            try:
-                if username == 'Gabriel':
-                    await context.bot.send_message(chat_id=tg_id, text=mensaje, parse_mode="Markdown", reply_markup=teclado)
-                    self._registrar_log(f"Aviso enviado a {username} (Faltan 24 hs - Partido: {rival})")
-            except Exception as e:
-                self._registrar_log(f"FALLO al avisar a {username} (Faltan 24 hs): {e}", archivo="logs_errores_bot.txt")
+        destinatarios = [(tg_id, username) for tg_id, username in cumplidores if username == 'Gabriel']
+        resumen = await self.difusor.difundir(context.bot, destinatarios, texto=mensaje, parse_mode="Markdown", reply_markup=teclado)
+        for resultado in resumen['resultados']:
+            if resultado['estado'] == ENVIO_OK:
+                self._registrar_log(f"Aviso enviado a {resultado['username']} (Faltan 24 hs - Partido: {rival})")
+            else:
+                self._registrar_log(f"FALLO al avisar a {resultado['username']} (Faltan 24 hs): {resultado['error']}", archivo="logs_errores_bot.txt")
 
-    def _programar_cronometros_partidos(self):
-        """Busca partidos futuros y crea alarmas con nombre para poder resetearlas."""
-        partidos = self.db.obtener_agenda_partidos_futuros()
-        if not partidos: return
-        
+    def _restaurar_cronometros_partidos(self):
+        """Vuelve a programar las alarmas guardadas en el archivo local (no consulta la base)."""
+        zona_horaria = pytz.timezone('America/Argentina/Buenos_Aires')
+        try:
+            restauradas = self.recordatorios.restaurar(datetime.datetime.now(zona_horaria))
+            print(f"\n\n⏰ {restauradas} cronómetros restaurados del archivo local\n\n")
+        except Exception as e:
+            # Si el archivo no se puede leer, la reconciliación en segundo plano los vuelve a crear desde la base
+            tipo_error = type(e).__name__
+            self._registrar_log(f"Fallo al restaurar cronómetros del archivo local. Tipo: {tipo_error} | Detalle: {e}", archivo="logs_errores_bot.txt")
+
+    async def _reconciliar_cronometros_partidos(self):
+        """Compara las alarmas programadas con la agenda de la DB y solo agrega, mueve o cancela las que cambiaron.
+        Retorna None si no se pudo leer la agenda (en ese caso no se toca ninguna alarma)."""
+        partidos = await self.db_async.obtener_agenda_partidos_futuros()
+        if partidos is None:
+            # Falló la lectura: comparar contra eso cancelaría todas las alarmas
+            self._registrar_log("No se pudo leer la agenda de partidos: se mantienen los cronómetros programados.", archivo="logs_errores_bot.txt")
+            return None
         zona_horaria = pytz.timezone('America/Argentina/Buenos_Aires')
         ahora = datetime.datetime.now(zona_horaria)
-        
-        for p_id, rival, fecha, edicion_id, nombre_torneo in partidos:
-            try: # 🌟 NUEVO: Protegemos cada iteración de manera individual
-                fecha_local = zona_horaria.localize(fecha)
-                
-                # 1. Alarmas de insistencia para los que NO pronosticaron
-                horas_aviso = [96, 48, 24, 1]
-                for horas in horas_aviso:
-                    fecha_alarma = fecha_local - timedelta(hours=horas)
-                    if fecha_alarma > ahora:
-                        self.app.job_queue.run_once(
-                            self._disparar_recordatorio, 
-                            when=fecha_alarma, 
-                            data={'partido_id': p_id, 'rival': rival, 'fecha': fecha_local, 'horas': horas},
-                            name="recordatorio_partido",
-                            job_kwargs={'misfire_grace_time': SEGUNDOS_ANTES}
-                        )
-                
-                # 2. ALARMA DE TABLA (1 HORA ANTES)
-                fecha_alarma_posiciones = fecha_local - timedelta(hours=1)
-                if fecha_alarma_posiciones > ahora:
-                    self.app.job_queue.run_once(
-                        self._disparar_alerta_posiciones, 
-                        when=fecha_alarma_posiciones, 
-                        data={'partido_id': p_id, 'rival': rival, 'edicion_id': edicion_id, 'nombre_torneo': nombre_torneo},
-                        name="recordatorio_partido",
-                        job_kwargs={'misfire_grace_time': SEGUNDOS_ANTES}
-                    )
+        resumen = self.recordatorios.reconciliar(partidos, zona_horaria, ahora)
 
-                # 3. NUEVA ALARMA: RECORDATORIO 24 HORAS
-                fecha_alarma_24h = fecha_local - timedelta(hours=24)
-                if fecha_alarma_24h > ahora:
-                    self.app.job_queue.run_once(
-                        self._disparar_recordatorio_cumplidores, 
-                        when=fecha_alarma_24h, 
-                        data={'partido_id': p_id, 'rival': rival, 'fecha': fecha_local},
-                        name="recordatorio_partido",
-                        job_kwargs={'misfire_grace_time': SEGUNDOS_ANTES}
-                    )
-            except Exception as e:
-                # 🌟 NUEVO: Si un partido falla, lo anotamos y seguimos con el próximo
-                tipo_error = type(e).__name__
-                self._registrar_log(f"Fallo al programar alarmas para partido {p_id} ({rival}). Tipo: {tipo_error} | Detalle: {e}", archivo="logs_errores_bot.txt")
-                continue # Pasa al siguiente partido del 'for'
-                
-        print("\n\n⏰ Cronómetros configurados a las " + ahora.strftime('%Y-%m-%d %H:%M:%S') + "\n\n")
+        for p_id, rival, e in resumen['errores']:
+            # Si un partido falla, lo anotamos (los demás se programaron igual)
+            tipo_error = type(e).__name__
+            self._registrar_log(f"Fallo al programar alarmas para partido {p_id} ({rival}). Tipo: {tipo_error} | Detalle: {e}", archivo="logs_errores_bot.txt")
+
+        if resumen['agregadas'] or resumen['movidas'] or resumen['canceladas']:
+            print(f"\n\n⏰ Cronómetros reconciliados a las {ahora.strftime('%Y-%m-%d %H:%M:%S')}: "
+                  f"{resumen['agregadas']} nuevos, {resumen['movidas']} movidos, {resumen['canceladas']} cancelados\n\n")
+        return resumen
+
+    async def _tarea_reconciliar_cronometros(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job en segundo plano: al arrancar, cada SEGUNDOS_ENTRE_RECONCILIACIONES y después de editar partidos."""
+        try:
+            await self._reconciliar_cronometros_partidos()
+        except Exception as e:
+            tipo_error = type(e).__name__
+            self._registrar_log(f"Fallo al reconciliar cronómetros. Tipo: {tipo_error} | Detalle: {e}", archivo="logs_errores_bot.txt")
+
+    def _reconciliar_cronometros_en_segundo_plano(self):
+        """Encola una reconciliación inmediata sin frenar al handler que la pide."""
+        self.app.job_queue.run_once(self._tarea_reconciliar_cronometros, when=0, name="reconciliar_cronometros")
 
     async def _disparar_recordatorio(self, context: ContextTypes.DEFAULT_TYPE):
         """Se ejecuta cuando un cronómetro llega a 0."""
@@ -1312,7 +1360,7 @@ class RobotTelegram:
         fecha_str = fecha_partido.strftime('%d/%m a las %H:%M')
         
         # Buscamos quiénes NO pronosticaron este partido en concreto
-        colgados = self.db.obtener_usuarios_sin_pronostico_por_partido(partido_id)
+        colgados = await self.db_async.obtener_usuarios_sin_pronostico_por_partido(partido_id)
         if not colgados: return # Si todos pronosticaron, muere acá sin molestar
         
         # Botones para ofrecer atajo directo o volver al menú
@@ -1355,18 +1403,20 @@ class RobotTelegram:
         else:
             alerta = f"⚠️ *RECORDATORIO* ⚠️\nFaltan solo *{texto_tiempo}*"
             
-        for tg_id, username in colgados:
-            mensaje = (
+        def armar_mensaje(username):
+            return (
                 f"{alerta} para el partido contra *{rival}* ({fecha_str}).\n\n"
                 f"Todavía no tenemos tu pronóstico registrado, {username}.\n\n"
                 f"👇 ¡Usá el botón de abajo para cargarlo rápido y sumar puntos!"
             )
-            try:
-                if username == 'Gabriel':
-                    await context.bot.send_message(chat_id=tg_id, text=mensaje, parse_mode="Markdown", reply_markup=teclado)
-                    self._registrar_log(f"Aviso enviado a {username} (Faltan {horas_faltantes}hs - Partido: {rival})")
-            except Exception as e:
-                self._registrar_log(f"FALLO al avisar a {username} (Faltan {horas_faltantes}hs): {e}", archivo="logs_errores_bot.txt")
+
+        destinatarios = [(tg_id, username) for tg_id, username in colgados if username == 'Gabriel']
+        resumen = await self.difusor.difundir(context.bot, destinatarios, armar_texto=armar_mensaje, parse_mode="Markdown", reply_markup=teclado)
+        for resultado in resumen['resultados']:
+            if resultado['estado'] == ENVIO_OK:
+                self._registrar_log(f"Aviso enviado a {resultado['username']} (Faltan {horas_faltantes}hs - Partido: {rival})")
+            else:
+                self._registrar_log(f"FALLO al avisar a {resultado['username']} (Faltan {horas_faltantes}hs): {resultado['error']}", archivo="logs_errores_bot.txt")
 
     async def _disparar_alerta_posiciones(self, context: ContextTypes.DEFAULT_TYPE):
         """Envía la tabla de posiciones 1 hora antes del partido a los usuarios que ya pronosticaron."""
@@ -1377,22 +1427,22 @@ class RobotTelegram:
         nombre_torneo = datos['nombre_torneo']
         
         # Obtenemos quiénes ya cumplieron con su pronóstico
-        cumplidores = self.db.obtener_usuarios_con_pronostico_por_partido(partido_id)
+        cumplidores = await self.db_async.obtener_usuarios_con_pronostico_por_partido(partido_id)
         if not cumplidores: return
         
         # Armamos el mensaje invocando a la función generadora de la tabla
         mensaje_intro = f"📊 Informamos la tabla de posiciones a falta de 1 hora para el partido contra *{rival}*:\n\n"
-        tabla_texto = self._generar_texto_tabla_posiciones(edicion_id, nombre_torneo)
+        tabla_texto = await self._generar_texto_tabla_posiciones(edicion_id, nombre_torneo)
         mensaje_final = mensaje_intro + tabla_texto
         
         # Se lo mandamos por privado a cada usuario cumplidor
-        for tg_id, username in cumplidores:
-            try:
-                if username == 'Gabriel':
-                    await context.bot.send_message(chat_id=tg_id, text=mensaje_final, parse_mode="Markdown")
-                    self._registrar_log(f"Tabla de posiciones enviada a {username} (Falta 1h - Partido: {rival})")
-            except Exception as e:
-                self._registrar_log(f"FALLO al enviar tabla de posiciones a {username} (Falta 1h - Partido: {rival}): {e}", archivo="logs_errores_bot.txt")
+        destinatarios = [(tg_id, username) for tg_id, username in cumplidores if username == 'Gabriel']
+        resumen = await self.difusor.difundir(context.bot, destinatarios, texto=mensaje_final, parse_mode="Markdown")
+        for resultado in resumen['resultados']:
+            if resultado['estado'] == ENVIO_OK:
+                self._registrar_log(f"Tabla de posiciones enviada a {resultado['username']} (Falta 1h - Partido: {rival})")
+            else:
+                self._registrar_log(f"FALLO al enviar tabla de posiciones a {resultado['username']} (Falta 1h - Partido: {rival}): {resultado['error']}", archivo="logs_errores_bot.txt")
 
     # --- MÉTODOS DE APOYO (HELPERS) ---
 
@@ -1440,7 +1490,7 @@ class RobotTelegram:
     async def mostrar_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message: return ConversationHandler.END
         id_telegram = update.message.from_user.id
-        username = self.db.obtener_usuario_por_telegram(id_telegram)
+        username = await self.db_async.obtener_usuario_por_telegram(id_telegram)
         
         if username:
             botones = [
@@ -1449,7 +1499,7 @@ class RobotTelegram:
             ]
             
             # Verificamos si es admin y agregamos el botón
-            es_admin = username in self.db.obtener_administradores()
+            es_admin = username in await self.db_async.obtener_administradores()
             if es_admin:
                 botones.append(["5_ Administración"])
             
@@ -1548,11 +1598,8 @@ class RobotTelegram:
 
     async def iniciar_menu_perfil(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Submenú para los gráficos y porcentajes con explicación detallada."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, "Menú Perfil de la Comunidad"), 
-            daemon=True
-        ).start()
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, "Menú Perfil de la Comunidad"))
         # Sumamos el botón 3 en una nueva fila
         botones = [
             ["1_ Estilo de pronóstico", "2_ Tendencia de pronóstico"],
@@ -1597,7 +1644,7 @@ class RobotTelegram:
 
     async def procesar_identificador(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         identificador = update.message.text.strip()
-        usuario = self.db.buscar_usuario_para_asociar(identificador)
+        usuario = await self.db_async.buscar_usuario_para_asociar(identificador)
         
         if not usuario:
             await update.message.reply_text(
@@ -1616,7 +1663,7 @@ class RobotTelegram:
 
         codigo = str(random.randint(100000, 999999))
         
-        if self.db.guardar_token_recuperacion(username, codigo):
+        if await self.db_async.guardar_token_recuperacion(username, codigo):
             # Usamos self._enviar_correo_codigo
             envio_ok = self._enviar_correo_codigo(email_dest, codigo)
             
@@ -1649,9 +1696,9 @@ class RobotTelegram:
             return ConversationHandler.END
 
         try:
-            self.db.validar_token_recuperacion(username, codigo_ingresado)
+            await self.db_async.validar_token_recuperacion(username, codigo_ingresado)
             id_telegram = update.message.from_user.id
-            self.db.actualizar_id_telegram(username, id_telegram)
+            await self.db_async.actualizar_id_telegram(username, id_telegram)
             
             await update.message.reply_text(
                 f"🎉 *¡Éxito!* 🎉\n\n"
@@ -1677,7 +1724,7 @@ class RobotTelegram:
     async def iniciar_carga_pronostico(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Paso 1: Valida al usuario y muestra la lista de partidos futuros enumerados desde el 1."""
         id_telegram = update.message.from_user.id
-        username = self.db.obtener_usuario_por_telegram(id_telegram)
+        username = await self.db_async.obtener_usuario_por_telegram(id_telegram)
         
         if not username:
             await update.message.reply_text(
@@ -1688,7 +1735,7 @@ class RobotTelegram:
             return ConversationHandler.END
             
         context.user_data['username_pronostico'] = username
-        partidos_futuros = self.db.obtener_partidos(username, filtro_tiempo='futuros')
+        partidos_futuros = await self.db_async.obtener_partidos(username, filtro_tiempo='futuros')
         
         if not partidos_futuros:
             await update.message.reply_text("⚽ No hay partidos futuros programados en este momento.")
@@ -1767,7 +1814,7 @@ class RobotTelegram:
         """Paso 2 Editar: Busca el partido y, si lo encuentra, pide el nuevo Rival."""
         fecha_texto = update.message.text.strip()
         # Reutilizamos la función de búsqueda por fecha exacta
-        partido = self.db.obtener_partido_por_fecha_exacta(fecha_texto)
+        partido = await self.db_async.obtener_partido_por_fecha_exacta(fecha_texto)
 
         if not partido:
             await update.message.reply_text("❌ No se encontró ningún partido en esa fecha. Intentá de nuevo o tocá Cancelar.")
@@ -1818,7 +1865,7 @@ class RobotTelegram:
             return self.esperando_editar_partido_rival
         
         context.user_data['edit_rival_id'] = mapa[texto]['id']
-        botones = self._generar_botones_ediciones(incluir_historico=False)
+        botones = await self._generar_botones_ediciones(incluir_historico=False)
         botones.insert(0, ["🔙 Cancelar"])
         
         await update.message.reply_text("🏆 *Seleccioná el Torneo:*", parse_mode="Markdown", reply_markup=ReplyKeyboardMarkup(botones, resize_keyboard=True))
@@ -1827,7 +1874,7 @@ class RobotTelegram:
     async def procesar_editar_partido_edicion(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Paso 4 Editar: Valida edición y pide la Condición."""
         texto_edicion = update.message.text.strip()
-        ediciones = self.db.obtener_ediciones()
+        ediciones = await self.db_async.obtener_ediciones()
         ed_id = next((e[0] for e in ediciones if f"{e[1]} {e[2]}" == texto_edicion), None)
         
         if not ed_id:
@@ -1857,7 +1904,7 @@ class RobotTelegram:
             partido_id = context.user_data['partido_a_editar_id']
             
             # Validamos contra el pronóstico más reciente
-            ultima_pred = self.db.obtener_ultima_fecha_pronostico(partido_id) # ⚠️ Debés agregar este método a BaseDeDatos
+            ultima_pred = await self.db_async.obtener_ultima_fecha_pronostico(partido_id) # ⚠️ Debés agregar este método a BaseDeDatos
             
             if ultima_pred and nueva_fecha_dt < ultima_pred:
                 fecha_limite = ultima_pred.strftime('%d/%m/%Y %H:%M:%S')
@@ -1866,7 +1913,7 @@ class RobotTelegram:
 
             # Guardamos los cambios
             g_cai, g_rival = context.user_data['partido_a_editar_goles']
-            self.db.actualizar_partido_manual(
+            await self.db_async.actualizar_partido_manual(
                 partido_id,
                 context.user_data['edit_edicion_id'],
                 context.user_data['edit_rival_id'],
@@ -1874,6 +1921,7 @@ class RobotTelegram:
                 nueva_fecha_dt.strftime("%Y-%m-%d %H:%M:%S"),
                 g_cai, g_rival
             )
+            self._reconciliar_cronometros_en_segundo_plano()
             
             await update.message.reply_text("✅ ¡Partido editado con éxito!")
             return await self.iniciar_admin_partidos(update, context)
@@ -1896,7 +1944,7 @@ class RobotTelegram:
             return self.esperando_crear_partido_rival
         
         context.user_data['nuevo_partido_rival'] = mapa[texto]
-        botones = self._generar_botones_ediciones(incluir_historico=False)
+        botones = await self._generar_botones_ediciones(incluir_historico=False)
         botones.insert(0, ["🚫 Cancelar"])
         
         await update.message.reply_text(
@@ -1909,7 +1957,7 @@ class RobotTelegram:
     async def procesar_crear_partido_edicion(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Paso 3: Valida edición y pide condición."""
         texto_edicion = update.message.text.strip()
-        ediciones = self.db.obtener_ediciones()
+        ediciones = await self.db_async.obtener_ediciones()
         ed_id = next((e[0] for e in ediciones if f"{e[1]} {e[2]}" == texto_edicion), None)
         
         if not ed_id:
@@ -1974,13 +2022,14 @@ class RobotTelegram:
     async def _guardar_nuevo_partido(self, update, context, g_cai, g_rival):
         """Función interna para insertar en BD y finalizar."""
         try:
-            self.db.insertar_partido_manual(
+            await self.db_async.insertar_partido_manual(
                 context.user_data['nuevo_partido_edicion_id'],
                 context.user_data['nuevo_partido_rival']['id'],
                 context.user_data['nuevo_partido_condicion'],
                 context.user_data['nuevo_partido_fecha'].strftime("%Y-%m-%d %H:%M:%S"),
                 g_cai, g_rival
             )
+            self._reconciliar_cronometros_en_segundo_plano()
             await update.message.reply_text("✅ ¡Partido creado con éxito!")
         except Exception as e: # 🌟 REEMPLAZAR ESTE BLOQUE
             tipo_error = type(e).__name__
@@ -2050,11 +2099,11 @@ class RobotTelegram:
             
             # Hacemos el INSERT. Si el usuario lo hace 1000 veces, se guardan 1000 filas
             # pero self.db.obtener_partidos siempre leerá el de la fecha_actual más grande.
-            self.db.insertar_pronostico(username, partido_id, goles_cai, goles_rival, fecha_actual)
+            await self.db_async.insertar_pronostico(username, partido_id, goles_cai, goles_rival, fecha_actual)
             
             # --- AVISAR AL ADMINISTRADOR SI NO FUE ÉL MISMO ---
             if username != "Gabriel":
-                admin_id = self.db.obtener_id_telegram_por_username("Gabriel")
+                admin_id = await self.db_async.obtener_id_telegram_por_username("Gabriel")
                 if admin_id:
                     texto_alerta = (
                         f"🔔 *Nuevo Pronóstico*\n\n"
@@ -2124,39 +2173,21 @@ class RobotTelegram:
             return f"{horas:02d}:{minutos:02d}:{segs:02d}"
 
     def _registrar_log(self, mensaje, archivo="logs_bot.txt"):
-        """Escribe un registro en un archivo de texto con la fecha y hora actuales."""
+        """Encola un registro con la fecha y hora actuales (lo escribe en el archivo el hilo del registro)."""
+        self.registro.registrar(mensaje, archivo=archivo)
+
+    async def _auditar_consulta_estadistica(self, update: Update, nombre_estadistica):
+        """Registra en el log cuando un usuario (no admin) consulta una estadística."""
         try:
-            # Obtener la hora de Argentina para el log
-            zona_horaria = pytz.timezone('America/Argentina/Buenos_Aires')
-            ahora = datetime.datetime.now(zona_horaria)
-            marca_tiempo = ahora.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Construir la línea de log
-            linea_log = f"[{marca_tiempo}] : {mensaje}\n"
+            id_telegram = update.effective_user.id
+            username = await self.db_async.obtener_usuario_por_telegram(id_telegram)
             
-            # Obtener la ruta correcta dependiendo de si es un ejecutable o script
-            if getattr(sys, 'frozen', False):
-                carpeta = sys._MEIPASS
-            else:
-                carpeta = os.path.dirname(os.path.abspath(__file__))
-                
-            ruta_archivo = os.path.join(carpeta, archivo)
-            
-            # Escribir en el archivo en modo 'append' (añadir)
-            with open(ruta_archivo, "a", encoding="utf-8") as f:
-                f.write(linea_log)
+            if username and username != "Gabriel":
+                mensaje = f"👁️ CONSULTA: El usuario '{username}' revisó la estadística de '{nombre_estadistica}'."
+                self._registrar_log(mensaje, archivo="logs_estadisticas_bot.txt")
         except Exception as e:
-            # Fallback seguro en caso de que no pueda escribir en el archivo
-            print(f"Error crítico al intentar guardar el log: {e}")
-
-    def _auditar_consulta_estadistica(self, update: Update, nombre_estadistica):
-        """Registra en el log cuando un usuario (no admin) consulta una estadística."""
-        id_telegram = update.effective_user.id
-        username = self.db.obtener_usuario_por_telegram(id_telegram)
-        
-        if username and username != "Gabriel":
-            mensaje = f"👁️ CONSULTA: El usuario '{username}' revisó la estadística de '{nombre_estadistica}'."
-            self._registrar_log(mensaje, archivo="logs_estadisticas_bot.txt")
+            # La auditoría nunca debe romper la consulta del usuario
+            print(f"Error al auditar consulta de estadística: {e}")
 
     # ==========================================
     # FLUJO 4: CONSULTAR PRONÓSTICOS
@@ -2165,10 +2196,11 @@ class RobotTelegram:
         """Actúa como 'funcion_imprimir' puente: pregunta de quién ver los pronósticos antes de imprimirlos."""
         # Guardamos el título del torneo (o 'Histórica') para usarlo en el siguiente paso
         context.user_data['torneo_elegido_pronosticos'] = titulo
+        context.user_data['edicion_elegida_pronosticos'] = edicion_id
 
         id_telegram = update.message.from_user.id
-        username_propio = self.db.obtener_usuario_por_telegram(id_telegram)
-        usuarios_db = self.db.obtener_usuarios_con_id()
+        username_propio = await self.db_async.obtener_usuario_por_telegram(id_telegram)
+        usuarios_db = await self.db_async.obtener_usuarios_con_id()
         usuarios = [u[1] for u in usuarios_db]
 
         botones = [["1_ De todos"], ["2_ Míos"]]
@@ -2192,6 +2224,7 @@ class RobotTelegram:
 
         botones.append(["🔙 Volver al menú"])
         context.user_data['mapa_usuarios_pronosticos'] = mapa_usuarios
+        context.user_data['ids_usuarios_pronosticos'] = {u[1]: u[0] for u in usuarios_db}
 
         await update.message.reply_text(
             "👤 ¿De quién querés ver los pronósticos?",
@@ -2215,76 +2248,84 @@ class RobotTelegram:
         target_user = mapa[texto]
         titulo_torneo = context.user_data.get('torneo_elegido_pronosticos', 'Histórica')
         
-        # Si es histórica, el filtro de la DB debe ser None. Si es torneo, le pasamos el nombre.
-        filtro_torneo = None if titulo_torneo == "Histórica" else titulo_torneo
+        # Filtro por ids (si es histórica la edición es None)
+        ids_usuarios = context.user_data.get('ids_usuarios_pronosticos', {})
+        usuario_id = None
+        if target_user != "todos":
+            usuario_id = ids_usuarios.get(target_user)
+            if usuario_id is None:
+                # Sin el id el filtro quedaría vacío y se listarían los de todos bajo el título de uno solo
+                await update.message.reply_text("❌ No se pudo identificar a ese usuario. Probá de nuevo desde el menú.")
+                await self.mostrar_menu(update, context)
+                return ConversationHandler.END
+        filtro = FiltroConsulta(
+            edicion_id=context.user_data.get('edicion_elegida_pronosticos'),
+            usuario_id=usuario_id
+        )
 
-        if target_user == "todos":
-            datos = self.db.obtener_todos_pronosticos(filtro_torneo=filtro_torneo)
-        else:
-            datos = self.db.obtener_todos_pronosticos(filtro_torneo=filtro_torneo, filtro_usuario=target_user)
+        # Se piden de a una página (la predicción más reciente primero) y se van enviando: nunca se trae todo el historial junto
+        datos, siguiente = await self.db_async.obtener_pagina_pronosticos(filtro=filtro, por_fecha_prediccion=True)
 
         if not datos:
             await update.message.reply_text("📝 No hay pronósticos cargados para esta selección.")
             await self.mostrar_menu(update, context)
             return ConversationHandler.END
 
-        # ORDEN ESTRICTO: Ordenamos descendentemente por fecha y hora del pronóstico (índice 9)
-        datos_ordenados = sorted(datos, key=lambda x: x[9], reverse=True)
-
-        mensajes = []
         if target_user == "todos":
             mensaje_actual = f"📋 *Historial de TODOS - {titulo_torneo}*\n\n"
         else:
             mensaje_actual = f"📋 *Historial de {target_user} - {titulo_torneo}*\n\n"
 
-        for row in datos_ordenados:
-            rival = row[0]
-            fecha_partido = row[1].strftime('%d/%m/%Y %H:%M') if row[1] else "A conf."
-            user = row[5]
-            pred_cai = row[6]
-            pred_rival = row[7]
-            fecha_pred = row[9].strftime('%d/%m/%Y %H:%M:%S') if row[9] else "N/A"
-
-            # Extraemos los datos del resultado real, puntos y error
-            real_cai = row[3]
-            real_rival = row[4]
-            puntos = row[8]
-            error_abs = row[10]
-
-            bloque = ""
-            if target_user == "todos":
-                bloque += f"👤 *{user}*\n"
-                
-            # Formateamos el rival para incluir el resultado si existe
-            if real_cai is not None and real_rival is not None:
-                texto_rival = f"{rival} ({real_cai}-{real_rival})"
-            else:
-                texto_rival = rival
-                
-            bloque += f"⚽ vs {texto_rival} | 📅 {fecha_partido}\n"
-            bloque += f"👉 *Independiente {pred_cai} - {pred_rival} {rival}*\n"
-            bloque += f"⏱️ _Cargado el: {fecha_pred}_\n"
-            
-            # Agregamos Puntos y Error Absoluto solo si corresponden
-            # (Si es NULL en la BD es porque el partido no se jugó o el usuario cambió el pronóstico después)
-            if puntos is not None:
-                txt_puntos = f"🏅 Puntos: {int(puntos)}"
-                txt_error = f" | ❌ Error abs: {int(error_abs)}" if error_abs is not None else ""
-                bloque += f"{txt_puntos}{txt_error}\n"
-                
-            bloque += "—\n"
+        while True:
+            for row in datos:
+                rival = row[0]
+                fecha_partido = row[1].strftime('%d/%m/%Y %H:%M') if row[1] else "A conf."
+                user = row[5]
+                pred_cai = row[6]
+                pred_rival = row[7]
+                fecha_pred = row[9].strftime('%d/%m/%Y %H:%M:%S') if row[9] else "N/A"
+
+                # Extraemos los datos del resultado real, puntos y error
+                real_cai = row[3]
+                real_rival = row[4]
+                puntos = row[8]
+                error_abs = row[10]
+
+                bloque = ""
+                if target_user == "todos":
+                    bloque += f"👤 *{user}*\n"
+
+                # Formateamos el rival para incluir el resultado si existe
+                if real_cai is not None and real_rival is not None:
+                    texto_rival = f"{rival} ({real_cai}-{real_rival})"
+                else:
+                    texto_rival = rival
 
-            if len(mensaje_actual) + len(bloque) > 3800:
-                mensajes.append(mensaje_actual)
-                mensaje_actual = bloque
-            else:
-                mensaje_actual += bloque
+                bloque += f"⚽ vs {texto_rival} | 📅 {fecha_partido}\n"
+                bloque += f"👉 *Independiente {pred_cai} - {pred_rival} {rival}*\n"
+                bloque += f"⏱️ _Cargado el: {fecha_pred}_\n"
 
-        if mensaje_actual:
-            mensajes.append(mensaje_actual)
+                # Agregamos Puntos y Error Absoluto solo si corresponden
+                # (Si es NULL en la BD es porque el partido no se jugó o el usuario cambió el pronóstico después)
+                if puntos is not None:
+                    txt_puntos = f"🏅 Puntos: {int(puntos)}"
+                    txt_error = f" | ❌ Error abs: {int(error_abs)}" if error_abs is not None else ""
+                    bloque += f"{txt_puntos}{txt_error}\n"
 
-        for m in mensajes:
-            await update.message.reply_text(m, parse_mode="Markdown", reply_markup=ReplyKeyboardRemove())
+                bloque += "—\n"
+
+                if len(mensaje_actual) + len(bloque) > 3800:
+                    await update.message.reply_text(mensaje_actual, parse_mode="Markdown", reply_markup=ReplyKeyboardRemove())
+                    mensaje_actual = bloque
+                else:
+                    mensaje_actual += bloque
+
+            if siguiente is None:
+                break
+            datos, siguiente = await self.db_async.obtener_pagina_pronosticos(filtro=filtro, despues_de=siguiente, por_fecha_prediccion=True)
+
+        if mensaje_actual:
+            await update.message.reply_text(mensaje_actual, parse_mode="Markdown", reply_markup=ReplyKeyboardRemove())
 
         await self.mostrar_menu(update, context)
         return ConversationHandler.END
@@ -2294,12 +2335,9 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_opt_pes(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía la tabla con las lógicas del programa de escritorio."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Optimismo/Pesimismo ({titulo})"), 
-            daemon=True
-        ).start()
-        datos = self.db.obtener_indice_optimismo_pesimismo(edicion_id=edicion_id)
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Optimismo/Pesimismo ({titulo})"))
+        datos = await self.db_async.obtener_indice_optimismo_pesimismo(edicion_id=edicion_id)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay datos de optimismo/pesimismo para esta selección.")
@@ -2402,12 +2440,9 @@ class RobotTelegram:
     # FLUJO 6: MAYORES ERRORES
     # ==========================================
     async def imprimir_tabla_mayores_errores(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Mayores Errores ({titulo})"), 
-            daemon=True
-        ).start()
-        datos = self.db.obtener_ranking_mayores_errores(edicion_id=edicion_id)
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Mayores Errores ({titulo})"))
+        datos = await self.db_async.obtener_ranking_mayores_errores(edicion_id=edicion_id)
         if not datos:
             await update.message.reply_text("📉 Todavía no hay datos de errores para esta selección.")
             # Agregado self.
@@ -2470,14 +2505,11 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_falso_profeta(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking invirtiendo el % de acierto al % de falso profeta."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Falso Profeta ({titulo})"), 
-            daemon=True
-        ).start()
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Falso Profeta ({titulo})"))
 
         # Acceso a la base de datos vía self.db
-        datos = self.db.obtener_ranking_falso_profeta(edicion_id=edicion_id)
+        datos = await self.db_async.obtener_ranking_falso_profeta(edicion_id=edicion_id)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay suficientes datos para calcular falsos profetas en esta selección.")
@@ -2542,13 +2574,10 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_estilo_decision(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking de estilos de decisión."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Estilo de Decisión ({titulo})"), 
-            daemon=True
-        ).start()
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Estilo de Decisión ({titulo})"))
         # Obtenemos el ranking base que ya trae el promedio de anticipación (índice 6)
-        datos_ranking = self.db.obtener_ranking(edicion_id=edicion_id, anio=None)
+        datos_ranking = await self.db_async.obtener_ranking(edicion_id=edicion_id, anio=None)
         
         # Filtramos solo los que tienen anticipación válida (mayor a 0)
         datos_validos = [row for row in datos_ranking if row[6] is not None and float(row[6]) > 0]
@@ -2657,13 +2686,10 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_mufa(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking Mufa."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Mufa ({titulo})"), 
-            daemon=True
-        ).start()
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Mufa ({titulo})"))
 
-        datos = self.db.obtener_ranking_mufa(edicion_id=edicion_id, anio=None)
+        datos = await self.db_async.obtener_ranking_mufa(edicion_id=edicion_id, anio=None)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay suficientes datos de derrotas pronosticadas en esta selección.")
@@ -2723,13 +2749,10 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_mejor_predictor(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking de Mejor Predictor basado en error absoluto."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Mejor Predictor ({titulo})"), 
-            daemon=True
-        ).start()
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Mejor Predictor ({titulo})"))
 
-        datos = self.db.obtener_ranking_mejor_predictor(edicion_id=edicion_id, anio=None)
+        datos = await self.db_async.obtener_ranking_mejor_predictor(edicion_id=edicion_id, anio=None)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay datos de predicciones para esta selección.")
@@ -2820,12 +2843,9 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_racha_record(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking de Racha Récord."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Racha Récord ({titulo})"), 
-            daemon=True
-        ).start()
-        datos = self.db.obtener_racha_record(edicion_id=edicion_id, anio=None)
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Racha Récord ({titulo})"))
+        datos = await self.db_async.obtener_racha_record(edicion_id=edicion_id, anio=None)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay datos de rachas para esta selección.")
@@ -2886,12 +2906,9 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_racha_actual(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking de Racha Actual."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Racha Actual ({titulo})"), 
-            daemon=True
-        ).start()
-        datos = self.db.obtener_racha_actual(edicion_id=edicion_id, anio=None)
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Racha Actual ({titulo})"))
+        datos = await self.db_async.obtener_racha_actual(edicion_id=edicion_id, anio=None)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay datos de rachas para esta selección.")
@@ -2952,12 +2969,9 @@ class RobotTelegram:
     # ==========================================
     async def imprimir_tabla_cambios(self, update: Update, context: ContextTypes.DEFAULT_TYPE, edicion_id, titulo):
         """Construye y envía el ranking de Estabilidad (Cambios de pronóstico)."""
-        threading.Thread(
-            target=self._auditar_consulta_estadistica, 
-            args=(update, f"Cambio de Pronósticos ({titulo})"), 
-            daemon=True
-        ).start()
-        datos = self.db.obtener_ranking_estabilidad(edicion_id=edicion_id, anio=None)
+        # Auditoría en segundo plano: no demora la respuesta
+        context.application.create_task(self._auditar_consulta_estadistica(update, f"Cambio de Pronósticos ({titulo})"))
+        datos = await self.db_async.obtener_ranking_estabilidad(edicion_id=edicion_id, anio=None)
         
         if not datos:
             await update.message.reply_text("📉 Todavía no hay datos históricos de pronósticos para esta selección.")
@@ -3064,7 +3078,7 @@ class RobotTelegram:
 
             # --- LÓGICA ESPECÍFICA PARA "ESTILO DE PRONÓSTICO" ---
             if tipo_grafico == "estilo_pronostico":
-                stats = self.db.obtener_estadisticas_estilo_pronostico(usuario_seleccionado, edicion_id, anio)
+                stats = await self.db_async.obtener_estadisticas_estilo_pronostico(usuario_seleccionado, edicion_id, anio)
                 
                 if not stats or stats[0] == 0:
                     await update.message.reply_text("ℹ️ No hay datos suficientes para generar el reporte de este usuario.")
@@ -3095,7 +3109,7 @@ class RobotTelegram:
 
             # --- LÓGICA ESPECÍFICA PARA "TENDENCIA DE PRONÓSTICO" ---
             elif tipo_grafico == "tendencia_pronostico":
-                stats = self.db.obtener_estadisticas_tendencia_pronostico(usuario_seleccionado, edicion_id, anio)
+                stats = await self.db_async.obtener_estadisticas_tendencia_pronostico(usuario_seleccionado, edicion_id, anio)
                 
                 if not stats or stats[0] == 0:
                     await update.message.reply_text("ℹ️ No hay datos suficientes para generar el reporte de este usuario.")
@@ -3128,7 +3142,7 @@ class RobotTelegram:
                 
             # --- LÓGICA ESPECÍFICA PARA "GRADO DE FIRMEZA" ---
             elif tipo_grafico == "firmeza_pronostico":
-                stats = self.db.obtener_estadisticas_firmeza_pronostico(usuario_seleccionado, edicion_id, anio)
+                stats = await self.db_async.obtener_estadisticas_firmeza_pronostico(usuario_seleccionado, edicion_id, anio)
                 
                 if not stats or stats[0] == 0:
                     await update.message.reply_text("ℹ️ No hay datos suficientes para generar el reporte de este usuario.")
@@ -3217,7 +3231,7 @@ class RobotTelegram:
         
         elif opcion == "Por Torneo":
             # Usamos tu generador de botones de ediciones (solo torneos, sin 'Histórico')
-            botones = self._generar_botones_ediciones(incluir_historico=False)
+            botones = await self._generar_botones_ediciones(incluir_historico=False)
             await update.message.reply_text(
                 "🏆 *Seleccioná el Torneo*",
                 reply_markup=ReplyKeyboardMarkup(botones, resize_keyboard=True)
@@ -3231,7 +3245,7 @@ class RobotTelegram:
         texto_edicion = update.message.text
         
         # 1. Buscamos el ID numérico que corresponde al texto del botón
-        ediciones = self.db.obtener_ediciones()
+        ediciones = await self.db_async.obtener_ediciones()
         edicion_id_real = None
         
         for ed in ediciones:
@@ -3249,10 +3263,10 @@ class RobotTelegram:
     async def preguntar_usuario_perfil(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """PASO 3 (Genérico): Pregunta por 'Yo' o el resto de la comunidad."""
         id_telegram = update.effective_user.id
-        usuario_actual = self.db.obtener_usuario_por_telegram(id_telegram)
+        usuario_actual = await self.db_async.obtener_usuario_por_telegram(id_telegram)
         
         # Obtenemos todos los usuarios de la base de datos (lista de tuplas: [(id, username), ...])
-        usuarios_db = self.db.obtener_usuarios_con_id()
+        usuarios_db = await self.db_async.obtener_usuarios_con_id()
         
         botones = []
         
@@ -3288,24 +3302,29 @@ class RobotTelegram:
         return self.esperando_usuario_perfil
 
     async def forzar_actualizacion_cronometros(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Borra todas las alarmas programadas y las vuelve a crear desde la DB."""
+        """Reconcilia ya mismo las alarmas programadas con la agenda de la DB."""
         # Solo el admin puede disparar esto (Seguridad)
         id_telegram = update.effective_user.id
-        if self.db.obtener_usuario_por_telegram(id_telegram) != "Gabriel":
+        if await self.db_async.obtener_usuario_por_telegram(id_telegram) != "Gabriel":
             return
 
-        # 1. Buscamos y borramos todos los jobs con el nombre que definimos
-        jobs_actuales = context.job_queue.get_jobs_by_name("recordatorio_partido")
-        for job in jobs_actuales:
-            job.schedule_removal()
-            
-        # 2. Volvemos a leer la DB y programar todo de cero
-        self._programar_cronometros_partidos()
+        # Solo se agregan, mueven o cancelan las alarmas de los partidos que cambiaron
+        resumen = await self._reconciliar_cronometros_partidos()
+        if resumen is None:
+            await update.message.reply_text("❌ No se pudo leer la agenda de partidos. Los cronómetros quedaron como estaban.")
+            return
         
-        await update.message.reply_text("✅ Agenda de cronómetros actualizada correctamente.")
+        await update.message.reply_text(
+            "✅ Agenda de cronómetros actualizada correctamente.\n"
+            f"➕ Nuevos: {resumen['agregadas']} | 🔁 Movidos: {resumen['movidas']} | "
+            f"❌ Cancelados: {resumen['canceladas']} | ⏸️ Sin cambios: {resumen['sin_cambios']}"
+        )
     
     async def iniciar_admin_archivos(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Busca y muestra exclusivamente los archivos de log disponibles para leer."""
+        # Antes de listar/leer, que los registros todavía en cola lleguen al disco
+        await asyncio.get_running_loop().run_in_executor(None, self.registro.vaciar)
+
         # Detectamos la ruta (Script o EXE)
         if getattr(sys, 'frozen', False):
             carpeta = sys._MEIPASS
@@ -3392,7 +3411,7 @@ class RobotTelegram:
 
     async def iniciar_difundir_tabla(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Paso 1 Difundir: Muestra los botones de los torneos para elegir qué tabla enviar."""
-        botones = self._generar_botones_ediciones(incluir_historico=True)
+        botones = await self._generar_botones_ediciones(incluir_historico=True)
         await update.message.reply_text(
             "📢 *Enviar Tabla de Posiciones*\n\n"
             "Seleccioná el torneo (o Histórico) que querés enviarle por mensaje privado a TODOS los usuarios:",
@@ -3409,7 +3428,7 @@ class RobotTelegram:
         titulo = texto_edicion
         
         if texto_edicion != "Histórico":
-            ediciones = self.db.obtener_ediciones()
+            ediciones = await self.db_async.obtener_ediciones()
             for ed in ediciones:
                 if f"{ed[1]} {ed[2]}" == texto_edicion:
                     edicion_id_real = ed[0]
@@ -3424,23 +3443,27 @@ class RobotTelegram:
         await update.message.reply_text("⏳ Generando tabla y enviando mensajes. Por favor, esperá...")
             
         # Generamos la tabla usando la función que ya tenías
-        tabla_texto = self._generar_texto_tabla_posiciones(edicion_id_real, titulo)
+        tabla_texto = await self._generar_texto_tabla_posiciones(edicion_id_real, titulo)
         mensaje_final = "📢 *Nueva tabla de posiciones*\n\n" + tabla_texto
         
         # Obtenemos TODOS los usuarios con Telegram registrado de la base de datos
-        usuarios = self.db.obtener_todos_usuarios_telegram() 
+        usuarios = await self.db_async.obtener_todos_usuarios_telegram() 
         
-        enviados = 0
-        for tg_id, username in usuarios:
-            try:
-                await context.bot.send_message(chat_id=tg_id, text=mensaje_final, parse_mode="Markdown")
-                enviados += 1
-            except Exception as e:
+        resumen = await self.difusor.difundir(context.bot, usuarios, texto=mensaje_final, parse_mode="Markdown")
+        for resultado in resumen['resultados']:
+            if resultado['estado'] != ENVIO_OK:
                 # Si algún usuario bloqueó al bot, lo registramos en el log
-                self._registrar_log(f"FALLO al enviar tabla manual a {username}: {e}", archivo="logs_errores_bot.txt")
-                
-        await update.message.reply_text(f"✅ ¡Difusión completada!\n\nLa tabla fue enviada exitosamente a {enviados} usuarios.")
-        self._registrar_log(f"ADMIN: Tabla '{titulo}' difundida manualmente a {enviados} usuarios.")
+                self._registrar_log(f"FALLO al enviar tabla manual a {resultado['username']}: {resultado['error']}", archivo="logs_errores_bot.txt")
+
+        enviados = resumen['enviados']
+        detalle = ""
+        if resumen['bloqueados'] or resumen['fallidos']:
+            detalle = f"\n🚫 Bloquearon al bot: {resumen['bloqueados']}\n❌ Fallidos: {resumen['fallidos']}"
+        await update.message.reply_text(
+            f"✅ ¡Difusión completada!\n\nLa tabla fue enviada exitosamente a {enviados} usuarios.{detalle}\n"
+            f"⏱️ Tiempo: {resumen['segundos']:.1f}s"
+        )
+        self._registrar_log(f"ADMIN: Tabla '{titulo}' difundida manualmente a {enviados} usuarios ({resumen['bloqueados']} bloqueados, {resumen['fallidos']} fallidos, {resumen['reintentos']} reintentos).")
         
         return await self.iniciar_administracion(update, context)
 
@@ -0,0 +1,156 @@
+"""
+Envíos masivos del bot de Telegram (recordatorios, tabla de posiciones, difusiones del admin).
+En lugar de mandar los mensajes de a uno, se mandan varios a la vez respetando los límites de Telegram:
+    - Global: ~30 mensajes por segundo por bot (se usa un cubo de fichas con algo de margen).
+    - Por chat: 1 mensaje por segundo al mismo usuario.
+Si Telegram responde RetryAfter (flood control) se frena TODO el envío el tiempo que pide y se reintenta.
+Los errores de red se reintentan con espera exponencial, salvo TimedOut: el mensaje pudo haber llegado igual
+y reintentarlo se lo mandaría dos veces al usuario.
+
+Uso:
+    resumen = await difusor.difundir(context.bot, [(tg_id, username), ...], texto="Hola", parse_mode="Markdown")
+    # o con un mensaje distinto por usuario:
+    resumen = await difusor.difundir(context.bot, destinatarios, armar_texto=lambda username: f"Hola {username}")
+"""
+import asyncio
+import time
+from datetime import timedelta
+from telegram.error import RetryAfter, Forbidden, BadRequest, TimedOut, NetworkError
+
+MENSAJES_POR_SEGUNDO = 25     # Límite global de Telegram: 30/s; dejamos margen para las respuestas normales del bot
+SEGUNDOS_ENTRE_MENSAJES_CHAT = 1.0
+ENVIOS_SIMULTANEOS = 10
+REINTENTOS_MAXIMOS = 3
+SEGUNDOS_BACKOFF_INICIAL = 1.0 # Espera antes del primer reintento por error de red; se duplica en cada uno
+
+# Estados de cada destinatario en el resumen
+ENVIO_OK = 'enviado'
+ENVIO_BLOQUEADO = 'bloqueado'  # El usuario bloqueó al bot o borró la cuenta (no tiene sentido reintentar)
+ENVIO_ERROR = 'error'
+
+class CuboDeFichas:
+    """Limitador de tasa: se recargan 'por_segundo' fichas por segundo y cada envío consume una."""
+    def __init__(self, por_segundo, capacidad=None):
+        self.por_segundo = por_segundo
+        self.capacidad = capacidad or por_segundo
+        self._fichas = float(self.capacidad)
+        self._ultima_recarga = time.monotonic()
+        self._pausado_hasta = 0.0
+        self._lock = asyncio.Lock()
+
+    async def tomar(self):
+        """Espera hasta que haya una ficha disponible (y no haya una pausa por RetryAfter vigente)."""
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                if ahora < self._pausado_hasta:
+                    await asyncio.sleep(self._pausado_hasta - ahora)
+                    continue
+
+                self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultima_recarga) * self.por_segundo)
+                self._ultima_recarga = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                await asyncio.sleep((1 - self._fichas) / self.por_segundo)
+
+    def pausar(self, segundos):
+        """Frena todos los envíos durante 'segundos' (lo pide Telegram con RetryAfter)."""
+        self._pausado_hasta = max(self._pausado_hasta, time.monotonic() + segundos)
+        self._fichas = 0.0
+
+def _segundos_de_espera(error):
+    """RetryAfter.retry_after es int en versiones viejas de python-telegram-bot y timedelta en las nuevas."""
+    espera = error.retry_after
+    if isinstance(espera, timedelta):
+        return espera.total_seconds()
+    return float(espera)
+
+class DifusorTelegram:
+    """
+    Motor de envíos masivos compartido por todo el bot (el límite global es uno solo para todos los envíos).
+    """
+    def __init__(self, mensajes_por_segundo=MENSAJES_POR_SEGUNDO, simultaneos=ENVIOS_SIMULTANEOS,
+                 segundos_entre_mensajes_chat=SEGUNDOS_ENTRE_MENSAJES_CHAT, reintentos=REINTENTOS_MAXIMOS):
+        self.cubo = CuboDeFichas(mensajes_por_segundo)
+        self.simultaneos = simultaneos
+        self.segundos_entre_mensajes_chat = segundos_entre_mensajes_chat
+        self.reintentos = reintentos
+        self._proximo_por_chat = {} # chat_id -> momento (monotonic) desde el que se le puede volver a escribir
+
+    async def _esperar_turno_chat(self, chat_id):
+        ahora = time.monotonic()
+        proximo = self._proximo_por_chat.get(chat_id, 0.0)
+        self._proximo_por_chat[chat_id] = max(ahora, proximo) + self.segundos_entre_mensajes_chat
+        if proximo > ahora:
+            await asyncio.sleep(proximo - ahora)
+
+    async def _enviar(self, bot, chat_id, username, texto, opciones):
+        resultado = {'chat_id': chat_id, 'username': username, 'estado': ENVIO_ERROR, 'intentos': 0, 'error': None}
+        while resultado['intentos'] <= self.reintentos:
+            resultado['intentos'] += 1
+            await self._esperar_turno_chat(chat_id)
+            await self.cubo.tomar()
+            try:
+                await bot.send_message(chat_id=chat_id, text=texto, **opciones)
+                resultado['estado'] = ENVIO_OK
+                resultado['error'] = None
+                return resultado
+            except RetryAfter as e:
+                # Flood control: frenamos a todos, no solo a este envío
+                self.cubo.pausar(_segundos_de_espera(e))
+                resultado['error'] = e
+            except Forbidden as e:
+                resultado['estado'] = ENVIO_BLOQUEADO
+                resultado['error'] = e
+                return resultado
+            except BadRequest as e:
+                # Chat inexistente, Markdown inválido, etc.: reintentar daría el mismo error
+                resultado['error'] = e
+                return resultado
+            except TimedOut as e:
+                # No sabemos si Telegram lo recibió: reintentar podría duplicar el mensaje
+                resultado['error'] = e
+                return resultado
+            except NetworkError as e:
+                # Error de red transitorio (TimedOut ya se atendió arriba): se reintenta con espera exponencial
+                resultado['error'] = e
+                if resultado['intentos'] <= self.reintentos:
+                    await asyncio.sleep(SEGUNDOS_BACKOFF_INICIAL * 2 ** (resultado['intentos'] - 1))
+            except Exception as e:
+                # Error inesperado: no se reintenta
+                resultado['error'] = e
+                return resultado
+        return resultado
+
+    async def difundir(self, bot, destinatarios, texto=None, armar_texto=None, **opciones):
+        """
+        Envía un mensaje a cada destinatario (lista de (chat_id, username)).
+        - texto: el mismo mensaje para todos, o armar_texto(username) para uno distinto a cada uno.
+        - opciones: se pasan tal cual a send_message (parse_mode, reply_markup...).
+        Retorna un resumen: {'enviados', 'bloqueados', 'fallidos', 'reintentos', 'segundos', 'resultados'}
+        con un dict por destinatario en 'resultados' (chat_id, username, estado, intentos, error).
+        """
+        inicio = time.monotonic()
+        semaforo = asyncio.Semaphore(self.simultaneos)
+
+        async def _enviar_uno(chat_id, username):
+            async with semaforo:
+                mensaje = armar_texto(username) if armar_texto else texto
+                return await self._enviar(bot, chat_id, username, mensaje, opciones)
+
+        resultados = await asyncio.gather(*(_enviar_uno(chat_id, username) for chat_id, username in destinatarios))
+
+        # Los turnos por chat ya vencidos no hace falta recordarlos
+        ahora = time.monotonic()
+        for chat_id in [c for c, proximo in self._proximo_por_chat.items() if proximo <= ahora]:
+            del self._proximo_por_chat[chat_id]
+
+        return {
+            'enviados': sum(1 for r in resultados if r['estado'] == ENVIO_OK),
+            'bloqueados': sum(1 for r in resultados if r['estado'] == ENVIO_BLOQUEADO),
+            'fallidos': sum(1 for r in resultados if r['estado'] == ENVIO_ERROR),
+            'reintentos': sum(r['intentos'] - 1 for r in resultados),
+            'segundos': time.monotonic() - inicio,
+            'resultados': list(resultados),
+        }
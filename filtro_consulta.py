@@ -0,0 +1,61 @@
+"""
+Filtro de consultas ya resuelto a ids y rangos de fechas.
+Cada condición compara una columna indexada tal cual (p.edicion_id, p.rival_id, pr.usuario_id,
+p.fecha_hora) en lugar de una expresión como CONCAT(c.nombre, ' ', a.numero) o YEAR(p.fecha_hora),
+que obligan a calcularla fila por fila y no pueden usar ningún índice.
+
+Uso:
+    filtro = FiltroConsulta(edicion_id=3, usuario_id=7)
+    condiciones, params = filtro.condiciones()   # (["p.edicion_id = %s", "pr.usuario_id = %s"], [3, 7])
+"""
+from datetime import datetime
+
+def rango_anio(anio):
+    """[desde, hasta) del año calendario: 'fecha >= desde AND fecha < hasta' equivale a YEAR(fecha) = anio."""
+    anio = int(anio)
+    return datetime(anio, 1, 1), datetime(anio + 1, 1, 1)
+
+class FiltroConsulta:
+    """
+    - edicion_id / rival_id / usuario_id: ids ya resueltos (None = sin filtrar).
+    - anio: año calendario del partido; se convierte en el rango [1/1/anio, 1/1/anio+1).
+    - desde / hasta: rango [desde, hasta) sobre la fecha del partido (se combinan con 'anio' si vienen los dos).
+    """
+    def __init__(self, edicion_id=None, rival_id=None, usuario_id=None, anio=None, desde=None, hasta=None):
+        self.edicion_id = edicion_id
+        self.rival_id = rival_id
+        self.usuario_id = usuario_id
+        if anio:
+            desde_anio, hasta_anio = rango_anio(anio)
+            desde = max(desde, desde_anio) if desde else desde_anio
+            hasta = min(hasta, hasta_anio) if hasta else hasta_anio
+        self.desde = desde
+        self.hasta = hasta
+
+    def condiciones(self, partido='p', pronostico='pr'):
+        """
+        (condiciones, params) para sumar al WHERE.
+        - partido / pronostico: alias de las tablas 'partidos' y 'pronosticos' en la consulta.
+        """
+        condiciones = []
+        params = []
+        if self.edicion_id:
+            condiciones.append(f"{partido}.edicion_id = %s")
+            params.append(self.edicion_id)
+        if self.rival_id:
+            condiciones.append(f"{partido}.rival_id = %s")
+            params.append(self.rival_id)
+        if self.usuario_id:
+            condiciones.append(f"{pronostico}.usuario_id = %s")
+            params.append(self.usuario_id)
+        if self.desde:
+            condiciones.append(f"{partido}.fecha_hora >= %s")
+            params.append(self.desde)
+        if self.hasta:
+            condiciones.append(f"{partido}.fecha_hora < %s")
+            params.append(self.hasta)
+        return condiciones, params
+
+    def __repr__(self):
+        return (f"FiltroConsulta(edicion_id={self.edicion_id!r}, rival_id={self.rival_id!r}, "
+                f"usuario_id={self.usuario_id!r}, desde={self.desde!r}, hasta={self.hasta!r})")
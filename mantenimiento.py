@@ -0,0 +1,182 @@
+"""
+Tareas de mantenimiento de la base de datos (se ejecutan a mano, no desde la app).
+
+Uso:
+    python mantenimiento.py <comando>
+
+Comandos:
+    reconstruir_ultimo_pronostico  -> Crea (si hace falta) y recalcula la tabla 'ultimo_pronostico'.
+    recalcular_puntajes            -> Agrega (si faltan) y recalcula las columnas de puntaje guardadas.
+    verificar_puntajes             -> Compara los puntajes guardados y los rankings contra la fórmula en vivo.
+    reconstruir_posiciones         -> Crea (si hace falta) y recalcula completa la tabla 'posiciones'.
+    verificar_posiciones           -> Compara el ranking de 'posiciones' contra el calculado en vivo (auditoría).
+    reconstruir_campeones          -> Crea (si hace falta) y recalcula los campeones de las ediciones finalizadas.
+    verificar_campeones            -> Compara los torneos ganados guardados contra el cálculo en vivo.
+    verificar_instantanea          -> Compara las estadísticas de la instantánea analítica contra las consultas SQL.
+    sincronizar_replica [completa] -> Trae a la réplica SQLite local lo nuevo de TiDB (o la copia entera).
+"""
+import sys
+import time
+from decimal import Decimal
+from base_de_datos import obtener_base_de_datos, BaseDeDatos
+
+def reconstruir_ultimo_pronostico(bd):
+    filas = bd.reconstruir_ultimo_pronostico()
+    print(f"✅ 'ultimo_pronostico' reconstruida: {filas} filas (usuario, partido).")
+    print("Para que las consultas la usen, definí DB_USAR_ULTIMO_PRONOSTICO=1 en el .env")
+
+def recalcular_puntajes(bd):
+    filas = bd.recalcular_puntajes()
+    print(f"✅ Puntajes recalculados: {filas} filas.")
+    print("Para que los rankings los usen, definí DB_USAR_PUNTAJES_GUARDADOS=1 en el .env")
+
+def verificar_puntajes(bd):
+    consistente = True
+
+    # 1. Fila por fila: columnas guardadas vs. fórmula en vivo
+    for tabla, (cantidad, ejemplos) in bd.verificar_puntajes().items():
+        print(f"{tabla}: {cantidad} diferencias")
+        for fila in ejemplos:
+            print(f"   {fila}")
+        if cantidad:
+            consistente = False
+
+    # 2. Rankings completos con cada fuente (instancias aparte para no tocar la compartida)
+    bd_vivo = BaseDeDatos()
+    bd_vivo.usar_puntajes_guardados = False
+    bd_guardado = BaseDeDatos()
+    bd_guardado.usar_puntajes_guardados = True
+
+    for edicion_id in [None] + [edicion[0] for edicion in bd.obtener_ediciones()]:
+        en_vivo = bd_vivo.obtener_ranking(edicion_id=edicion_id)
+        guardado = bd_guardado.obtener_ranking(edicion_id=edicion_id)
+        if en_vivo != guardado:
+            consistente = False
+            print(f"❌ El ranking difiere (edición {edicion_id or 'todas'})")
+
+    print("✅ Puntajes consistentes." if consistente else "❌ Hay diferencias: ejecutá recalcular_puntajes.")
+
+def reconstruir_posiciones(bd):
+    filas = bd.reconstruir_posiciones()
+    print(f"✅ 'posiciones' reconstruida: {filas} filas (ámbito, usuario).")
+    print("Para que el ranking la use, definí DB_USAR_POSICIONES=1 en el .env")
+
+def verificar_posiciones(bd):
+    bd_vivo = BaseDeDatos()
+    bd_vivo.usar_posiciones = False
+    bd_tabla = BaseDeDatos()
+    bd_tabla.usar_posiciones = True
+
+    filtros = [{}]
+    filtros += [{'edicion_id': edicion[0]} for edicion in bd.obtener_ediciones()]
+    filtros += [{'anio': anio[1]} for anio in bd.obtener_anios()]
+
+    diferencias = 0
+    for filtro in filtros:
+        if bd_vivo.obtener_ranking(**filtro) != bd_tabla.obtener_ranking(**filtro):
+            diferencias += 1
+            print(f"❌ El ranking difiere ({filtro or 'total'})")
+
+    if diferencias:
+        print(f"❌ {diferencias} de {len(filtros)} rankings difieren: ejecutá reconstruir_posiciones.")
+    else:
+        print(f"✅ Los {len(filtros)} rankings coinciden.")
+
+def reconstruir_campeones(bd):
+    filas = bd.reconstruir_campeones()
+    print(f"✅ 'campeones' reconstruida: {filas} campeones.")
+    print("Para que las copas la usen, definí DB_USAR_CAMPEONES=1 en el .env")
+
+def verificar_campeones(bd):
+    bd_vivo = BaseDeDatos()
+    bd_vivo.usar_campeones = False
+    bd_tabla = BaseDeDatos()
+    bd_tabla.usar_campeones = True
+
+    diferencias = 0
+    anios = [None] + [anio[1] for anio in bd.obtener_anios()]
+    for anio in anios:
+        if bd_vivo.obtener_torneos_ganados(anio) != bd_tabla.obtener_torneos_ganados(anio):
+            diferencias += 1
+            print(f"❌ Los torneos ganados difieren (año {anio or 'todos'})")
+
+    if diferencias:
+        print("❌ Hay diferencias: ejecutá reconstruir_campeones.")
+    else:
+        print(f"✅ Los torneos ganados coinciden ({len(anios)} filtros).")
+
+def _normalizar(filas):
+    """Redondea los números (la instantánea devuelve float, SQL devuelve Decimal)."""
+    if filas is None:
+        return None
+    if isinstance(filas, tuple):
+        filas = [filas]
+    return [
+        tuple(round(float(v), 2) if isinstance(v, (int, float, Decimal)) else v for v in fila)
+        for fila in filas
+    ]
+
+def verificar_instantanea(bd):
+    bd_sql = BaseDeDatos()
+    bd_sql.usar_instantanea = False
+    bd_memoria = BaseDeDatos()
+    bd_memoria.usar_instantanea = True
+
+    usuarios = bd.obtener_usuarios()
+    filtros = [{}]
+    filtros += [{'edicion_id': edicion[0]} for edicion in bd.obtener_ediciones()]
+    filtros += [{'anio': anio[1]} for anio in bd.obtener_anios()]
+
+    metodos = [
+        'obtener_ranking_mufa', 'obtener_ranking_falso_profeta', 'obtener_indice_optimismo_pesimismo',
+        'obtener_ranking_mejor_predictor', 'obtener_ranking_estabilidad', 'obtener_racha_actual',
+        'obtener_racha_record',
+    ]
+
+    comparaciones = 0
+    diferencias = 0
+    for filtro in filtros:
+        pares = [(metodo, (), filtro) for metodo in metodos]
+        # En los mayores errores el orden entre empates de la misma fecha no está definido: se comparan ordenados
+        pares.append(('obtener_ranking_mayores_errores', (), filtro))
+        pares += [('obtener_estadisticas_firmeza_pronostico', (usuario,), filtro) for usuario in usuarios]
+
+        for metodo, args, kwargs in pares:
+            en_sql = _normalizar(getattr(bd_sql, metodo)(*args, **kwargs))
+            en_memoria = _normalizar(getattr(bd_memoria, metodo)(*args, **kwargs))
+            if metodo == 'obtener_ranking_mayores_errores':
+                en_sql, en_memoria = sorted(en_sql, key=str), sorted(en_memoria, key=str)
+            comparaciones += 1
+            if en_sql != en_memoria:
+                diferencias += 1
+                print(f"❌ {metodo}{args} difiere ({filtro or 'total'})")
+
+    if diferencias:
+        print(f"❌ {diferencias} de {comparaciones} estadísticas difieren.")
+    else:
+        print(f"✅ Las {comparaciones} estadísticas coinciden.")
+
+def sincronizar_replica(bd, modo=""):
+    bd_replica = BaseDeDatos()
+    inicio = time.perf_counter()
+    filas = bd_replica.sincronizar_replica_local(desde_cero=(modo == "completa"))
+    print(f"✅ Réplica local sincronizada: {filas} filas copiadas en {time.perf_counter() - inicio:.2f}s ({bd_replica.replica.ruta}).")
+
+COMANDOS = {
+    'reconstruir_ultimo_pronostico': reconstruir_ultimo_pronostico,
+    'recalcular_puntajes': recalcular_puntajes,
+    'verificar_puntajes': verificar_puntajes,
+    'reconstruir_posiciones': reconstruir_posiciones,
+    'verificar_posiciones': verificar_posiciones,
+    'reconstruir_campeones': reconstruir_campeones,
+    'verificar_campeones': verificar_campeones,
+    'verificar_instantanea': verificar_instantanea,
+    'sincronizar_replica': sincronizar_replica,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in COMANDOS:
+        print(__doc__)
+        sys.exit(1)
+
+    COMANDOS[sys.argv[1]](obtener_base_de_datos(), *sys.argv[2:])
@@ -0,0 +1,246 @@
+"""
+Micro-benchmarks del sistema. No tocan la base de datos: miden el costo en Python de cada mejora.
+
+Uso:
+    python mediciones_rendimiento.py            -> corre todas las mediciones
+    python mediciones_rendimiento.py instancia  -> corre solo la indicada
+
+Mediciones: instancia, evolucion_puestos, nucleo_puntajes
+"""
+import os
+import sys
+import random
+import time
+import timeit
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from argon2 import PasswordHasher
+
+import base_de_datos
+from base_de_datos import obtener_base_de_datos, calcular_evolucion_puestos
+import nucleo_puntajes
+from analitica import InstantaneaAnalitica
+
+REPETICIONES = 2000
+
+def _instanciacion_anterior():
+    """Replica el trabajo que hacía BaseDeDatos.__init__ en cada acción antes de compartir la instancia."""
+    if getattr(sys, 'frozen', False):
+        carpeta_actual = sys._MEIPASS
+    else:
+        carpeta_actual = os.path.dirname(os.path.abspath(base_de_datos.__file__))
+    ruta_certificado = os.path.join(carpeta_actual, "isrgrootx1.pem")
+    os.path.exists(ruta_certificado)
+    ruta_env = os.path.join(carpeta_actual, ".env")
+    if os.path.exists(ruta_env):
+        load_dotenv(override=True)
+    PasswordHasher()
+    return {
+        'user': os.getenv("DB_USER"),
+        'password': os.getenv("DB_PASSWORD"),
+        'host': os.getenv("DB_HOST", "gateway01.us-east-1.prod.aws.tidbcloud.com"),
+        'database': os.getenv("DB_NAME", "independiente"),
+        'ssl_ca': ruta_certificado
+    }
+
+def medir_instancia():
+    """Costo por acción de obtener la base de datos: instancia nueva vs. instancia compartida."""
+    obtener_base_de_datos() # Calentamos la instancia compartida
+
+    t_anterior = timeit.timeit(_instanciacion_anterior, number=REPETICIONES)
+    t_nueva = timeit.timeit(base_de_datos.BaseDeDatos, number=REPETICIONES)
+    t_compartida = timeit.timeit(obtener_base_de_datos, number=REPETICIONES)
+
+    print("--- Instancia de BaseDeDatos (por acción) ---")
+    print(f"Antes (config + .env + hasher):  {t_anterior / REPETICIONES * 1e6:10.2f} µs")
+    print(f"BaseDeDatos() con config única:  {t_nueva / REPETICIONES * 1e6:10.2f} µs")
+    print(f"obtener_base_de_datos():         {t_compartida / REPETICIONES * 1e6:10.2f} µs")
+    ahorro = (t_anterior - t_compartida) / REPETICIONES * 1e6
+    print(f"Ahorro por acción:               {ahorro:10.2f} µs")
+
+def _edicion_sintetica(cant_usuarios=200, cant_partidos=60, participacion=0.8, semilla=1905):
+    """Edición ficticia: cada usuario pronostica cada partido con probabilidad 'participacion'."""
+    azar = random.Random(semilla)
+    ids_usuarios = list(range(1, cant_usuarios + 1))
+    partidos = []
+    for _ in range(cant_partidos):
+        partidos.append([
+            (uid, azar.choice((0, 0, 3, 3, 6, 9)), azar.randint(0, 6), azar.randint(60, 7 * 24 * 3600))
+            for uid in ids_usuarios if azar.random() < participacion
+        ])
+    return ids_usuarios, partidos
+
+def _evolucion_puestos_anterior(ids_usuarios, partidos, nombres_seleccionados, mapa_nombres):
+    """Parte en Python del algoritmo anterior: reordena a todos después de cada partido y busca cada nombre con next()."""
+    puntos_acumulados = {uid: 0 for uid in ids_usuarios}
+    cant_partidos_jugados = {uid: 0 for uid in ids_usuarios}
+    suma_error_absoluto = {uid: 0.0 for uid in ids_usuarios}
+    suma_anticipacion = {uid: 0.0 for uid in ids_usuarios}
+    historial_grafico = {user: [] for user in nombres_seleccionados}
+
+    for resultados in partidos:
+        for uid, pts, err, segs in resultados:
+            if uid in puntos_acumulados:
+                puntos_acumulados[uid] += pts
+                cant_partidos_jugados[uid] += 1
+                suma_error_absoluto[uid] += float(err) if err is not None else 0.0
+                suma_anticipacion[uid] += float(segs) if segs is not None else 0.0
+
+        def get_sort_key(uid):
+            pts = puntos_acumulados[uid]
+            partidos_jug = cant_partidos_jugados[uid]
+            if partidos_jug > 0:
+                avg_error = suma_error_absoluto[uid] / partidos_jug
+                avg_ant = suma_anticipacion[uid] / partidos_jug
+            else:
+                avg_error = 999.0
+                avg_ant = 0.0
+            return (-pts, -partidos_jug, avg_error, -avg_ant)
+
+        ranking_ordenado = sorted(ids_usuarios, key=get_sort_key)
+        mapa_puestos = {}
+        prev_key = None
+        puesto_actual = 0
+        for i, uid in enumerate(ranking_ordenado):
+            current_key = get_sort_key(uid)
+            if current_key != prev_key:
+                puesto_actual = i + 1
+                prev_key = current_key
+            mapa_puestos[uid] = puesto_actual
+
+        for usuario_target in nombres_seleccionados:
+            target_id = next((k for k, v in mapa_nombres.items() if v == usuario_target), None)
+            if target_id:
+                historial_grafico[usuario_target].append(mapa_puestos.get(target_id, len(ids_usuarios)))
+
+    return historial_grafico
+
+def medir_evolucion_puestos():
+    """Gráfico de puestos en una edición de 200 usuarios y 60 partidos: ranking re-ordenado vs. incremental."""
+    repeticiones = 20
+    for participacion in (0.8, 0.1):
+        ids_usuarios, partidos = _edicion_sintetica(participacion=participacion)
+        mapa_nombres = {uid: f"usuario{uid}" for uid in ids_usuarios}
+        nombres = [mapa_nombres[uid] for uid in ids_usuarios[::20]] # 10 usuarios seleccionados
+        seleccionados = {mapa_nombres[uid]: uid for uid in ids_usuarios[::20]}
+
+        anterior = _evolucion_puestos_anterior(ids_usuarios, partidos, nombres, mapa_nombres)
+        nueva = calcular_evolucion_puestos(ids_usuarios, partidos, seleccionados)
+        if anterior != nueva:
+            print(f"❌ Los puestos calculados NO coinciden con el algoritmo anterior (participación {participacion:.0%})")
+            continue
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            _evolucion_puestos_anterior(ids_usuarios, partidos, nombres, mapa_nombres)
+        t_anterior = (time.perf_counter() - inicio) / repeticiones
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            calcular_evolucion_puestos(ids_usuarios, partidos, seleccionados)
+        t_nueva = (time.perf_counter() - inicio) / repeticiones
+
+        print(f"--- Evolución de puestos ({len(ids_usuarios)} usuarios, {len(partidos)} partidos, participación {participacion:.0%}) ---")
+        print(f"Antes (sort por partido + next()):  {t_anterior * 1e3:8.2f} ms  + {len(partidos)} consultas SQL")
+        print(f"Ranking incremental:                {t_nueva * 1e3:8.2f} ms  + 1 consulta SQL")
+        print(f"Mejora en Python:                   {t_anterior / t_nueva:8.1f}x (resultados idénticos)")
+
+def _pronosticos_sinteticos(cant_usuarios=2000, cant_partidos=500, participacion=1.0, semilla=1905):
+    """Datos para la instantánea analítica: 2000 x 500 = 1M de últimos pronósticos (10 ediciones en 5 años)."""
+    azar = random.Random(semilla)
+    inicio = datetime(2021, 1, 1)
+    usuarios = [(uid, f"usuario{uid:04d}") for uid in range(1, cant_usuarios + 1)]
+    partidos = []
+    for pid in range(1, cant_partidos + 1):
+        fecha = inicio + timedelta(days=pid * 3)
+        edicion_id = 1 + (pid - 1) * 10 // cant_partidos
+        partidos.append((pid, edicion_id, 2021 + (edicion_id - 1) // 2, fecha.year, fecha,
+                         f"Rival {pid % 30}", azar.randint(0, 4), azar.randint(0, 4)))
+    pronosticos = [
+        (uid, pid, azar.randint(0, 4), azar.randint(0, 3), fecha - timedelta(hours=2), azar.choice((1, 1, 1, 2, 3)))
+        for pid, _, _, _, fecha, _, _, _ in partidos
+        for uid, _ in usuarios if azar.random() < participacion
+    ]
+    return usuarios, partidos, pronosticos
+
+def _evaluar_fila_por_fila(pred_cai, pred_rival, goles_cai, goles_rival, grupo, cant_grupos):
+    """Lo que hace cada consulta SQL por fila (CASE por acierto), pero recorriendo en Python."""
+    puntos = [0] * cant_grupos
+    error = [0] * cant_grupos
+    indice = [0] * cant_grupos
+    for pc, pr, gc, gr, g in zip(pred_cai, pred_rival, goles_cai, goles_rival, grupo):
+        puntos[g] += base_de_datos.PUNTOS * (((gc > gr) - (gc < gr) == (pc > pr) - (pc < pr)) + (gc == pc) + (gr == pr))
+        error[g] += abs(gc - pc) + abs(gr - pr)
+        indice[g] += (pc - pr) - (gc - gr)
+    return puntos, error, indice
+
+def medir_nucleo_puntajes():
+    """Puntaje, error y optimismo de 1M de pronósticos: fila por fila en Python vs. núcleo NumPy."""
+    if not nucleo_puntajes.HAY_NUMPY:
+        print("--- Núcleo de puntajes: NumPy no está instalado (pip install numpy) ---")
+        return
+    np = nucleo_puntajes.np
+
+    usuarios, partidos, pronosticos = _pronosticos_sinteticos()
+    print(f"--- Núcleo de puntajes ({len(pronosticos):,} pronósticos, {len(usuarios)} usuarios, {len(partidos)} partidos) ---")
+
+    # 1. Núcleo solo: evaluar todo y reducir por usuario, edición y año
+    goles = {p[0]: (p[6], p[7], p[1], p[2]) for p in partidos}
+    pred_cai = np.array([f[2] for f in pronosticos], dtype=np.int32)
+    pred_rival = np.array([f[3] for f in pronosticos], dtype=np.int32)
+    goles_cai = np.array([goles[f[1]][0] for f in pronosticos], dtype=np.int32)
+    goles_rival = np.array([goles[f[1]][1] for f in pronosticos], dtype=np.int32)
+    usuario = np.array([f[0] - 1 for f in pronosticos], dtype=np.int32)
+    grupos = {
+        'usuario': (usuario, len(usuarios)),
+        'edición': (np.array([goles[f[1]][2] for f in pronosticos], dtype=np.int32), 11),
+        'año': (np.array([goles[f[1]][3] - 2021 for f in pronosticos], dtype=np.int32), 5),
+    }
+    listas = [c.tolist() for c in (pred_cai, pred_rival, goles_cai, goles_rival)]
+
+    for nombre, (grupo, cant) in grupos.items():
+        inicio = time.perf_counter()
+        anterior = _evaluar_fila_por_fila(*listas, grupo.tolist(), cant)
+        t_anterior = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        ev = nucleo_puntajes.evaluar(pred_cai, pred_rival, goles_cai, goles_rival)
+        nueva = (
+            nucleo_puntajes.sumar_por_grupo(grupo, ev['puntos'], cant),
+            nucleo_puntajes.sumar_por_grupo(grupo, ev['error_absoluto'], cant),
+            nucleo_puntajes.sumar_por_grupo(grupo, ev['indice'], cant),
+        )
+        t_nueva = time.perf_counter() - inicio
+
+        estado = "resultados idénticos" if anterior == nueva else "❌ NO coinciden"
+        print(f"Por {nombre:8} fila por fila: {t_anterior * 1e3:8.1f} ms   NumPy: {t_nueva * 1e3:7.1f} ms   "
+              f"{t_anterior / t_nueva:6.1f}x ({estado})")
+
+    # 2. Instantánea analítica completa (todos los rankings del menú de estadísticas de un filtro)
+    resultados = {}
+    for vectorizar in (False, True):
+        instantanea = InstantaneaAnalitica(usuarios, partidos, pronosticos, vectorizar=vectorizar)
+        inicio = time.perf_counter()
+        for edicion_id in (None, 3):
+            resultados[(vectorizar, edicion_id)] = instantanea._calcular(edicion_id, None)
+        resultados[vectorizar] = (time.perf_counter() - inicio) / 2
+
+    iguales = all(resultados[(False, e)] == resultados[(True, e)] for e in (None, 3))
+    print(f"Instantánea analítica (pasada por filtro): Python {resultados[False] * 1e3:8.1f} ms   "
+          f"NumPy {resultados[True] * 1e3:7.1f} ms   {resultados[False] / resultados[True]:6.1f}x "
+          f"({'resultados idénticos' if iguales else '❌ NO coinciden'})")
+
+MEDICIONES = {
+    'instancia': medir_instancia,
+    'evolucion_puestos': medir_evolucion_puestos,
+    'nucleo_puntajes': medir_nucleo_puntajes,
+}
+
+if __name__ == '__main__':
+    elegidas = sys.argv[1:] or list(MEDICIONES)
+    for nombre in elegidas:
+        if nombre not in MEDICIONES:
+            print(f"Medición desconocida: {nombre}. Opciones: {', '.join(MEDICIONES)}")
+            continue
+        MEDICIONES[nombre]()
+        print()
@@ -0,0 +1,133 @@
+"""
+Migraciones versionadas del esquema. Cada una se aplica una sola vez y queda registrada
+en la tabla 'schema_migraciones' (versión, descripción y fecha).
+
+Uso:
+    python migraciones.py           -> aplica las migraciones pendientes
+    python migraciones.py estado    -> muestra cuáles están aplicadas y cuáles no
+
+Para agregar una migración: sumar una tupla al final de MIGRACIONES con la versión siguiente.
+Nunca modificar una migración ya aplicada; si hay que corregirla, se agrega otra.
+"""
+import sys
+import logging
+from base_de_datos import obtener_base_de_datos
+
+logger = logging.getLogger(__name__)
+
+SQL_CREAR_SCHEMA_MIGRACIONES = """
+    CREATE TABLE schema_migraciones (
+        version INT PRIMARY KEY,
+        descripcion VARCHAR(255) NOT NULL,
+        fecha_aplicacion DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# --- AYUDANTES (idempotentes: 'IF NOT EXISTS' genera avisos y la conexión usa raise_on_warnings) ---
+def _existe_tabla(cursor, tabla):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (tabla,))
+    return cursor.fetchone()[0] > 0
+
+def _existe_indice(cursor, tabla, indice):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (tabla, indice))
+    return cursor.fetchone()[0] > 0
+
+def _crear_indice(cursor, tabla, indice, columnas):
+    if _existe_indice(cursor, tabla, indice):
+        logger.info(f"El índice {indice} ya existía en '{tabla}'.")
+        return
+    cursor.execute(f"CREATE INDEX {indice} ON {tabla} ({', '.join(columnas)})")
+    logger.info(f"Índice {indice} creado en '{tabla}'.")
+
+# --- MIGRACIONES ---
+def _indices_pronosticos(cursor):
+    # "Último pronóstico" = MAX(id) agrupado por (usuario_id, partido_id). El id (PK) va implícito
+    # al final de cada índice secundario, así que ambos índices cubren esa subconsulta sin leer la tabla.
+    # 1. Por usuario: historial, estilo, tendencia y los partidos de la pantalla principal
+    _crear_indice(cursor, 'pronosticos', 'idx_pronosticos_usuario_partido_fecha', ['usuario_id', 'partido_id', 'fecha_prediccion'])
+    # 2. Por partido: evolución de puestos, quién pronosticó, MAX(fecha_prediccion) de un partido
+    _crear_indice(cursor, 'pronosticos', 'idx_pronosticos_partido_usuario_fecha', ['partido_id', 'usuario_id', 'fecha_prediccion'])
+
+def _indices_partidos(cursor):
+    # Filtro por edición + partidos jugados ordenados por fecha (rankings, evolución, rachas).
+    # Los goles van en el índice para resolver 'IS NOT NULL' sin ir a la tabla.
+    _crear_indice(cursor, 'partidos', 'idx_partidos_edicion_fecha', ['edicion_id', 'fecha_hora', 'goles_independiente', 'goles_rival'])
+    # Rangos de fecha: próximos partidos, agenda, recordatorios (fecha_unica es DATE y no sirve para rangos DATETIME)
+    _crear_indice(cursor, 'partidos', 'idx_partidos_fecha', ['fecha_hora'])
+
+# Los filtros de 'usuarios' por id_telegram, email y username ya usan sus índices UNIQUE.
+MIGRACIONES = [
+    (1, "Índices compuestos de pronosticos (usuario/partido/fecha)", _indices_pronosticos),
+    (2, "Índices de partidos por edición y por fecha", _indices_partidos),
+]
+
+# --- MOTOR ---
+def obtener_versiones_aplicadas(cursor):
+    if not _existe_tabla(cursor, 'schema_migraciones'):
+        cursor.execute(SQL_CREAR_SCHEMA_MIGRACIONES)
+    cursor.execute("SELECT version FROM schema_migraciones")
+    return {fila[0] for fila in cursor.fetchall()}
+
+def aplicar_migraciones(bd=None):
+    """Aplica en orden las migraciones pendientes. Retorna la lista de versiones aplicadas ahora."""
+    bd = bd or obtener_base_de_datos()
+    conexion = None
+    cursor = None
+    aplicadas_ahora = []
+    try:
+        conexion = bd.abrir()
+        cursor = conexion.cursor()
+        aplicadas = obtener_versiones_aplicadas(cursor)
+
+        for version, descripcion, migracion in MIGRACIONES:
+            if version in aplicadas:
+                continue
+            logger.info(f"Aplicando migración {version}: {descripcion}")
+            # Los DDL confirman solos en MySQL/TiDB; el registro va al final para poder reintentar
+            migracion(cursor)
+            cursor.execute(
+                "INSERT INTO schema_migraciones (version, descripcion) VALUES (%s, %s)",
+                (version, descripcion)
+            )
+            conexion.commit()
+            aplicadas_ahora.append(version)
+        return aplicadas_ahora
+    except Exception as e:
+        if conexion: conexion.rollback()
+        logger.error(f"Error aplicando migraciones: {e}")
+        raise e
+    finally:
+        if cursor: cursor.close()
+        if conexion: conexion.close()
+
+def obtener_estado(bd=None):
+    """Retorna [(version, descripcion, aplicada)] de todas las migraciones conocidas."""
+    bd = bd or obtener_base_de_datos()
+    conexion = None
+    cursor = None
+    try:
+        conexion = bd.abrir()
+        cursor = conexion.cursor()
+        aplicadas = obtener_versiones_aplicadas(cursor)
+        conexion.commit()
+        return [(version, descripcion, version in aplicadas) for version, descripcion, _ in MIGRACIONES]
+    finally:
+        if cursor: cursor.close()
+        if conexion: conexion.close()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'estado':
+        for version, descripcion, aplicada in obtener_estado():
+            print(f"{'✅' if aplicada else '⏳'} {version:3d}  {descripcion}")
+    else:
+        nuevas = aplicar_migraciones()
+        if nuevas:
+            print(f"✅ Migraciones aplicadas: {', '.join(str(v) for v in nuevas)}")
+        else:
+            print("✅ El esquema ya estaba al día.")
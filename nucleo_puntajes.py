@@ -0,0 +1,127 @@
+"""
+Núcleo vectorizado de puntajes: evalúa TODOS los pronósticos de una vez con NumPy
+en lugar de recorrerlos uno por uno en Python.
+
+Misma fórmula que la base de datos (ver _sql_puntos_en_vivo en base_de_datos.py):
+    - acierto_resultado: SIGN(goles CAI - goles rival) igual en el pronóstico y en el partido
+    - acierto_cai / acierto_rival: goles exactos de cada equipo
+    - puntos: PUNTOS por cada acierto
+    - error_absoluto: |dif. goles CAI| + |dif. goles rival|
+    - indice (optimismo): (pred CAI - pred rival) - (real CAI - real rival)
+
+NumPy es opcional: si no está instalado HAY_NUMPY queda en False y la instantánea analítica
+usa su pasada en Python puro (mismos resultados, más lenta).
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAY_NUMPY = np is not None
+
+PUNTOS = 3 # Igual que base_de_datos.PUNTOS (no se importa para no cargar el conector de MySQL)
+
+# Columnas de la evaluación de cada pronóstico
+DTYPE_EVALUACION = [
+    ('acierto_resultado', 'i1'),
+    ('acierto_cai', 'i1'),
+    ('acierto_rival', 'i1'),
+    ('puntos', 'i1'),
+    ('error_absoluto', 'i4'),
+    ('indice', 'i4'),
+]
+
+def columna(buffer, tipo='intc'):
+    """Vista NumPy (sin copiar) de una columna array('i') / bytearray de la instantánea."""
+    return np.frombuffer(buffer, dtype=tipo)
+
+def evaluar(pred_cai, pred_rival, goles_cai, goles_rival):
+    """
+    Evalúa cada pronóstico contra el resultado real de su partido (arrays alineados, uno por pronóstico).
+    Retorna un array estructurado con las columnas de DTYPE_EVALUACION.
+    """
+    pred_cai = np.asarray(pred_cai, dtype=np.int32)
+    pred_rival = np.asarray(pred_rival, dtype=np.int32)
+    goles_cai = np.asarray(goles_cai, dtype=np.int32)
+    goles_rival = np.asarray(goles_rival, dtype=np.int32)
+
+    dif_pred = pred_cai - pred_rival
+    dif_real = goles_cai - goles_rival
+
+    evaluacion = np.empty(len(pred_cai), dtype=DTYPE_EVALUACION)
+    evaluacion['acierto_resultado'] = np.sign(dif_pred) == np.sign(dif_real)
+    evaluacion['acierto_cai'] = pred_cai == goles_cai
+    evaluacion['acierto_rival'] = pred_rival == goles_rival
+    evaluacion['puntos'] = PUNTOS * (
+        evaluacion['acierto_resultado'] + evaluacion['acierto_cai'] + evaluacion['acierto_rival']
+    )
+    evaluacion['error_absoluto'] = np.abs(goles_cai - pred_cai) + np.abs(goles_rival - pred_rival)
+    evaluacion['indice'] = dif_pred - dif_real
+    return evaluacion
+
+def sumar_por_grupo(grupo, valores, cant_grupos, mascara=None):
+    """
+    Suma 'valores' agrupando por 'grupo' (enteros 0..cant_grupos-1). Con 'valores' None cuenta filas.
+    Retorna una lista de int de largo cant_grupos.
+    """
+    if mascara is not None:
+        grupo = grupo[mascara]
+        valores = valores[mascara] if valores is not None else None
+    pesos = None if valores is None else valores.astype(np.float64)
+    # Los pesos son enteros chicos: la suma en float64 es exacta
+    return np.bincount(grupo, weights=pesos, minlength=cant_grupos).astype(np.int64).tolist()
+
+def resumen_por_grupo(evaluacion, grupo, cant_grupos, mascara=None):
+    """
+    Reducción agrupada (por usuario, edición o año) de una evaluación: las mismas columnas que la tabla 'posiciones'.
+    Retorna {columna: [valor por grupo]}.
+    """
+    return {
+        'partidos_jugados': sumar_por_grupo(grupo, None, cant_grupos, mascara),
+        'total_puntos': sumar_por_grupo(grupo, evaluacion['puntos'], cant_grupos, mascara),
+        'pts_resultado': [v * PUNTOS for v in sumar_por_grupo(grupo, evaluacion['acierto_resultado'], cant_grupos, mascara)],
+        'pts_cai': [v * PUNTOS for v in sumar_por_grupo(grupo, evaluacion['acierto_cai'], cant_grupos, mascara)],
+        'pts_rival': [v * PUNTOS for v in sumar_por_grupo(grupo, evaluacion['acierto_rival'], cant_grupos, mascara)],
+        'suma_error': sumar_por_grupo(grupo, evaluacion['error_absoluto'], cant_grupos, mascara),
+        'exactos': sumar_por_grupo(grupo, evaluacion['acierto_cai'] & evaluacion['acierto_rival'], cant_grupos, mascara),
+    }
+
+def rachas_por_usuario(usuario, posicion, sumo, cant_usuarios, cant_partidos):
+    """
+    Racha actual y récord de cada usuario de una vez, con una matriz usuarios x partidos.
+    - usuario / posicion: usuario y orden cronológico del partido de cada pronóstico
+    - sumo: máscara de los pronósticos que sumaron puntos
+    Retorna (actual, record) como listas de int (mismo resultado que base_de_datos.calcular_rachas).
+    """
+    # Una columna de ceros a cada lado: cada tira de unos tiene un inicio (+1) y un fin (-1) en la diferencia
+    matriz = np.zeros((cant_usuarios, cant_partidos + 2), dtype=np.int8)
+    matriz[usuario[sumo], posicion[sumo] + 1] = 1
+    bordes = np.diff(matriz, axis=1)
+
+    # np.nonzero recorre fila por fila, así que inicios y fines quedan emparejados
+    filas, inicios = np.nonzero(bordes == 1)
+    _, fines = np.nonzero(bordes == -1)
+    largos = fines - inicios
+
+    record = np.zeros(cant_usuarios, dtype=np.int64)
+    np.maximum.at(record, filas, largos)
+
+    # La actual es la tira que termina en el último partido
+    actual = np.zeros(cant_usuarios, dtype=np.int64)
+    vigentes = fines == cant_partidos
+    actual[filas[vigentes]] = largos[vigentes]
+    return actual.tolist(), record.tolist()
+
+def mayores(valores, limite):
+    """
+    Posiciones de 'valores' cuyo RANK() descendente es <= limite (incluye los empates del último puesto).
+    Con NumPy usa una selección parcial en lugar de ordenar todo.
+    """
+    if len(valores) <= limite:
+        return list(range(len(valores)))
+    if HAY_NUMPY:
+        valores = np.asarray(valores)
+        corte = np.partition(valores, len(valores) - limite)[len(valores) - limite]
+        return np.nonzero(valores >= corte)[0].tolist()
+    corte = sorted(valores, reverse=True)[limite - 1]
+    return [i for i, valor in enumerate(valores) if valor >= corte]
@@ -0,0 +1,214 @@
+import threading
+import time
+import logging
+import mysql.connector
+
+logger = logging.getLogger(__name__)
+
+TAMANIO_POOL_POR_DEFECTO = 5
+EDAD_MAXIMA_CONEXION = 1800 # Segundos. TiDB Cloud corta las conexiones inactivas, así que las reciclamos antes
+TIEMPO_ESPERA_MAXIMO = 30   # Segundos que un hilo espera una conexión libre antes de fallar
+
+class ConexionPrestada:
+    """
+    Envoltorio de una conexión del pool. Se comporta igual que la conexión original,
+    pero close() la devuelve al pool en lugar de cerrarla, así los métodos de
+    BaseDeDatos no necesitan cambiar nada.
+    """
+    def __init__(self, pool, conexion, fecha_creacion):
+        self._pool = pool
+        self._conexion = conexion
+        self._fecha_creacion = fecha_creacion
+        self._devuelta = False
+
+    def __getattr__(self, nombre):
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+        return getattr(self._conexion, nombre)
+
+    def is_connected(self):
+        if self._devuelta:
+            return False
+        return self._conexion.is_connected()
+
+    def close(self):
+        """Devuelve la conexión al pool (llamarlo dos veces no tiene efecto)."""
+        if self._devuelta:
+            return
+        self._devuelta = True
+        self._pool._devolver(self._conexion, self._fecha_creacion)
+
+    def __del__(self):
+        # Red de seguridad: si un método se olvidó de cerrar (por ejemplo, tras una excepción),
+        # recuperamos el lugar en el pool cuando el envoltorio se destruye.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConexionDelLote:
+    """
+    Conexión compartida por las lecturas de un lote (BaseDeDatos.obtener_lote).
+    Cada método la cierra como siempre, pero close() no hace nada: la devuelve al pool
+    el lote cuando termina la última lectura. Se evita el ping y el rollback de cada préstamo;
+    las consultas se siguen enviando de a una.
+    """
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def __getattr__(self, nombre):
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+        return getattr(self._conexion, nombre)
+
+    def close(self):
+        pass
+
+class PoolConexiones:
+    """
+    Pool de conexiones seguro entre hilos.
+    - Valida cada conexión (ping) antes de prestarla.
+    - Recicla las conexiones que superan la edad máxima.
+    - Registra métricas del tiempo de espera para obtener una conexión.
+    """
+    def __init__(self, config, tamanio=TAMANIO_POOL_POR_DEFECTO, edad_maxima=EDAD_MAXIMA_CONEXION, tiempo_espera=TIEMPO_ESPERA_MAXIMO):
+        self.config = dict(config)
+        self.tamanio = max(1, int(tamanio))
+        self.edad_maxima = edad_maxima
+        self.tiempo_espera = tiempo_espera
+
+        self._condicion = threading.Condition()
+        self._libres = [] # Lista de tuplas (conexion, fecha_creacion)
+        self._creadas = 0
+
+        # Métricas
+        self._prestamos = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+        self._descartadas = 0
+
+    def _crear_conexion(self):
+        return mysql.connector.connect(**self.config), time.monotonic()
+
+    def _es_valida(self, conexion, fecha_creacion):
+        """Una conexión es válida si no está vencida y responde al ping."""
+        if time.monotonic() - fecha_creacion > self.edad_maxima:
+            return False
+        try:
+            conexion.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, conexion):
+        """Cierra una conexión de verdad y libera su lugar en el pool (llamar con el lock tomado)."""
+        self._creadas -= 1
+        self._descartadas += 1
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def obtener(self):
+        """Presta una conexión validada. Si el pool está lleno, espera hasta que se libere una."""
+        inicio = time.monotonic()
+        limite = inicio + self.tiempo_espera
+
+        while True:
+            candidata = None
+            with self._condicion:
+                while True:
+                    # 1. Reutilizamos una conexión libre (la más reciente primero, que es la más "caliente")
+                    if self._libres:
+                        candidata = self._libres.pop()
+                        break
+
+                    # 2. Si hay lugar, reservamos el cupo y la creamos fuera del lock
+                    if self._creadas < self.tamanio:
+                        self._creadas += 1
+                        break
+
+                    # 3. Pool agotado: esperamos a que alguien devuelva una conexión
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise Exception(f"Error de Conexión: no hay conexiones libres en el pool (tamaño {self.tamanio}).")
+                    self._condicion.wait(restante)
+
+            if candidata is not None:
+                # El ping se hace sin el lock para no frenar a los demás hilos
+                conexion, fecha_creacion = candidata
+                if not self._es_valida(conexion, fecha_creacion):
+                    with self._condicion:
+                        self._descartar(conexion)
+                    continue
+            else:
+                try:
+                    conexion, fecha_creacion = self._crear_conexion()
+                except Exception:
+                    with self._condicion:
+                        self._creadas -= 1
+                        self._condicion.notify()
+                    raise
+
+            with self._condicion:
+                self._registrar_espera(time.monotonic() - inicio)
+            return ConexionPrestada(self, conexion, fecha_creacion)
+
+    def _devolver(self, conexion, fecha_creacion):
+        """Recibe una conexión prestada. Descarta la transacción pendiente antes de guardarla."""
+        try:
+            # Así el próximo que la use no hereda una transacción abierta ni una foto vieja de los datos
+            conexion.rollback()
+            reutilizable = time.monotonic() - fecha_creacion <= self.edad_maxima
+        except Exception:
+            reutilizable = False
+
+        with self._condicion:
+            if reutilizable:
+                self._libres.append((conexion, fecha_creacion))
+            else:
+                self._descartar(conexion)
+            self._condicion.notify()
+
+    def _registrar_espera(self, segundos):
+        """Acumula las métricas de espera (llamar con el lock tomado)."""
+        self._prestamos += 1
+        self._espera_total += segundos
+        if segundos > self._espera_maxima:
+            self._espera_maxima = segundos
+
+    def obtener_metricas(self):
+        """Devuelve un diccionario con el estado del pool y los tiempos de espera."""
+        with self._condicion:
+            return {
+                'tamanio': self.tamanio,
+                'creadas': self._creadas,
+                'libres': len(self._libres),
+                'en_uso': self._creadas - len(self._libres),
+                'prestamos': self._prestamos,
+                'espera_promedio': (self._espera_total / self._prestamos) if self._prestamos else 0.0,
+                'espera_maxima': self._espera_maxima,
+                'descartadas': self._descartadas
+            }
+
+    def cerrar_todo(self):
+        """Cierra todas las conexiones libres (las prestadas se cierran al devolverse)."""
+        with self._condicion:
+            while self._libres:
+                conexion, _ = self._libres.pop()
+                self._descartar(conexion)
+
+# --- POOLS COMPARTIDOS POR TODO EL PROCESO ---
+_pools = {}
+_lock_pools = threading.Lock()
+
+def obtener_pool(config, tamanio=TAMANIO_POOL_POR_DEFECTO, edad_maxima=EDAD_MAXIMA_CONEXION, tiempo_espera=TIEMPO_ESPERA_MAXIMO):
+    """Devuelve el pool del proceso para esta configuración, creándolo la primera vez."""
+    clave = tuple(sorted((k, str(v)) for k, v in config.items()))
+    with _lock_pools:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = PoolConexiones(config, tamanio, edad_maxima, tiempo_espera)
+            _pools[clave] = pool
+            logger.info(f"Pool de conexiones creado (tamaño {pool.tamanio}).")
+        return pool
@@ -0,0 +1,186 @@
+"""
+Registro (logs) del bot en segundo plano.
+Antes cada _registrar_log abría el archivo, escribía una línea y lo cerraba (y armaba de nuevo la zona
+horaria) dentro del handler. Ahora los handlers solo encolan la línea y un único hilo escritor:
+    - Vacía la cola en lotes (hasta LINEAS_POR_LOTE líneas o cada SEGUNDOS_ENTRE_VACIADOS), abriendo
+      cada archivo una sola vez por lote.
+    - Rota los archivos que superan TAMANIO_MAXIMO_ARCHIVO (logs_bot.txt -> logs_bot.txt.1 -> ...).
+    - Opcionalmente escribe JSON lines (BOT_LOG_JSON=1) con fecha, mensaje y campos extra.
+La cola es acotada: si el escritor no da abasto, la línea se descarta (y se cuenta) en lugar de frenar
+al bot; registrar() nunca espera porque se llama desde los handlers, en el event loop.
+
+Uso:
+    registro = RegistroAsincrono(carpeta, zona_horaria)
+    registro.registrar("Aviso enviado", archivo="logs_bot.txt", usuario="pepe")
+    registro.vaciar()   # Espera a que lo encolado hasta ahora esté en disco
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+CAPACIDAD_COLA = 10000
+LINEAS_POR_LOTE = 200
+SEGUNDOS_ENTRE_VACIADOS = 1.0
+TAMANIO_MAXIMO_ARCHIVO = int(os.getenv("BOT_LOG_TAMANIO_MAXIMO", 5 * 1024 * 1024))
+ARCHIVOS_ROTADOS = int(os.getenv("BOT_LOG_ROTACIONES", 3))
+FORMATO_JSON = os.getenv("BOT_LOG_JSON", "0") == "1"
+
+class RegistroAsincrono:
+    """
+    - carpeta: dónde se escriben los archivos de log.
+    - zona_horaria: tzinfo para la marca de tiempo (se arma una sola vez, no en cada línea).
+    """
+    def __init__(self, carpeta, zona_horaria=None, formato_json=FORMATO_JSON, capacidad=CAPACIDAD_COLA,
+                 lineas_por_lote=LINEAS_POR_LOTE, segundos_entre_vaciados=SEGUNDOS_ENTRE_VACIADOS,
+                 tamanio_maximo=TAMANIO_MAXIMO_ARCHIVO, rotaciones=ARCHIVOS_ROTADOS):
+        self.carpeta = carpeta
+        self.zona_horaria = zona_horaria
+        self.formato_json = formato_json
+        self.lineas_por_lote = lineas_por_lote
+        self.segundos_entre_vaciados = segundos_entre_vaciados
+        self.tamanio_maximo = tamanio_maximo
+        self.rotaciones = rotaciones
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._cerrado = False
+
+        # Métricas
+        self.encoladas = 0
+        self.escritas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.rotados = 0
+
+        self._hilo = threading.Thread(target=self._escribir_en_segundo_plano, name="registro_bot", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def _formatear(self, ahora, mensaje, campos):
+        if self.formato_json:
+            return json.dumps({'fecha': ahora.isoformat(timespec='seconds'), 'mensaje': mensaje, **campos},
+                              ensure_ascii=False, default=str) + "\n"
+        return f"[{ahora.strftime('%Y-%m-%d %H:%M:%S')}] : {mensaje}\n"
+
+    def registrar(self, mensaje, archivo="logs_bot.txt", **campos):
+        """Encola una línea (la marca de tiempo es la de este momento, no la de la escritura)."""
+        if self._cerrado:
+            return False
+        linea = self._formatear(datetime.now(self.zona_horaria), mensaje, campos)
+        try:
+            self._cola.put_nowait((archivo, linea))
+        except queue.Full:
+            self.descartadas += 1
+            return False
+        self.encoladas += 1
+        return True
+
+    def vaciar(self, timeout=5):
+        """Espera (como mucho 'timeout' segundos) a que todo lo encolado hasta ahora esté escrito."""
+        if self._cerrado:
+            return not self._hilo.is_alive()
+        listo = threading.Event()
+        try:
+            self._cola.put(listo, timeout=timeout)
+        except queue.Full:
+            return False
+        return listo.wait(timeout)
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el hilo escritor."""
+        if self._cerrado:
+            return
+        self._cerrado = True
+        self._cola.put(None)
+        self._hilo.join(timeout=5)
+
+    def _escribir_en_segundo_plano(self):
+        while True:
+            pendientes = {} # archivo -> [líneas]
+            avisos = []     # Eventos de vaciar() que quedan listos con este lote
+            cantidad = 0
+            terminar = False
+            limite = time.monotonic() + self.segundos_entre_vaciados
+
+            elemento = self._cola.get()
+            while True:
+                if elemento is None:
+                    terminar = True
+                elif isinstance(elemento, threading.Event):
+                    # No hace falta esperar a completar el lote: alguien quiere ver el archivo ya
+                    avisos.append(elemento)
+                    break
+                else:
+                    archivo, linea = elemento
+                    pendientes.setdefault(archivo, []).append(linea)
+                    cantidad += 1
+                if terminar or cantidad >= self.lineas_por_lote:
+                    break
+                try:
+                    elemento = self._cola.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            self._escribir_lote(pendientes)
+            for aviso in avisos:
+                aviso.set()
+            if terminar:
+                # Lo que se encoló mientras se cerraba también se escribe
+                resto = {}
+                while True:
+                    try:
+                        elemento = self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(elemento, tuple):
+                        resto.setdefault(elemento[0], []).append(elemento[1])
+                    elif isinstance(elemento, threading.Event):
+                        elemento.set()
+                self._escribir_lote(resto)
+                return
+
+    def _escribir_lote(self, pendientes):
+        if not pendientes:
+            return
+        for archivo, lineas in pendientes.items():
+            ruta = os.path.join(self.carpeta, archivo)
+            try:
+                self._rotar_si_hace_falta(ruta)
+                with open(ruta, "a", encoding="utf-8") as f:
+                    f.writelines(lineas)
+                self.escritas += len(lineas)
+            except Exception as e:
+                # Fallback seguro en caso de que no pueda escribir en el archivo
+                self.descartadas += len(lineas)
+                print(f"Error crítico al intentar guardar el log: {e}")
+        self.lotes += 1
+
+    def _rotar_si_hace_falta(self, ruta):
+        if not self.tamanio_maximo:
+            return
+        try:
+            if os.path.getsize(ruta) < self.tamanio_maximo:
+                return
+        except FileNotFoundError:
+            return
+        if self.rotaciones <= 0:
+            os.remove(ruta)
+        else:
+            # logs.txt.2 -> logs.txt.3, logs.txt.1 -> logs.txt.2, logs.txt -> logs.txt.1
+            for numero in range(self.rotaciones - 1, 0, -1):
+                if os.path.exists(f"{ruta}.{numero}"):
+                    os.replace(f"{ruta}.{numero}", f"{ruta}.{numero + 1}")
+            os.replace(ruta, f"{ruta}.1")
+        self.rotados += 1
+
+    def obtener_metricas(self):
+        return {
+            'encoladas': self.encoladas,
+            'escritas': self.escritas,
+            'descartadas': self.descartadas,
+            'lotes': self.lotes,
+            'rotados': self.rotados,
+            'en_cola': self._cola.qsize(),
+        }
@@ -0,0 +1,231 @@
+"""
+Réplica local (SQLite) de las tablas que usan las estadísticas, para la app de escritorio / .exe.
+Cada lectura analítica cruzaba internet hasta TiDB aunque el total de datos es chico: con la réplica
+activa (DB_USAR_REPLICA_LOCAL=1) la instantánea analítica se arma leyendo este archivo y TiDB solo
+manda lo que cambió. Las escrituras siguen yendo siempre a TiDB.
+
+Sincronización incremental:
+    - pronosticos: se parte en tramos de ids (id DIV TAMANIO_TRAMO_PRONOSTICOS) y se compara la huella
+      de cada tramo contra la que se guardó al copiarlo; solo se recopian los tramos que cambiaron
+      (inserciones, borrados en cascada de un partido o un usuario) y se descartan los que ya no existen.
+      No alcanza con pedir los de id mayor al último copiado: TiDB reparte los AUTO_INCREMENT por rangos
+      a cada nodo, así que un id menor puede confirmarse después de uno mayor y una marca de agua se lo
+      saltearía. Lo que sí cuesta cada sincronización es recorrer pronosticos en TiDB para agrupar las
+      huellas (devuelve una fila por tramo, no las filas).
+    - Tablas chicas (partidos, usuarios, ediciones...): no tienen fecha de modificación, así que se
+      compara una huella (COUNT + suma de CRC32 de las columnas) y solo se recopian las que cambiaron.
+
+No se copian datos sensibles de usuarios (contraseña, email, id de Telegram, tokens): solo id y username.
+"""
+import os
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+RUTA_REPLICA_LOCAL = os.path.join(os.path.expanduser("~"), ".independiente", "replica.sqlite3")
+
+# Tablas chicas que se recopian enteras cuando cambia su huella: tabla -> columnas copiadas
+TABLAS_REPLICA = {
+    'campeonatos': ('id', 'nombre'),
+    'anios': ('id', 'numero'),
+    'ediciones': ('id', 'campeonato_id', 'anio_id', 'finalizado'),
+    'rivales': ('id', 'nombre'),
+    'usuarios': ('id', 'username'),
+    'partidos': ('id', 'edicion_id', 'rival_id', 'condicion', 'fecha_hora', 'goles_independiente', 'goles_rival'),
+}
+
+COLUMNAS_PRONOSTICOS = ('id', 'usuario_id', 'partido_id', 'pred_goles_independiente', 'pred_goles_rival', 'fecha_prediccion')
+TAMANIO_TRAMO_PRONOSTICOS = 1000 # Ids por tramo: se recopia un tramo entero cuando cambia su huella
+
+# Columnas DATETIME: se guardan como texto ISO ('YYYY-MM-DD HH:MM:SS') que ordena igual que la fecha
+COLUMNAS_FECHA = ('fecha_hora', 'fecha_prediccion')
+
+def _a_sqlite(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat(sep=' ')
+    return valor
+
+def _a_fecha(texto):
+    return datetime.fromisoformat(texto) if texto else None
+
+class ReplicaLocal:
+    """
+    Copia local de solo lectura. 'sincronizar' recibe un cursor de TiDB (el de quien la usa, para no
+    abrir otra conexión) y 'datos_instantanea' devuelve las mismas filas que las consultas a TiDB
+    de BaseDeDatos.obtener_instantanea_analitica.
+    """
+    def __init__(self, ruta=RUTA_REPLICA_LOCAL):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._preparada = False
+        self.filas_copiadas = 0
+        self.sincronizaciones = 0
+
+    def _conectar(self):
+        if not self._preparada:
+            # La carpeta tiene que existir antes de abrir el archivo (instalación nueva)
+            carpeta = os.path.dirname(self.ruta)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+        conexion = sqlite3.connect(self.ruta, timeout=10)
+        if not self._preparada:
+            conexion.execute("PRAGMA journal_mode=WAL")
+            for tabla, columnas in TABLAS_REPLICA.items():
+                conexion.execute(f"CREATE TABLE IF NOT EXISTS {tabla} ({', '.join(columnas)}, PRIMARY KEY (id))")
+            conexion.execute(f"CREATE TABLE IF NOT EXISTS pronosticos ({', '.join(COLUMNAS_PRONOSTICOS)}, PRIMARY KEY (id))")
+            conexion.execute("CREATE INDEX IF NOT EXISTS idx_pronosticos_usuario_partido ON pronosticos (usuario_id, partido_id, id)")
+            # Huella con la que se copió cada tabla y versión de datos de TiDB de la última sincronización
+            conexion.execute("CREATE TABLE IF NOT EXISTS sincronizacion (tabla TEXT PRIMARY KEY, huella TEXT)")
+            # Huella con la que se copió cada tramo de ids de pronosticos
+            conexion.execute("CREATE TABLE IF NOT EXISTS tramos_pronosticos (tramo INTEGER PRIMARY KEY, huella TEXT)")
+            conexion.commit()
+            self._preparada = True
+        return conexion
+
+    def _huellas_remotas(self, cursor):
+        """Huella de cada tabla chica en TiDB (una sola consulta)."""
+        subconsultas = ",\n".join(
+            f"(SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS(',', {', '.join(columnas)}))), 0)) FROM {tabla})"
+            for tabla, columnas in TABLAS_REPLICA.items()
+        )
+        cursor.execute(f"SELECT {subconsultas}")
+        return dict(zip(TABLAS_REPLICA, (str(huella) for huella in cursor.fetchone())))
+
+    def _huellas_tramos_remotas(self, cursor):
+        """Huella (COUNT + suma de CRC32) de cada tramo de ids de pronosticos en TiDB: {tramo: huella}."""
+        cursor.execute(f"""
+            SELECT id DIV {TAMANIO_TRAMO_PRONOSTICOS},
+                   CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS(',', {', '.join(COLUMNAS_PRONOSTICOS)}))), 0))
+            FROM pronosticos
+            GROUP BY id DIV {TAMANIO_TRAMO_PRONOSTICOS}
+        """)
+        return {int(tramo): str(huella) for tramo, huella in cursor.fetchall()}
+
+    def _copiar(self, local, tabla, columnas, filas):
+        marcas = ", ".join("?" for _ in columnas)
+        local.executemany(
+            f"INSERT OR REPLACE INTO {tabla} ({', '.join(columnas)}) VALUES ({marcas})",
+            ([_a_sqlite(valor) for valor in fila] for fila in filas)
+        )
+        self.filas_copiadas += len(filas)
+
+    def sincronizar(self, cursor, version=None):
+        """
+        Trae de TiDB solo lo que cambió desde la última vez.
+        - cursor: cursor abierto contra TiDB.
+        - version: versión de datos de TiDB (BaseDeDatos._version_datos); si es la misma que la de la
+          última sincronización no se consulta nada más.
+        Retorna la cantidad de filas copiadas.
+        """
+        with self._lock:
+            local = self._conectar()
+            try:
+                huellas = dict(local.execute("SELECT tabla, huella FROM sincronizacion").fetchall())
+                if version is not None and huellas.get('version') == repr(version):
+                    return 0
+
+                copiadas_antes = self.filas_copiadas
+
+                # 1. Tablas chicas: se recopian solo las que cambiaron
+                for tabla, huella in self._huellas_remotas(cursor).items():
+                    if huellas.get(tabla) == huella:
+                        continue
+                    columnas = TABLAS_REPLICA[tabla]
+                    cursor.execute(f"SELECT {', '.join(columnas)} FROM {tabla}")
+                    filas = cursor.fetchall()
+                    local.execute(f"DELETE FROM {tabla}")
+                    self._copiar(local, tabla, columnas, filas)
+                    local.execute("INSERT OR REPLACE INTO sincronizacion (tabla, huella) VALUES (?, ?)", (tabla, huella))
+
+                # 2. Pronósticos: se recopian solo los tramos de ids cuya huella cambió
+                remotos = self._huellas_tramos_remotas(cursor)
+                locales = dict(local.execute("SELECT tramo, huella FROM tramos_pronosticos").fetchall())
+                if not locales:
+                    # Primera vez (o réplica anterior a los tramos): se copia entera en una sola consulta
+                    cursor.execute(f"SELECT {', '.join(COLUMNAS_PRONOSTICOS)} FROM pronosticos")
+                    filas = cursor.fetchall()
+                    local.execute("DELETE FROM pronosticos")
+                    self._copiar(local, 'pronosticos', COLUMNAS_PRONOSTICOS, filas)
+                else:
+                    for tramo in locales.keys() - remotos.keys():
+                        desde = tramo * TAMANIO_TRAMO_PRONOSTICOS
+                        local.execute("DELETE FROM pronosticos WHERE id >= ? AND id < ?", (desde, desde + TAMANIO_TRAMO_PRONOSTICOS))
+                    for tramo in sorted(t for t, huella in remotos.items() if locales.get(t) != huella):
+                        desde = tramo * TAMANIO_TRAMO_PRONOSTICOS
+                        hasta = desde + TAMANIO_TRAMO_PRONOSTICOS
+                        cursor.execute(f"SELECT {', '.join(COLUMNAS_PRONOSTICOS)} FROM pronosticos WHERE id >= %s AND id < %s", (desde, hasta))
+                        filas = cursor.fetchall()
+                        local.execute("DELETE FROM pronosticos WHERE id >= ? AND id < ?", (desde, hasta))
+                        self._copiar(local, 'pronosticos', COLUMNAS_PRONOSTICOS, filas)
+                local.execute("DELETE FROM tramos_pronosticos")
+                local.executemany("INSERT INTO tramos_pronosticos (tramo, huella) VALUES (?, ?)", remotos.items())
+
+                if version is not None:
+                    local.execute("INSERT OR REPLACE INTO sincronizacion (tabla, huella) VALUES ('version', ?)", (repr(version),))
+                local.commit()
+                self.sincronizaciones += 1
+                return self.filas_copiadas - copiadas_antes
+            except Exception:
+                local.rollback()
+                raise
+            finally:
+                local.close()
+
+    def datos_instantanea(self):
+        """
+        (usuarios, partidos, pronosticos) con el mismo formato que las consultas de
+        BaseDeDatos.obtener_instantanea_analitica, leídos del archivo local.
+        """
+        with self._lock:
+            local = self._conectar()
+            try:
+                usuarios = local.execute("SELECT id, username FROM usuarios").fetchall()
+
+                partidos = [
+                    (id_, edicion_id, numero, int(fecha_hora[:4]), _a_fecha(fecha_hora), rival, goles_cai, goles_rival)
+                    for id_, edicion_id, numero, fecha_hora, rival, goles_cai, goles_rival in local.execute("""
+                        SELECT p.id, p.edicion_id, a.numero, p.fecha_hora,
+                               r.nombre, p.goles_independiente, p.goles_rival
+                        FROM partidos p
+                        LEFT JOIN ediciones e ON p.edicion_id = e.id
+                        LEFT JOIN anios a ON e.anio_id = a.id
+                        LEFT JOIN rivales r ON p.rival_id = r.id
+                        WHERE p.goles_independiente IS NOT NULL AND p.goles_rival IS NOT NULL
+                        ORDER BY p.fecha_hora ASC, p.id ASC
+                    """)
+                ]
+
+                pronosticos = [
+                    (usuario_id, partido_id, pred_cai, pred_rival, _a_fecha(fecha), cant_intentos)
+                    for usuario_id, partido_id, pred_cai, pred_rival, fecha, cant_intentos in local.execute("""
+                        SELECT p1.usuario_id, p1.partido_id, p1.pred_goles_independiente, p1.pred_goles_rival,
+                               p1.fecha_prediccion, ult.cant_intentos
+                        FROM pronosticos p1
+                        JOIN (
+                            SELECT MAX(id) AS max_id, COUNT(*) AS cant_intentos
+                            FROM pronosticos
+                            GROUP BY usuario_id, partido_id
+                        ) ult ON p1.id = ult.max_id
+                        JOIN partidos p ON p1.partido_id = p.id
+                        WHERE p.goles_independiente IS NOT NULL AND p.goles_rival IS NOT NULL
+                    """)
+                ]
+                return usuarios, partidos, pronosticos
+            finally:
+                local.close()
+
+    def borrar(self):
+        """Descarta la copia local (la próxima sincronización la vuelve a traer entera)."""
+        with self._lock:
+            for sufijo in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.ruta + sufijo)
+                except FileNotFoundError:
+                    pass
+            self._preparada = False
+
+    def obtener_metricas(self):
+        return {'sincronizaciones': self.sincronizaciones, 'filas_copiadas': self.filas_copiadas}
@@ -0,0 +1,80 @@
+"""
+Cache de sesiones del bot: id de Telegram -> usuario.
+Casi todos los flujos del bot arrancan resolviendo quién escribe con obtener_usuario_por_telegram, y eso
+era una consulta a TiDB por cada mensaje. La identidad casi nunca cambia, así que se guarda en memoria:
+    - Con TTL (TTL_SESION): acota lo que tarda en verse un cambio hecho por OTRO proceso (app de escritorio).
+    - Los ids que no tienen cuenta vinculada se recuerdan menos tiempo (TTL_SIN_CUENTA), para que quien
+      recién vincula su cuenta desde otro lado no espere de más.
+    - Se invalida al vincular un id (actualizar_id_telegram) y al cambiar el username; si se borra un
+      usuario hay que llamar a BaseDeDatos.olvidar_sesion_telegram.
+
+La usan los hilos de BaseDeDatosAsync a la vez, así que todo pasa por un lock.
+"""
+import threading
+import time
+
+TTL_SESION = 10 * 60
+TTL_SIN_CUENTA = 30
+MAXIMO_SESIONES = 5000
+
+class CacheSesionesTelegram:
+    def __init__(self, ttl=TTL_SESION, ttl_sin_cuenta=TTL_SIN_CUENTA, maximo=MAXIMO_SESIONES):
+        self.ttl = ttl
+        self.ttl_sin_cuenta = ttl_sin_cuenta
+        self.maximo = maximo
+        self._sesiones = {} # id_telegram -> (vence, sesion o None)
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, id_telegram):
+        """Retorna (encontrado, sesion). sesion es None si se sabe que el id no tiene cuenta vinculada."""
+        with self._lock:
+            entrada = self._sesiones.get(id_telegram)
+            if entrada and entrada[0] > time.monotonic():
+                self.aciertos += 1
+                return True, entrada[1]
+            if entrada:
+                del self._sesiones[id_telegram]
+            self.fallos += 1
+            return False, None
+
+    def guardar(self, id_telegram, sesion):
+        ttl = self.ttl if sesion else self.ttl_sin_cuenta
+        with self._lock:
+            if len(self._sesiones) >= self.maximo and id_telegram not in self._sesiones:
+                # Primero se van las vencidas; si no alcanza, la que vence antes
+                ahora = time.monotonic()
+                for clave in [c for c, (vence, _) in self._sesiones.items() if vence <= ahora]:
+                    del self._sesiones[clave]
+                if len(self._sesiones) >= self.maximo:
+                    del self._sesiones[min(self._sesiones, key=lambda c: self._sesiones[c][0])]
+            self._sesiones[id_telegram] = (time.monotonic() + ttl, sesion)
+
+    def invalidar(self, id_telegram=None, usuario_id=None, username=None):
+        """Olvida la sesión de ese id de Telegram y las de ese usuario (por id o por username)."""
+        with self._lock:
+            claves = {
+                clave for clave, (_, sesion) in self._sesiones.items()
+                if clave == id_telegram or (sesion and (sesion['usuario_id'] == usuario_id or sesion['username'] == username))
+            }
+            for clave in claves:
+                del self._sesiones[clave]
+            self.invalidaciones += len(claves)
+
+    def limpiar(self):
+        with self._lock:
+            self.invalidaciones += len(self._sesiones)
+            self._sesiones.clear()
+
+    def obtener_metricas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'invalidaciones': self.invalidaciones,
+                'sesiones': len(self._sesiones),
+            }
@@ -1,7 +1,7 @@
 import flet as ft
 import time
 from estilos import Estilos
-from base_de_datos import BaseDeDatos
+from base_de_datos import obtener_base_de_datos
 import threading
 from ventana_mensaje import GestorMensajes
 from ventana_carga import VentanaCarga
@@ -19,7 +19,7 @@ class TarjetaAcceso(ft.Container):
         self.image_src = "fondo_tarjeta_acceso.jpg" 
         self.image_fit = ft.ImageFit.COVER  
         
-        self.db = BaseDeDatos()
+        self.db = obtener_base_de_datos()
         self.es_modo_horizontal = None 
 
         # --- MAGIA PARA LA TECLA TAB ---
@@ -0,0 +1,159 @@
+"""
+Verifica con EXPLAIN que los métodos de análisis de BaseDeDatos usan los índices de migraciones.py.
+Pensado para correr contra un MySQL local con una copia de los datos (no contra producción).
+
+Uso:
+    python verificar_indices.py [host] [puerto] [usuario] [contraseña] [base]
+
+Por defecto: 127.0.0.1 3306 root (sin contraseña) independiente.
+Cada método se ejecuta de verdad; se registran sus SELECT y se les corre EXPLAIN.
+Se informa qué índice usa cada tabla y se marcan los recorridos completos (type = ALL).
+"""
+import sys
+from base_de_datos import BaseDeDatos
+from pool_conexiones import obtener_pool
+from migraciones import aplicar_migraciones
+
+# Índices que crean las migraciones: al final se controla que cada uno lo use al menos un método
+INDICES_ESPERADOS = [
+    'idx_pronosticos_usuario_partido_fecha',
+    'idx_pronosticos_partido_usuario_fecha',
+    'idx_partidos_edicion_fecha',
+    'idx_partidos_fecha',
+]
+
+class _CursorRegistrador:
+    """Cursor que anota cada consulta ejecutada antes de pasarla al cursor real."""
+    def __init__(self, cursor, registro):
+        self._cursor = cursor
+        self._registro = registro
+
+    def execute(self, sql, params=None):
+        self._registro.append((sql, params))
+        if params is None:
+            return self._cursor.execute(sql)
+        return self._cursor.execute(sql, params)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+class _ConexionRegistradora:
+    def __init__(self, conexion, registro):
+        self._conexion = conexion
+        self._registro = registro
+
+    def cursor(self, *args, **kwargs):
+        return _CursorRegistrador(self._conexion.cursor(*args, **kwargs), self._registro)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+def _conectar_local(host, puerto, usuario, contrasena, base):
+    """BaseDeDatos apuntando al MySQL local (sin TLS) con su propio pool."""
+    bd = BaseDeDatos()
+    bd.config = {
+        'user': usuario,
+        'password': contrasena,
+        'host': host,
+        'port': int(puerto),
+        'database': base,
+        'raise_on_warnings': True,
+        'use_pure': True
+    }
+    bd.pool = obtener_pool(bd.config)
+    # Todo tiene que ir por SQL para poder registrarlo: sin instantánea en memoria ni réplica local
+    bd.usar_instantanea = False
+    bd.replica = None
+    bd._cache_rachas.clear()
+    return bd
+
+def _metodos_a_verificar(bd):
+    """(nombre, función sin argumentos) de cada método de análisis con datos reales de ejemplo."""
+    ediciones = bd.obtener_ediciones(solo_finalizados=True) or bd.obtener_ediciones()
+    usuarios = bd.obtener_usuarios()
+    edicion_id = ediciones[0][0] if ediciones else 1
+    anio = ediciones[0][2] if ediciones else None
+    usuario = usuarios[0] if usuarios else ""
+
+    return [
+        ("obtener_partidos", lambda: bd.obtener_partidos(usuario, 'todos', edicion_id)),
+        ("obtener_ranking", lambda: bd.obtener_ranking(edicion_id)),
+        ("obtener_ranking (año)", lambda: bd.obtener_ranking(None, anio)),
+        ("obtener_datos_evolucion_puestos", lambda: bd.obtener_datos_evolucion_puestos(edicion_id, [usuario])),
+        ("obtener_datos_evolucion_puntos", lambda: bd.obtener_datos_evolucion_puntos(edicion_id, [usuario])),
+        ("obtener_historial_puntos_usuario", lambda: bd.obtener_historial_puntos_usuario(edicion_id, usuario)),
+        ("obtener_torneos_ganados", lambda: bd.obtener_torneos_ganados(anio)),
+        ("obtener_racha_actual", lambda: bd.obtener_racha_actual(edicion_id)),
+        ("obtener_todos_pronosticos", lambda: bd.obtener_todos_pronosticos('jugados')),
+        ("obtener_pagina_pronosticos", lambda: bd.obtener_pagina_pronosticos('jugados')),
+        ("obtener_estadisticas_estilo_pronostico", lambda: bd.obtener_estadisticas_estilo_pronostico(usuario, edicion_id)),
+        ("obtener_estadisticas_tendencia_pronostico", lambda: bd.obtener_estadisticas_tendencia_pronostico(usuario, edicion_id)),
+        ("obtener_estadisticas_firmeza_pronostico", lambda: bd.obtener_estadisticas_firmeza_pronostico(usuario, edicion_id)),
+        ("obtener_ranking_mayores_errores", lambda: bd.obtener_ranking_mayores_errores(None, edicion_id)),
+        ("obtener_ranking_mufa", lambda: bd.obtener_ranking_mufa(edicion_id)),
+        ("obtener_ranking_falso_profeta", lambda: bd.obtener_ranking_falso_profeta(edicion_id)),
+        ("obtener_indice_optimismo_pesimismo", lambda: bd.obtener_indice_optimismo_pesimismo(edicion_id)),
+        ("obtener_ranking_mejor_predictor", lambda: bd.obtener_ranking_mejor_predictor(edicion_id)),
+        ("obtener_ranking_estabilidad", lambda: bd.obtener_ranking_estabilidad(edicion_id)),
+        ("obtener_agenda_partidos_futuros", lambda: bd.obtener_agenda_partidos_futuros()),
+    ]
+
+def _explicar(bd, sql, params):
+    """Corre EXPLAIN y devuelve sus filas como diccionarios."""
+    conexion = bd.abrir()
+    cursor = conexion.cursor(dictionary=True)
+    try:
+        if params is None:
+            cursor.execute("EXPLAIN " + sql)
+        else:
+            cursor.execute("EXPLAIN " + sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conexion.close()
+
+def verificar(bd):
+    abrir_original = bd.abrir
+    indices_usados = set()
+    recorridos_completos = 0
+
+    for nombre, llamada in _metodos_a_verificar(bd):
+        registro = []
+        bd._cache_rachas.clear() # Racha actual y récord comparten el cálculo: sin esto la segunda no consulta nada
+        bd.abrir = lambda: _ConexionRegistradora(abrir_original(), registro)
+        try:
+            llamada()
+        finally:
+            bd.abrir = abrir_original
+
+        print(f"\n=== {nombre} ({len(registro)} consultas) ===")
+        for sql, params in registro:
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            for fila in _explicar(bd, sql, params):
+                tabla = fila.get('table')
+                indice = fila.get('key')
+                tipo = fila.get('type')
+                if indice:
+                    indices_usados.update(indice.split(','))
+                # Las tablas derivadas (<derivedN>) y las chicas (ediciones, anios...) pueden recorrerse enteras
+                marca = ""
+                if tipo == 'ALL' and not str(tabla).startswith('<'):
+                    marca = "  ⚠️ recorrido completo"
+                    recorridos_completos += 1
+                print(f"   {str(tabla):25} {str(tipo):8} {str(indice or '-'):45} filas≈{fila.get('rows')}{marca}")
+
+    print("\n=== Índices de las migraciones ===")
+    faltantes = 0
+    for indice in INDICES_ESPERADOS:
+        usado = indice in indices_usados
+        faltantes += 0 if usado else 1
+        print(f"{'✅' if usado else '❌'} {indice}")
+    print(f"\nRecorridos completos sobre tablas: {recorridos_completos} (con pocos datos el optimizador puede preferirlos)")
+    return faltantes == 0
+
+if __name__ == '__main__':
+    argumentos = sys.argv[1:] + ["127.0.0.1", "3306", "root", "", "independiente"][len(sys.argv[1:]):]
+    bd_local = _conectar_local(*argumentos[:5])
+    aplicar_migraciones(bd_local)
+    sys.exit(0 if verificar(bd_local) else 1)